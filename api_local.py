@@ -0,0 +1,122 @@
+# api_local.py
+# Servidor local que imita POST /evaluate/multilabel_metrics da API do Bootcamp,
+# para testar o evaluate_api.py (varreduras, concorrência, retry e cache) sem rede.
+# - Métricas calculadas por src/metricas.py a partir de um CSV local de rótulos
+# - --falhas injeta respostas 503 aleatórias e --atraso-ms simula latência
+#
+# Uso:
+#   python api_local.py --labels data/rotulos_validacao.csv --port 5055
+#   python evaluate_api.py --api-base http://127.0.0.1:5055 --token x \
+#       --csv results/bootcamp_submission_long.csv --thresholds 0.1:0.9:0.1
+
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+
+from src.metricas import carregar_rotulos, alinhar_submissao, metricas_multilabel
+
+
+def ler_multipart(body: bytes, content_type: str) -> bytes:
+    """Conteúdo do campo 'file' de um corpo multipart/form-data."""
+    msg = BytesParser(policy=HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+    )
+    for parte in msg.iter_parts():
+        if parte.get_param("name", header="content-disposition") == "file":
+            return parte.get_payload(decode=True)
+    raise ValueError("campo 'file' ausente")
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def make_handler(rotulos: pd.DataFrame, token: str, falhas: float, atraso_ms: float):
+    contador = {"req": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code: int, payload: dict):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._send(200, dict(contador))
+            else:
+                self._send(404, {"erro": "rota não encontrada"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with lock:
+                contador["req"] += 1
+            if url.path != "/evaluate/multilabel_metrics":
+                self._send(404, {"erro": "rota não encontrada"})
+                return
+            if token and self.headers.get("X-API-Key") != token:
+                self._send(401, {"erro": "token inválido"})
+                return
+            if atraso_ms:
+                time.sleep(atraso_ms / 1000.0)
+            if falhas and random.random() < falhas:
+                self._send(503, {"erro": "indisponível (falha simulada)"})
+                return
+            try:
+                threshold = float(parse_qs(url.query).get("threshold", ["0.5"])[0])
+                subm = pd.read_csv(io.BytesIO(ler_multipart(body, self.headers.get("Content-Type", ""))))
+                y, proba = alinhar_submissao(subm, rotulos)
+            except Exception as e:
+                self._send(400, {"erro": str(e)})
+                return
+            self._send(200, metricas_multilabel(y, proba, threshold))
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Stand-in local da API de avaliação multirrótulo.")
+    ap.add_argument("--labels", required=True, help="CSV com 'id' + rótulos (nomes curtos ou longos).")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=5055)
+    ap.add_argument("--token", default="", help="Se definido, exige este X-API-Key.")
+    ap.add_argument("--falhas", type=float, default=0.0, help="Fração de respostas 503 simuladas.")
+    ap.add_argument("--atraso-ms", type=float, default=0.0, help="Latência simulada por requisição.")
+    args = ap.parse_args()
+
+    try:
+        rotulos = carregar_rotulos(args.labels)
+    except (OSError, ValueError) as e:
+        print(f"[erro] {e}", file=sys.stderr)
+        sys.exit(1)
+    server = StandInServer((args.host, args.port),
+                           make_handler(rotulos, args.token, args.falhas, args.atraso_ms))
+    print(f"[ok] API local em http://{args.host}:{args.port} ({len(rotulos)} rótulos)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,76 +1,153 @@
 import os
 import json
+import hashlib
 import pandas as pd
 import numpy as np
 import streamlit as st
 from io import BytesIO
 from joblib import load
 
+from src import utils
+from src.utils import predict_proba_multilabel, contribuicoes_multilabel, load_thresholds, load_threshold
+from src.bundle import ModelBundle, carregar_bundle, eh_bundle
+from src.drift import MonitorDrift, carregar_referencia
+from src.predicoes import carregar_predicoes, como_dataframe, csv_bytes, rotulos
+
 st.set_page_config(page_title="Manutenção Preditiva - Demo", layout="wide")
 
 ROOT_DIR = os.path.abspath(os.path.dirname(__file__))
 RESULTS_DIR = os.path.join(ROOT_DIR, "results")
 PLOTS_DIR   = os.path.join(RESULTS_DIR, "plots")
 MODEL_PATH  = os.path.join(RESULTS_DIR, "modelo_multilabel_rf.joblib")
+BUNDLE_DIR  = os.path.join(RESULTS_DIR, "modelo_bundle")
 TH_PATH     = os.path.join(RESULTS_DIR, "best_threshold.txt")
+THS_PATH    = os.path.join(RESULTS_DIR, "best_thresholds.json")
+DRIFT_PATH  = os.path.join(RESULTS_DIR, "drift_referencia.json")
+SUBM_NPY    = os.path.join(RESULTS_DIR, "bootcamp_submission.npy")
 
-# Colunas de entrada (as mesmas do main)
-X_COLS = [
-    "tipo",
-    "temperatura_ar",
-    "temperatura_processo",
-    "umidade_relativa",
-    "velocidade_rotacional",
-    "torque",
-    "desgaste_da_ferramenta",
-]
-LABELS = ["FDF", "FDC", "FP", "FTE", "FA"]
-LONG_MAP = {
-    'FDF': 'FDF (Falha Desgaste Ferramenta)',
-    'FDC': 'FDC (Falha Dissipacao Calor)',
-    'FP' : 'FP (Falha Potencia)',
-    'FTE': 'FTE (Falha Tensao Excessiva)',
-    'FA' : 'FA (Falha Aleatoria)'
-}
-
-def load_threshold(default=0.30):
-    try:
-        with open(TH_PATH, "r", encoding="utf-8") as f:
-            return float(f.read().strip())
-    except Exception:
-        return default
+BLOCO_LINHAS = 50_000   # linhas por bloco na pontuação de uploads grandes
+PREVIEW_LINHAS = 200    # amostra exibida na prévia
+EXPLICA_LINHAS = 200    # máquinas mais prováveis por rótulo com atribuições
+
+@st.cache_resource(max_entries=1, show_spinner="Carregando modelo...")
+def _load_model_cached(path: str, mtime: float):
+    # recurso compartilhado entre sessões; mtime na chave -> recarrega só se o arquivo mudar
+    if eh_bundle(path):
+        return carregar_bundle(path)  # arrays do motor via mmap
+    return load(path)
+
+def _model_path():
+    # prefere o bundle (manifesto com esquema, rótulos e limiares); senão o .joblib antigo
+    return BUNDLE_DIR if eh_bundle(BUNDLE_DIR) else MODEL_PATH
+
+def model_mtime():
+    path = _model_path()
+    alvo = os.path.join(path, "manifest.json") if path == BUNDLE_DIR else path
+    return os.path.getmtime(alvo) if os.path.exists(alvo) else None
 
 def load_model():
-    if os.path.exists(MODEL_PATH):
-        return load(MODEL_PATH)
-    return None
+    mtime = model_mtime()
+    return _load_model_cached(_model_path(), mtime) if mtime is not None else None
+
+model = load_model()
+if isinstance(model, ModelBundle):
+    X_COLS, LABELS, LONG_MAP = model.x_cols, model.labels, model.long_map
+else:  # modelo antigo sem manifesto: esquema padrão do projeto
+    X_COLS, LABELS, LONG_MAP = utils.X_COLS, utils.LABELS, utils.LONG_MAP
 
 def predict_proba_df(model, df_input: pd.DataFrame) -> pd.DataFrame:
-    # garante colunas esperadas
-    for c in X_COLS:
-        if c not in df_input.columns:
-            df_input[c] = np.nan
-    X = df_input[X_COLS].copy()
-    # predict_proba retorna lista de arrays (um por rótulo)
-    probs_list = model.predict_proba(X)
-    # empilha colunas
-    out = {}
-    for i, lab in enumerate(LABELS):
-        # alguns classificadores retornam shape (n,2); pega prob de classe 1
-        p = probs_list[i]
-        if p.ndim == 2 and p.shape[1] == 2:
-            out[lab] = p[:, 1]
-        else:
-            out[lab] = p.ravel()
-    return pd.DataFrame(out, index=df_input.index)
+    # garante colunas esperadas sem alterar/copiar o DataFrame inteiro de entrada
+    X = df_input.reindex(columns=X_COLS)
+    if isinstance(model, ModelBundle):
+        probs = model.predict_proba(X)
+    else:
+        # mesmo caminho do main: funciona com MultiOutputClassifier e com rf_joint
+        probs = predict_proba_multilabel(model, X, len(LABELS))
+    return pd.DataFrame(probs, columns=LABELS, index=df_input.index)
+
+# --- memoização por conteúdo do upload (argumentos com "_" não entram na chave) ---
+@st.cache_data(max_entries=4, show_spinner="Lendo CSV...")
+def _ler_upload(digest: str, _data: bytes) -> pd.DataFrame:
+    df = pd.read_csv(BytesIO(_data))
+    if "id" not in df.columns:
+        df["id"] = np.arange(1, len(df) + 1)
+    return df
+
+@st.cache_data(max_entries=2048, show_spinner=False)
+def _proba_bloco(digest: str, mtime: float, inicio: int, _model, _df: pd.DataFrame) -> np.ndarray:
+    bloco = _df.iloc[inicio:inicio + BLOCO_LINHAS]
+    return predict_proba_df(_model, bloco).to_numpy()
+
+def probabilidades(model, mtime, digest, df: pd.DataFrame) -> pd.DataFrame:
+    """Pontua em blocos com barra de progresso; blocos já vistos vêm do cache."""
+    inicios = range(0, len(df), BLOCO_LINHAS)
+    barra = st.progress(0.0, text="Calculando probabilidades...") if len(inicios) > 1 else None
+    partes = []
+    for k, i in enumerate(inicios, 1):
+        partes.append(_proba_bloco(digest, mtime, i, model, df))
+        if barra is not None:
+            barra.progress(k / len(inicios), text=f"Calculando probabilidades... {k}/{len(inicios)} blocos")
+    if barra is not None:
+        barra.empty()
+    probs = np.vstack(partes) if partes else np.empty((0, len(LABELS)))
+    return pd.DataFrame(probs, columns=LABELS, index=df.index)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _csv_bytes(digest: str, mtime: float, longo: bool, _df: pd.DataFrame) -> bytes:
+    bio = BytesIO()
+    (to_long_cols(_df) if longo else _df).to_csv(bio, index=False, encoding="utf-8")
+    return bio.getvalue()
+
+@st.cache_data(max_entries=16, show_spinner="Calculando atribuições...")
+def _atribuicoes(digest: str, mtime: float, rotulo: str, _model, _df: pd.DataFrame, _probs: pd.DataFrame):
+    # só as máquinas mais prováveis do rótulo: não depende do limiar escolhido na barra lateral
+    top = _probs[rotulo].nlargest(EXPLICA_LINHAS).index
+    try:
+        base, contrib, nomes = contribuicoes_multilabel(_model, _df.loc[top].reindex(columns=X_COLS), LABELS)
+    except NotImplementedError as e:
+        return None, str(e)
+    j = LABELS.index(rotulo)
+    return pd.DataFrame(contrib[:, :, j], index=top, columns=nomes), float(base[j])
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _drift_upload(digest: str, mtime: float, _model, _df: pd.DataFrame):
+    # referência do bundle; modelo antigo usa a salva pelo main.py (se houver)
+    ref = getattr(_model, "drift_ref", None)
+    if ref is None and os.path.exists(DRIFT_PATH):
+        ref = carregar_referencia(DRIFT_PATH)
+    if ref is None:
+        return None
+    monitor = MonitorDrift(ref)
+    monitor.atualizar(_df)
+    return pd.DataFrame(monitor.relatorio()["variaveis"]).T
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _submissao_npy(mtime: float):
+    # id + float32 mapeados em memória: nada de parsing de CSV
+    return carregar_predicoes(SUBM_NPY)
+
+@st.cache_data(max_entries=2, show_spinner="Gerando CSV...")
+def _submissao_csv(mtime: float, longo: bool) -> bytes:
+    return csv_bytes(_submissao_npy(mtime), longo=longo)
 
 def to_long_cols(df_short: pd.DataFrame) -> pd.DataFrame:
     return df_short.rename(columns=LONG_MAP)
 
 # Sidebar
 st.sidebar.title("Configurações")
-th = st.sidebar.slider("Limiar (threshold)", 0.0, 1.0, load_threshold(), 0.01)
-st.sidebar.caption("Abaixo/igual ao limiar → 0 | Acima → 1")
+if isinstance(model, ModelBundle):
+    ths_treino = model.thresholds
+else:
+    ths_treino = load_thresholds(THS_PATH, fallback_path=TH_PATH)
+usar_por_rotulo = st.sidebar.checkbox("Usar limiares por rótulo (treino)",
+                                      value=isinstance(model, ModelBundle) or os.path.exists(THS_PATH))
+if usar_por_rotulo:
+    ths = ths_treino
+    st.sidebar.dataframe(pd.DataFrame({"limiar": ths}, index=LABELS), use_container_width=True)
+else:
+    th = st.sidebar.slider("Limiar (threshold)", 0.0, 1.0, float(np.round(ths_treino.mean(), 2)), 0.01)
+    ths = np.full(len(LABELS), th)
+st.sidebar.caption("Abaixo do limiar → 0 | Igual/acima → 1")
 
 st.title("Manutenção Preditiva — EDA e Predições")
 tabs = st.tabs(["Exploração", "Predição"])
@@ -115,43 +192,87 @@ with tabs[0]:
     else:
         st.info("Ainda não há métricas salvas da API.")
 
+    st.divider()
+    st.subheader("Última submissão binária (main.py --formato_saida npy)")
+    if os.path.exists(SUBM_NPY):
+        mtime_npy = os.path.getmtime(SUBM_NPY)
+        arr = _submissao_npy(mtime_npy)
+        labs = rotulos(arr)
+        # o .npy guarda probabilidades já alinhadas (alinhar_limiares): o corte é o limiar da API
+        th_api = model.api_threshold if isinstance(model, ModelBundle) else load_threshold(TH_PATH, 0.5)
+        st.caption(f"{len(arr)} linhas | {os.path.getsize(SUBM_NPY) / 2**20:.1f} MB | limiar da API {th_api:.4f}")
+        st.dataframe(pd.DataFrame({
+            "proba média": [float(np.mean(arr[l])) for l in labs],
+            "positivos (limiar)": [int((arr[l] >= th_api).sum()) for l in labs],
+        }, index=labs), use_container_width=True)
+        st.dataframe(como_dataframe(arr[:PREVIEW_LINHAS]), use_container_width=True)
+        if st.checkbox("Preparar CSVs para download"):
+            st.download_button("Baixar CSV (nomes curtos)", _submissao_csv(mtime_npy, False),
+                               file_name="bootcamp_submission.csv", mime="text/csv")
+            st.download_button("Baixar CSV (nomes longos)", _submissao_csv(mtime_npy, True),
+                               file_name="bootcamp_submission_long.csv", mime="text/csv")
+    else:
+        st.info("Sem submissão binária (results/bootcamp_submission.npy).")
+
 # === Tab 2: Predição ===
 with tabs[1]:
     st.subheader("Carregue um CSV para gerar predições")
     st.caption("Estrutura esperada: colunas 'id' (opcional), 'tipo' (L/M/H) e variáveis de entrada.")
     uploaded = st.file_uploader("Arquivo CSV", type=["csv"])
-    model = load_model()
 
     if model is None:
-        st.error("Modelo não encontrado (results/modelo_multilabel_rf.joblib). Treine/salve antes.")
+        st.error("Modelo não encontrado (results/modelo_bundle ou modelo_multilabel_rf.joblib). Treine/salve antes.")
+    elif isinstance(model, ModelBundle):
+        st.success("Bundle carregado (v%d, criado em %s)." % (
+            model.manifest["bundle_version"], model.manifest["criado_em"]))
     else:
         st.success("Modelo carregado com sucesso.")
 
     if uploaded and model is not None:
-        df_in = pd.read_csv(uploaded)
-        if "id" not in df_in.columns:
-            df_in["id"] = np.arange(1, len(df_in) + 1)
-
-        probs = predict_proba_df(model, df_in)
-        preds = (probs.values > th).astype(int)
-        df_preds = pd.DataFrame(preds, columns=LABELS, index=df_in.index)
-        sub_curta = pd.concat([df_in[["id"]], probs[["FDF","FDC","FP","FTE","FA"]]], axis=1)
-        sub_longa = pd.concat([df_in[["id"]], to_long_cols(probs)], axis=1)
-
-        st.markdown("**Prévia das probabilidades (curto):**")
-        st.dataframe(sub_curta.head(10), use_container_width=True)
-
-        # botões de download
-        def to_csv_bytes(df):
-            bio = BytesIO()
-            df.to_csv(bio, index=False, encoding="utf-8")
-            return bio.getvalue()
-
-        st.download_button("Baixar CSV (nomes curtos)", to_csv_bytes(sub_curta),
+        data = uploaded.getvalue()
+        digest = hashlib.sha256(data).hexdigest()
+        mtime = model_mtime()
+        df_in = _ler_upload(digest, data)
+
+        # mover o slider só refaz a comparação abaixo; o resto vem do cache
+        probs = probabilidades(model, mtime, digest, df_in)
+        preds = probs.values >= ths
+        sub_curta = pd.concat([df_in[["id"]], probs], axis=1)
+
+        n = len(sub_curta)
+        st.markdown(f"**Prévia das probabilidades (curto)** — amostra de {min(n, PREVIEW_LINHAS)} de {n} linhas:")
+        prev = sub_curta.sample(PREVIEW_LINHAS, random_state=0).sort_index() if n > PREVIEW_LINHAS else sub_curta
+        st.dataframe(prev, use_container_width=True)
+
+        # botões de download (CSV gerado uma vez por upload/modelo)
+        st.download_button("Baixar CSV (nomes curtos)", _csv_bytes(digest, mtime, False, sub_curta),
                            file_name="predicoes_curto.csv", mime="text/csv")
-        st.download_button("Baixar CSV (nomes longos)", to_csv_bytes(sub_longa),
+        st.download_button("Baixar CSV (nomes longos)", _csv_bytes(digest, mtime, True, sub_curta),
                            file_name="predicoes_longos.csv", mime="text/csv")
 
-        st.markdown("**Threshold escolhido:** {:.2f}".format(th))
+        st.markdown("**Limiares:** " + " | ".join("{} = {:.4f}".format(l, t) for l, t in zip(LABELS, ths)))
         st.markdown("**Contagem de positivos por rótulo (com threshold):**")
-        st.write(df_preds.sum().to_frame("positivos"))
+        st.write(pd.Series(preds.sum(axis=0), index=LABELS).to_frame("positivos"))
+
+        with st.expander("Por que a máquina foi sinalizada? (contribuição por variável)"):
+            rotulo = st.selectbox("Rótulo", LABELS)
+            contrib, base = _atribuicoes(digest, mtime, rotulo, model, df_in, probs)
+            if contrib is None:
+                st.warning("Atribuições indisponíveis para este modelo: %s" % base)
+            else:
+                st.caption("Atribuição por caminho das árvores: valor base (%.4f) + soma das contribuições = "
+                           "probabilidade (RF) ou logit (XGBoost). Top %d máquinas do rótulo."
+                           % (base, len(contrib)))
+                j = LABELS.index(rotulo)
+                tabela = pd.concat([df_in.loc[contrib.index, ["id"]], probs.loc[contrib.index, [rotulo]]], axis=1)
+                tabela["sinalizada"] = tabela[rotulo] >= ths[j]
+                st.dataframe(pd.concat([tabela, contrib.round(4)], axis=1), use_container_width=True)
+                ids = tabela["id"].tolist()
+                linha = contrib.iloc[ids.index(st.selectbox("Máquina (id)", ids))]
+                st.bar_chart(linha.reindex(linha.abs().sort_values(ascending=False).index))
+
+        drift = _drift_upload(digest, mtime, model, df_in)
+        if drift is not None:
+            with st.expander("Drift das entradas vs treino (PSI/KS)"):
+                st.caption("PSI < 0.1 estável, 0.1-0.25 moderado, > 0.25 drift forte.")
+                st.dataframe(drift, use_container_width=True)
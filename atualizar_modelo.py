@@ -0,0 +1,204 @@
+# atualizar_modelo.py
+# Atualiza o modelo treinado com um lote novo de telemetria rotulada, sem re-treino completo
+# (ver src/incremental.py). Só o lote é lido e transformado: o custo escala com o lote.
+# - Parte do lote (--holdout) fica de fora para medir o F1-macro antes/depois
+# - Com --historico, treina também do zero (histórico + lote) e reporta a troca
+#   qualidade x tempo da atualização contra o re-treino completo
+# - Limiares por rótulo reajustados no --holdout depois da atualização (bundle e
+#   results/best_thresholds.json); sem holdout, os do bundle são mantidos
+# - Regrava o bundle (motor + manifest com o histórico de atualizações) e o .joblib
+#
+# Uso:
+#   python atualizar_modelo.py --novos data/lote_2024_06.csv
+#   python atualizar_modelo.py --novos data/lote_2024_06.csv --historico data/bootcamp_train.csv
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from joblib import load, dump
+from sklearn.model_selection import train_test_split
+
+from main import carregar_treino, build_pipeline, assert_required_columns
+from src.utils import (
+    LABELS, X_COLS, FoldEnsemble, predict_proba_multilabel, choose_best_thresholds, save_thresholds
+)
+from src.metricas import f1_macro_por_limiar, _div
+from src.bundle import carregar_bundle, eh_bundle, salvar_bundle
+from src.tree_engine import exportar, verificar
+from src.incremental import atualizar_pipeline, codificador_id
+
+BUNDLE = os.path.join("results", "modelo_bundle")
+JOBLIB = os.path.join("results", "modelo_multilabel_rf.joblib")
+
+
+def _f1_macro(y, proba, ths) -> float:
+    """F1-macro com um limiar por rótulo."""
+    pred = proba >= np.asarray(ths)
+    tp = (pred & (y == 1)).sum(axis=0)
+    fp = (pred & (y == 0)).sum(axis=0)
+    fn = (~pred & (y == 1)).sum(axis=0)
+    return float(_div(2 * tp, 2 * tp + fp + fn).mean())
+
+
+def _avaliar(pipe, X, Y, ths) -> dict:
+    proba = predict_proba_multilabel(pipe, X, len(LABELS))
+    otimos, f1s = choose_best_thresholds(Y, proba)
+    return {"f1_macro_limiares_bundle": _f1_macro(Y, proba, ths),
+            "f1_macro_limiares_otimos": float(f1s.mean()),
+            "f1_macro_0_5": float(f1_macro_por_limiar(Y, proba, [0.5])[0]),
+            "limiares_otimos": {lab: float(t) for lab, t in zip(LABELS, otimos)}}
+
+
+def _nome_modelo(clf) -> str:
+    if hasattr(clf, "n_outputs_"):
+        return "rf_joint"
+    return "xgb" if type(clf.estimators_[0]).__name__ == "XGBClassifier" else "rf"
+
+
+def main(args):
+    if not os.path.exists(args.model):
+        print(f"[erro] Modelo não encontrado: {args.model}", file=sys.stderr)
+        sys.exit(1)
+    bundle = carregar_bundle(args.model) if eh_bundle(args.model) else None
+    pipe = bundle.pipeline if bundle is not None else load(args.model)
+    if isinstance(pipe, FoldEnsemble):
+        print("[erro] Ensemble de folds (--cv_final ensemble) não suporta atualização incremental; "
+              "treine com --cv_final refit.", file=sys.stderr)
+        sys.exit(1)
+    try:
+        codificador_id(pipe.named_steps["prep"])  # falha cedo, antes de ler o lote
+    except ValueError as e:
+        print(f"[erro] {e}", file=sys.stderr)
+        sys.exit(1)
+    treino = dict(bundle.manifest.get("treino", {})) if bundle is not None else {}
+    x_cols = bundle.x_cols if bundle is not None else list(X_COLS)
+    ths = bundle.thresholds if bundle is not None else np.full(len(LABELS), 0.5)
+    modelo = treino.get("modelo") or _nome_modelo(pipe.named_steps["clf"])
+
+    print("[1/4] Carregando lote novo...")
+    df = carregar_treino(args.novos)
+    assert_required_columns(df, x_cols, "novos")
+    X, Y = df[x_cols], df[LABELS]
+    if args.holdout > 0:
+        X_up, X_ev, Y_up, Y_ev = train_test_split(X, Y, test_size=args.holdout, random_state=42)
+    else:
+        X_up, Y_up, X_ev, Y_ev = X, Y, None, None
+
+    relatorio = {"modelo": modelo, "lote": os.path.basename(args.novos), "linhas_lote": int(len(X)),
+                 "linhas_atualizacao": int(len(X_up)), "linhas_avaliacao": int(len(X_ev) if X_ev is not None else 0)}
+    if X_ev is not None:
+        relatorio["antes"] = _avaliar(pipe, X_ev, Y_ev.to_numpy(), ths)
+
+    print("[2/4] Atualizando (%s, %d linhas)..." % (modelo, len(X_up)))
+    resumo = atualizar_pipeline(pipe, X_up, Y_up, LABELS, frac_arvores=args.frac_arvores,
+                                rodadas_xgb=args.rodadas_xgb, n_jobs=args.n_jobs,
+                                n_historico=treino.get("linhas"))
+    relatorio["atualizacao"] = resumo
+    for lab, acao in resumo["por_rotulo"].items():
+        print("  %-4s %s" % (lab, acao))
+    if resumo["categorias_novas"]:
+        print("[aviso] Categorias fora do OneHotEncoder (ignoradas): %s" % resumo["categorias_novas"])
+    if resumo["codificador_id"]:
+        print("  id   %s: contagens do lote somadas" % resumo["codificador_id"])
+    if X_ev is not None:
+        relatorio["depois"] = _avaliar(pipe, X_ev, Y_ev.to_numpy(), ths)
+
+    if args.historico and X_ev is not None:
+        print("[3/4] Re-treino completo para comparação (histórico + lote)...")
+        hist = carregar_treino(args.historico)
+        X_full = pd.concat([hist[x_cols], X_up], ignore_index=True)
+        Y_full = pd.concat([hist[LABELS], Y_up], ignore_index=True)
+        cat_cols = X_full.select_dtypes(include=["object", "category"]).columns.tolist()
+        num_cols = [c for c in X_full.columns if c not in cat_cols]
+        n_jobs = args.n_jobs if args.n_jobs > 0 else (os.cpu_count() or 1)
+        t0 = time.perf_counter()
+        completo = build_pipeline(cat_cols, num_cols, model_name=modelo, profile=treino.get("perfil", "fast"),
+                                  n_jobs=n_jobs, params=treino.get("params"),
+                                  id_encoding=treino.get("id_encoding") or "onehot",
+                                  id_buckets=treino.get("id_buckets", 64))
+        completo.fit(X_full, Y_full)
+        relatorio["retreino"] = {"linhas": int(len(X_full)), "segundos": round(time.perf_counter() - t0, 3),
+                                 **_avaliar(completo, X_ev, Y_ev.to_numpy(), ths)}
+    else:
+        print("[3/4] Sem --historico: comparação com re-treino completo pulada.")
+
+    if X_ev is not None:
+        print("\n%-12s %12s %14s %14s" % ("modelo", "F1 (bundle)", "F1 (ótimos)", "tempo (s)"))
+        tempos = {"antes": None, "depois": resumo["segundos"],
+                  "retreino": relatorio.get("retreino", {}).get("segundos")}
+        for k in ("antes", "depois", "retreino"):
+            if k in relatorio:
+                r = relatorio[k]
+                print("%-12s %12.4f %14.4f %14s" % (k, r["f1_macro_limiares_bundle"],
+                                                     r["f1_macro_limiares_otimos"],
+                                                     "-" if tempos[k] is None else "%.2f" % tempos[k]))
+        if "retreino" in relatorio:
+            r, d = relatorio["retreino"], relatorio["depois"]
+            relatorio["troca"] = {
+                "f1_perdido_vs_retreino": round(r["f1_macro_limiares_otimos"] - d["f1_macro_limiares_otimos"], 4),
+                "aceleracao": round(r["segundos"] / max(resumo["segundos"], 1e-9), 1),
+            }
+            print("Atualização %.1fx mais rápida que o re-treino | F1 (ótimos) perdido vs re-treino: %+.4f"
+                  % (relatorio["troca"]["aceleracao"], relatorio["troca"]["f1_perdido_vs_retreino"]))
+
+    print("\n[4/4] Salvando...")
+    os.makedirs(args.results_dir, exist_ok=True)
+    out = os.path.join(args.results_dir, "atualizacao_relatorio.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print("[ok] Relatório: %s" % out)
+    if args.so_relatorio:
+        print("[aviso] --so_relatorio: modelo atualizado não foi salvo.")
+        return
+
+    engine = None
+    try:
+        engine = exportar(pipe, LABELS)
+        # xgb acumula a margem em float32: com mais rodadas o erro de arredondamento cresce
+        verificar(pipe, engine, X_up.head(1000), atol=1e-5)
+    except (NotImplementedError, AssertionError) as e:
+        print("[aviso] Bundle sem motor compilado: %s" % e)
+        engine = None
+    if X_ev is not None:
+        # as árvores mudaram: limiares reajustados no holdout (fora da atualização)
+        ths = np.array([relatorio["depois"]["limiares_otimos"][lab] for lab in LABELS])
+        save_thresholds(os.path.join(args.results_dir, "best_thresholds.json"), ths)
+        print("Limiares: %s" % ", ".join("%s=%.4f" % (lab, t) for lab, t in zip(LABELS, ths)))
+    else:
+        print("[aviso] --holdout 0: limiares do bundle mantidos (sem linhas fora da atualização).")
+    dump(pipe, os.path.join(args.results_dir, "modelo_multilabel_rf.joblib"))
+    treino["linhas"] = resumo["linhas_vistas"]
+    treino["atualizacoes"] = list(treino.get("atualizacoes", [])) + [{
+        "arquivo": os.path.basename(args.novos), "linhas": int(len(X_up)),
+        "em": time.strftime("%Y-%m-%dT%H:%M:%S"), "f1_macro_avaliacao": relatorio.get("depois", {}).get(
+            "f1_macro_limiares_bundle"),
+    }]
+    bundle_dir = salvar_bundle(os.path.join(args.results_dir, "modelo_bundle"), pipe, x_cols, ths,
+                               bundle.api_threshold if bundle is not None else 0.5,
+                               engine=engine, meta=treino,
+                               drift=bundle.drift_ref if bundle is not None else None)
+    print("[ok] Bundle: %s (motor %s) | atualização nº %d"
+          % (bundle_dir, "mmap" if engine is not None else "ausente", resumo["atualizacoes"]))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Atualização incremental do modelo com um lote novo.")
+    ap.add_argument("--novos", required=True, help="CSV com o lote novo (mesmo formato do treino).")
+    ap.add_argument("--model", default=BUNDLE if eh_bundle(BUNDLE) else JOBLIB,
+                    help="Bundle ou .joblib atual (padrão: results/modelo_bundle, se existir).")
+    ap.add_argument("--historico", default=None,
+                    help="CSV do treino original: ativa a comparação com re-treino completo.")
+    ap.add_argument("--holdout", type=float, default=0.2,
+                    help="Fração do lote reservada para medir o F1 (0 = usa tudo na atualização).")
+    ap.add_argument("--frac_arvores", type=float, default=0.2,
+                    help="RF: fração das árvores mais antigas trocadas por árvores do lote.")
+    ap.add_argument("--rodadas_xgb", type=int, default=50, help="XGB: rodadas de boosting adicionadas.")
+    ap.add_argument("--n_jobs", type=int, default=1)
+    ap.add_argument("--results_dir", default="results")
+    ap.add_argument("--so_relatorio", action="store_true", help="Só mede; não regrava o modelo.")
+    main(ap.parse_args())
@@ -0,0 +1,95 @@
+# Vazão das atribuições por caminho (contribuicoes_multilabel, motor compilado).
+# Para cada modelo e tamanho de lote mede, em ms por 1k linhas:
+# - predição sklearn (predict_proba_multilabel) e do motor, como referência de custo
+# - atribuições dos 5 rótulos para o lote inteiro
+# - atribuições linha a linha (amostra pequena, extrapolada), como faria um explicador genérico
+# e confere a aditividade: base + soma das contribuições = margem do motor.
+#
+# Uso:
+#   python -m benchmarks.atribuicoes --rows 50000 --lotes 1000,10000,100000 --models rf,xgb
+
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+
+from src.utils import LABELS, X_COLS, predict_proba_multilabel, contribuicoes_multilabel
+from src.tree_engine import exportar
+from benchmarks.encoders import dados
+
+
+def _ms_por_mil(fn, n: int, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - t0)
+    return 1000.0 * float(np.median(tempos)) * 1000.0 / n
+
+
+def medir(model: str, df, lotes, amostra_linha: int, repeticoes: int, n_jobs: int) -> list:
+    from main import build_pipeline
+
+    cat_cols = ["tipo"]
+    pipe = build_pipeline(cat_cols, [c for c in X_COLS if c not in cat_cols], model_name=model,
+                          profile="fast", n_jobs=n_jobs)
+    pipe.fit(df[X_COLS], df[LABELS])
+    motor = exportar(pipe, LABELS)
+
+    um = df[X_COLS].head(amostra_linha)
+    linha_ms = _ms_por_mil(lambda: [motor.contribuicoes(um.iloc[i:i + 1]) for i in range(len(um))],
+                           len(um), 1)
+    res = []
+    for n in lotes:
+        X = df[X_COLS].sample(n, replace=n > len(df), random_state=0).reset_index(drop=True)
+        base, contrib, _ = contribuicoes_multilabel(motor, X, LABELS)
+        erro = float(np.abs(base + contrib.sum(axis=1) - motor.predict_margin(motor.transform(X))).max())
+        lote_ms = _ms_por_mil(lambda: motor.contribuicoes(X), n, repeticoes)
+        res.append({
+            "modelo": model, "linhas": n, "arvores": int(len(motor.roots)),
+            "predicao_sklearn_ms": round(_ms_por_mil(lambda: predict_proba_multilabel(pipe, X, len(LABELS)),
+                                                     n, repeticoes), 2),
+            "predicao_motor_ms": round(_ms_por_mil(lambda: motor.predict_proba(X), n, repeticoes), 2),
+            "atribuicoes_ms": round(lote_ms, 2),
+            "linha_a_linha_ms": round(linha_ms, 1),
+            "speedup_vs_linha": round(linha_ms / lote_ms, 1),
+            "erro_aditividade": erro,
+        })
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description="ms por 1k linhas das atribuições por caminho (lote x linha a linha).")
+    ap.add_argument("--rows", type=int, default=50_000, help="Linhas sintéticas de treino.")
+    ap.add_argument("--lotes", default="1000,10000,100000")
+    ap.add_argument("--models", default="rf,xgb")
+    ap.add_argument("--amostra_linha", type=int, default=50, help="Linhas no modo linha a linha.")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--n_jobs", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=os.path.join("results", "bench_atribuicoes.json"))
+    args = ap.parse_args()
+
+    df = dados(args.rows, 1000, seed=args.seed)
+    lotes = [int(n) for n in args.lotes.split(",")]
+    res = []
+    print("%-8s %8s %8s %12s %12s %12s %12s %9s %10s" % (
+        "modelo", "linhas", "árvores", "pred skl", "pred motor", "atribuições", "linha/linha", "speedup", "erro adit."))
+    for model in args.models.split(","):
+        for r in medir(model, df, lotes, args.amostra_linha, args.repeat, args.n_jobs):
+            res.append(r)
+            print("%-8s %8d %8d %12.2f %12.2f %12.2f %12.1f %8.1fx %10.1e" % (
+                r["modelo"], r["linhas"], r["arvores"], r["predicao_sklearn_ms"], r["predicao_motor_ms"],
+                r["atribuicoes_ms"], r["linha_a_linha_ms"], r["speedup_vs_linha"], r["erro_aditividade"]))
+    print("(tempos em ms por 1k linhas)")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"rows": args.rows, "resultados": res}, f, indent=2)
+    print("[ok] Resultado salvo em %s" % args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Benchmark de carga do modelo: .joblib (unpickle completo) vs bundle (motor via mmap).
+# - Carga a frio: cada medida roda num subprocesso novo (import + carga + 1ª predição)
+# - Memória por worker: N processos carregam o modelo ao mesmo tempo e pontuam um lote;
+#   RSS conta páginas compartilhadas em cada processo, PSS as divide entre eles
+#   (PSS vem de /proc/self/smaps_rollup; só Linux)
+#
+# Uso:
+#   python -m benchmarks.bundle --test data/bootcamp_test.csv --workers 4
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+import numpy as np
+
+
+def _memoria_mb() -> dict:
+    out = {}
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            for linha in f:
+                k, v = linha.split(":", 1)
+                if k in ("Rss", "Pss"):
+                    out[k.lower() + "_mb"] = int(v.split()[0]) / 1024
+    except OSError:
+        pass
+    return out
+
+
+def _worker(modelo: str, test: str, linhas: int, espera_s: float) -> dict:
+    """Roda no subprocesso: carrega, pontua e mede (espera para coexistir com os outros)."""
+    import pandas as pd
+
+    from src.utils import LABELS, X_COLS, predict_proba_multilabel
+    from src.bundle import carregar_bundle, eh_bundle
+
+    X = pd.read_csv(test, nrows=linhas)
+    t0 = time.perf_counter()
+    if eh_bundle(modelo):
+        m = carregar_bundle(modelo)
+        carga = time.perf_counter() - t0
+        m.predict_proba(X[m.x_cols])
+    else:
+        from joblib import load
+        m = load(modelo)
+        carga = time.perf_counter() - t0
+        predict_proba_multilabel(m, X[X_COLS], len(LABELS))
+    total = time.perf_counter() - t0
+    time.sleep(espera_s)  # todos os workers vivos ao mesmo tempo na medida de PSS
+    return {"carga_s": carga, "carga_predicao_s": total, **_memoria_mb()}
+
+
+def medir(modelo: str, test: str, workers: int, linhas: int, repeticoes: int) -> dict:
+    cmd = [sys.executable, "-m", "benchmarks.bundle", "--_worker", modelo, "--test", test,
+           "--linhas", str(linhas)]
+    frio = []
+    for _ in range(repeticoes):
+        out = subprocess.run(cmd + ["--_espera", "0"], capture_output=True, text=True, check=True)
+        frio.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    procs = [subprocess.Popen(cmd + ["--_espera", "2"], stdout=subprocess.PIPE, text=True)
+             for _ in range(workers)]
+    paralelos = [json.loads(p.communicate()[0].strip().splitlines()[-1]) for p in procs]
+    res = {
+        "carga_s": float(np.median([r["carga_s"] for r in frio])),
+        "carga_predicao_s": float(np.median([r["carga_predicao_s"] for r in frio])),
+        "workers": workers,
+    }
+    for k in ("rss_mb", "pss_mb"):
+        if all(k in r for r in paralelos):
+            res[k + "_por_worker"] = float(np.mean([r[k] for r in paralelos]))
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Carga a frio e memória por worker: .joblib vs bundle.")
+    ap.add_argument("--joblib", default=os.path.join("results", "modelo_multilabel_rf.joblib"))
+    ap.add_argument("--bundle", default=os.path.join("results", "modelo_bundle"))
+    ap.add_argument("--test", default="data/bootcamp_test.csv")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--linhas", type=int, default=1000, help="Linhas pontuadas por worker.")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", default=os.path.join("results", "bench_bundle.json"))
+    ap.add_argument("--_worker", default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--_espera", type=float, default=0.0, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args._worker:
+        print(json.dumps(_worker(args._worker, args.test, args.linhas, args._espera)))
+        return
+
+    res = {nome: medir(path, args.test, args.workers, args.linhas, args.repeat)
+           for nome, path in (("joblib", args.joblib), ("bundle", args.bundle))}
+    print("%-8s %10s %15s %14s %14s" % ("formato", "carga (s)", "carga+pred (s)", "RSS/worker MB", "PSS/worker MB"))
+    for nome, r in res.items():
+        print("%-8s %10.3f %15.3f %14.1f %14.1f" % (
+            nome, r["carga_s"], r["carga_predicao_s"], r.get("rss_mb_por_worker", float("nan")),
+            r.get("pss_mb_por_worker", float("nan"))))
+    j, b = res["joblib"], res["bundle"]
+    print("Carga a frio: %.1fx mais rápida com o bundle" % (j["carga_s"] / max(b["carga_s"], 1e-9)))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(res, f, indent=2)
+    print("[ok] Resultado salvo em %s" % args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Compara dois JSONs do benchmarks.executar e sinaliza regressões.
+# Uma medida regride quando fica mais de --tol (relativo) E mais de --min_ms
+# (absoluto) acima da referência; o código de saída é 1 se houver regressão.
+#
+# Uso:
+#   python -m benchmarks.comparar results/bench/base.json results/bench/novo.json --tol 0.10
+
+import sys
+import json
+import argparse
+
+
+def carregar(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        dados = json.load(f)
+    return {r["chave"]: r for r in dados["resultados"]}, dados.get("config", {}), dados.get("ambiente", {})
+
+
+def comparar(base: dict, novo: dict, tol: float = 0.10, min_ms: float = 1.0) -> list:
+    linhas = []
+    for chave in sorted(set(base) | set(novo)):
+        a, b = base.get(chave), novo.get(chave)
+        if a is None or b is None:
+            linhas.append({"chave": chave, "status": "só base" if b is None else "só novo"})
+            continue
+        ta, tb = a["segundos"], b["segundos"]
+        razao = tb / ta if ta > 0 else float("inf")
+        delta_ms = (tb - ta) * 1000.0
+        if razao > 1 + tol and delta_ms > min_ms:
+            status = "REGRESSÃO"
+        elif razao < 1 / (1 + tol) and -delta_ms > min_ms:
+            status = "melhora"
+        else:
+            status = "ok"
+        linhas.append({"chave": chave, "base_s": ta, "novo_s": tb, "razao": razao, "status": status})
+    return linhas
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compara duas execuções de benchmarks e sinaliza regressões.")
+    ap.add_argument("base", help="JSON de referência.")
+    ap.add_argument("novo", help="JSON a comparar.")
+    ap.add_argument("--tol", type=float, default=0.10, help="Tolerância relativa (0.10 = 10%%).")
+    ap.add_argument("--min_ms", type=float, default=1.0, help="Diferença absoluta mínima para sinalizar (ms).")
+    args = ap.parse_args()
+
+    base, cfg_a, amb_a = carregar(args.base)
+    novo, cfg_b, amb_b = carregar(args.novo)
+    if cfg_a != cfg_b:
+        print("[aviso] Configurações diferentes entre as execuções; compare com cautela.")
+    if (amb_a.get("cpus"), amb_a.get("plataforma")) != (amb_b.get("cpus"), amb_b.get("plataforma")):
+        print("[aviso] Ambientes diferentes (CPUs/plataforma).")
+
+    linhas = comparar(base, novo, args.tol, args.min_ms)
+    print("%-36s %11s %11s %8s  %s" % ("caso", "base (s)", "novo (s)", "razão", "status"))
+    for r in linhas:
+        if "razao" in r:
+            print("%-36s %11.4f %11.4f %7.2fx  %s" % (r["chave"], r["base_s"], r["novo_s"], r["razao"], r["status"]))
+        else:
+            print("%-36s %11s %11s %8s  %s" % (r["chave"], "-", "-", "-", r["status"]))
+
+    regressoes = [r for r in linhas if r["status"] == "REGRESSÃO"]
+    if regressoes:
+        print("[erro] %d regressão(ões) acima de %.0f%%." % (len(regressoes), 100 * args.tol))
+        return 1
+    print("[ok] Sem regressões acima de %.0f%%." % (100 * args.tol))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+# Benchmark das codificações de id_produto (--use_id --id_encoding ...).
+# Para cada nº de produtos e cada estratégia (onehot, hash, frequencia, target) mede:
+# largura da matriz do prep, tempo e pico de memória (tracemalloc) do ajuste,
+# tamanho do modelo serializado e F1-macro (limiares ajustados) num hold-out.
+# Os dados sintéticos ganham um efeito de produto: uma fração de produtos "defeituosos"
+# tem taxa maior de FDF/FA, para que o id carregue sinal.
+#
+# Uso:
+#   python -m benchmarks.encoders --rows 50000 --produtos 100,1000,10000,50000
+
+import io
+import os
+import json
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+from joblib import dump
+from sklearn.model_selection import train_test_split
+
+from src.utils import LABELS, X_COLS, to_binary, predict_proba_multilabel, choose_best_thresholds
+from src.encoders import ESTRATEGIAS
+from benchmarks.sintetico import gerar
+
+
+def dados(rows: int, n_produtos: int, frac_defeituosos: float = 0.05, seed: int = 0):
+    df = gerar(rows, seed=seed, n_produtos=n_produtos)
+    for c in LABELS:
+        df[c] = to_binary(df[c])
+    rng = np.random.default_rng(seed + 1)
+    prods = df["id_produto"].unique()
+    ruins = rng.choice(prods, max(1, int(frac_defeituosos * len(prods))), replace=False)
+    ruim = df["id_produto"].isin(ruins).to_numpy()
+    for lab, p in (("FDF", 0.15), ("FA", 0.10)):
+        v = df[lab].to_numpy(copy=True)
+        v[ruim & (rng.random(len(df)) < p)] = 1
+        df[lab] = v
+    for c in ("tipo", "id_produto"):
+        df[c] = df[c].astype("category")
+    return df
+
+
+def medir(df, estrategia: str, model: str, n_buckets: int, n_jobs: int) -> dict:
+    from main import build_pipeline
+
+    x_cols = ["id_produto"] + list(X_COLS)
+    X_tr, X_va, Y_tr, Y_va = train_test_split(df[x_cols], df[LABELS], test_size=0.2, random_state=42)
+    cat_cols = ["id_produto", "tipo"]
+    num_cols = [c for c in x_cols if c not in cat_cols]
+    pipe = build_pipeline(cat_cols, num_cols, model_name=model, profile="fast", n_jobs=n_jobs,
+                          id_encoding=estrategia, id_buckets=n_buckets)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    pipe.fit(X_tr, Y_tr)
+    fit_s = time.perf_counter() - t0
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    buf = io.BytesIO()
+    dump(pipe, buf)
+    proba = predict_proba_multilabel(pipe, X_va, len(LABELS))
+    _, f1s = choose_best_thresholds(Y_va.to_numpy(), proba)
+    return {
+        "largura": int(pipe.named_steps["prep"].transform(X_va.head(1)).shape[1]),
+        "fit_s": round(fit_s, 3), "pico_mb": round(pico / 2**20, 1),
+        "modelo_mb": round(len(buf.getvalue()) / 2**20, 2), "f1_macro": round(float(f1s.mean()), 4),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Largura, tempo de ajuste, memória e F1 por codificação de id_produto.")
+    ap.add_argument("--rows", type=int, default=50_000)
+    ap.add_argument("--produtos", default="100,1000,10000,50000", help="Nºs de produtos, separados por vírgula.")
+    ap.add_argument("--estrategias", default=",".join(ESTRATEGIAS))
+    ap.add_argument("--model", default="rf", choices=["rf", "rf_joint", "xgb"])
+    ap.add_argument("--buckets", type=int, default=64)
+    ap.add_argument("--n_jobs", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=os.path.join("results", "bench_encoders.json"))
+    args = ap.parse_args()
+
+    res = []
+    print("%9s %-11s %8s %9s %9s %10s %9s" % ("produtos", "codificação", "largura", "fit (s)",
+                                           "pico MB", "modelo MB", "F1-macro"))
+    for n_prod in (int(p) for p in args.produtos.split(",")):
+        df = dados(args.rows, n_prod, seed=args.seed)
+        for est in args.estrategias.split(","):
+            r = {"produtos": n_prod, "estrategia": est,
+                 **medir(df, est, args.model, args.buckets, args.n_jobs)}
+            res.append(r)
+            print("%9d %-11s %8d %9.2f %9.1f %10.2f %9.4f" % (
+                n_prod, est, r["largura"], r["fit_s"], r["pico_mb"], r["modelo_mb"], r["f1_macro"]))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"rows": args.rows, "model": args.model, "buckets": args.buckets, "resultados": res}, f, indent=2)
+    print("[ok] Resultado salvo em %s" % args.out)
+
+
+if __name__ == "__main__":
+    main()
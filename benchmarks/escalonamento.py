@@ -0,0 +1,89 @@
+# Escalonamento do treino de 1 a N núcleos (src/agendador.py).
+# Para cada orçamento de núcleos compara três divisões do mesmo fit (prep + 5 rótulos):
+# - sequencial: rótulos um após o outro, cada estimador com todos os núcleos (comportamento antigo)
+# - aninhado:   5 rótulos em paralelo E cada estimador com todos os núcleos (superinscrição)
+# - agendado:   planejar(): rótulos x threads <= núcleos
+# Reporta tempo de parede, speedup e eficiência contra o agendado com 1 núcleo.
+#
+# Uso:
+#   python -m benchmarks.escalonamento --rows 50000 --nucleos 1,2,4,8 --model rf
+
+import os
+import json
+import time
+import argparse
+
+from sklearn.model_selection import train_test_split
+
+from src.utils import LABELS, X_COLS
+from src.agendador import nucleos, planejar, contexto_rotulos
+from benchmarks.encoders import dados
+
+MODOS = ("sequencial", "aninhado", "agendado")
+
+
+def _plano(modo: str, c: int, joint: bool) -> dict:
+    if modo == "agendado":
+        return planejar(c, folds=1, rotulos=len(LABELS), joint=joint)
+    r = len(LABELS) if modo == "aninhado" and not joint else 1
+    return {"nucleos": c, "folds": 1, "rotulos": r, "threads": c, "por_fold": c}
+
+
+def medir(X, Y, model: str, modo: str, c: int, repeticoes: int) -> dict:
+    from main import build_pipeline
+
+    cat_cols = ["tipo"]
+    num_cols = [col for col in X.columns if col not in cat_cols]
+    plano = _plano(modo, c, model == "rf_joint")
+    tempos = []
+    for _ in range(repeticoes):
+        pipe = build_pipeline(cat_cols, num_cols, model_name=model, profile="fast",
+                              n_jobs=plano["threads"], n_jobs_rotulos=plano["rotulos"])
+        t0 = time.perf_counter()
+        with contexto_rotulos(plano):
+            pipe.fit(X, Y)
+        tempos.append(time.perf_counter() - t0)
+    return {"rotulos": plano["rotulos"], "threads": plano["threads"],
+            "threads_totais": plano["rotulos"] * plano["threads"], "fit_s": round(min(tempos), 3)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Tempo de treino de 1 a N núcleos: sequencial x aninhado x agendado.")
+    ap.add_argument("--rows", type=int, default=50_000)
+    ap.add_argument("--nucleos", default=None, help="Orçamentos separados por vírgula (padrão: 1, 2, 4, ... até todos).")
+    ap.add_argument("--model", default="rf", choices=["rf", "rf_joint", "xgb"])
+    ap.add_argument("--modos", default=",".join(MODOS))
+    ap.add_argument("--repeat", type=int, default=1, help="Repetições por medida (melhor tempo).")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=os.path.join("results", "bench_escalonamento.json"))
+    args = ap.parse_args()
+
+    total = nucleos(-1)
+    if args.nucleos:
+        lista = [int(c) for c in args.nucleos.split(",")]
+    else:
+        lista = sorted({min(2 ** i, total) for i in range(total.bit_length() + 1)})
+    df = dados(args.rows, 1000, seed=args.seed)
+    X, _, Y, _ = train_test_split(df[X_COLS], df[LABELS], test_size=0.2, random_state=42)
+
+    print("[ok] %d núcleos visíveis | %d linhas | modelo %s" % (total, len(X), args.model))
+    res = [{"nucleos": c, "modo": modo, **medir(X, Y, args.model, modo, c, args.repeat)}
+           for c in lista for modo in args.modos.split(",")]
+    # referência: agendado no menor orçamento, extrapolado para 1 núcleo se a lista não começar em 1
+    ref = next((r for r in res if r["modo"] == "agendado"), res[0])
+    base = ref["fit_s"] * ref["nucleos"]
+    print("%7s %-11s %8s %8s %9s %9s %11s" % ("núcleos", "modo", "rótulos", "threads", "fit (s)", "speedup", "eficiência"))
+    for r in res:
+        r["speedup"] = round(base / r["fit_s"], 2)
+        r["eficiencia"] = round(r["speedup"] / r["nucleos"], 2)
+        print("%7d %-11s %8d %8d %9.2f %8.2fx %10.0f%%" % (
+            r["nucleos"], r["modo"], r["rotulos"], r["threads"], r["fit_s"], r["speedup"], 100 * r["eficiencia"]))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"rows": args.rows, "model": args.model, "nucleos_visiveis": total, "resultados": res}, f, indent=2)
+    print("[ok] Resultado salvo em %s" % args.out)
+
+
+if __name__ == "__main__":
+    main()
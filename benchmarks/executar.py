@@ -0,0 +1,155 @@
+# Suíte de benchmarks de desempenho (treino e pontuação).
+# Para cada combinação --model/--profile mede, em dados sintéticos reprodutíveis:
+# - leitura + limpeza do CSV (carregar_treino)
+# - ajuste do build_pipeline
+# - predict_proba_multilabel em lotes de 1 até 1M linhas (mediana de repetições)
+# - montagem e gravação da submissão (curta + longa)
+# Saída em JSON (uma entrada por caso, chave estável) para o benchmarks.comparar.
+#
+# Uso:
+#   python -m benchmarks.executar --rows 200000 --out results/bench/base.json
+#   python -m benchmarks.executar --models rf,xgb --profiles fast --batches 1,1000,100000
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+from src.utils import LABELS, X_COLS, predict_proba_multilabel, montar_submissao, to_long_columns
+from benchmarks.sintetico import salvar_csv
+
+
+def _medir(fn, repeticoes=1):
+    """Mediana do tempo de parede de `repeticoes` chamadas (s) e o último retorno."""
+    tempos, out = [], None
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        out = fn()
+        tempos.append(time.perf_counter() - t0)
+    return float(np.median(tempos)), out
+
+
+def _ambiente() -> dict:
+    import sklearn
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(), "plataforma": platform.platform(),
+        "cpus": os.cpu_count(), "numpy": np.__version__, "pandas": pd.__version__,
+        "sklearn": sklearn.__version__, "commit": commit,
+        "quando": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def executar(rows=200_000, test_rows=None, models=("rf",), profiles=("fast",),
+             batches=(1, 100, 10_000, 1_000_000), repeat=5, n_jobs=-1, seed=0, workdir=None):
+    # import tardio: main.py define build_pipeline/carregar_treino
+    from main import build_pipeline, carregar_treino, HAS_XGB
+
+    test_rows = test_rows or max(batches)
+    tmp = workdir or tempfile.mkdtemp(prefix="bench_")
+    res = []
+
+    def registrar(chave, segundos, linhas=None, **extra):
+        r = {"chave": chave, "segundos": round(segundos, 6), **extra}
+        if linhas:
+            r["linhas"] = int(linhas)
+            r["us_por_linha"] = round(segundos / linhas * 1e6, 4)
+        res.append(r)
+        print("  %-36s %10.4fs%s" % (chave, segundos, "  (%.2f us/linha)" % r["us_por_linha"] if linhas else ""))
+
+    try:
+        train_csv, test_csv = os.path.join(tmp, "train.csv"), os.path.join(tmp, "test.csv")
+        print("Gerando dados sintéticos (%d treino, %d teste)..." % (rows, test_rows))
+        salvar_csv(train_csv, rows, seed=seed, rotulos_longos=True)
+        salvar_csv(test_csv, test_rows, seed=seed + 1000, com_rotulos=False)
+
+        t, df = _medir(lambda: carregar_treino(train_csv), repeat)
+        registrar("carga/treino", t, len(df))
+        t, df_test = _medir(lambda: pd.read_csv(test_csv), repeat)
+        registrar("carga/teste", t, len(df_test))
+
+        X, Y = df[X_COLS], df[LABELS]
+        cat_cols = X.select_dtypes(include=["object", "category"]).columns.tolist()
+        num_cols = [c for c in X.columns if c not in cat_cols]
+        X_test = df_test[X_COLS]
+
+        for model in models:
+            if model == "xgb" and not HAS_XGB:
+                print("[aviso] xgboost não instalado; pulando --model xgb.")
+                continue
+            for profile in profiles:
+                base = "%s/%s" % (model, profile)
+                pipe = build_pipeline(cat_cols, num_cols, model_name=model, profile=profile, n_jobs=n_jobs)
+                t, _ = _medir(lambda: pipe.fit(X, Y))
+                registrar("fit/" + base, t, len(X))
+
+                for b in batches:
+                    if b > len(X_test):
+                        print("[aviso] lote %d > linhas de teste (%d); pulando." % (b, len(X_test)))
+                        continue
+                    Xb = X_test.iloc[:b]
+                    # lotes pequenos: mais repetições para estabilizar a mediana
+                    rep = repeat if b >= 10_000 else max(repeat, 20)
+                    t, proba = _medir(lambda: predict_proba_multilabel(pipe, Xb, len(LABELS)), rep)
+                    registrar("predict/%s/lote=%d" % (base, b), t, b)
+
+                proba = predict_proba_multilabel(pipe, X_test, len(LABELS))
+                out_short, out_long = os.path.join(tmp, "sub.csv"), os.path.join(tmp, "sub_long.csv")
+
+                def escrever():
+                    subm = montar_submissao(df_test["id"].values, proba)
+                    subm.to_csv(out_short, index=False)
+                    to_long_columns(subm).to_csv(out_long, index=False)
+
+                t, _ = _medir(escrever, repeat)
+                registrar("submissao/" + base, t, len(X_test))
+    finally:
+        if workdir is None:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmarks de treino e pontuação (JSON).")
+    ap.add_argument("--rows", type=int, default=200_000, help="Linhas de treino sintéticas.")
+    ap.add_argument("--test_rows", type=int, default=None, help="Linhas de teste (default: maior lote).")
+    ap.add_argument("--models", default="rf,rf_joint,xgb")
+    ap.add_argument("--profiles", default="fast,full")
+    ap.add_argument("--batches", default="1,10,100,1000,10000,100000,1000000",
+                    help="Tamanhos de lote do predict, separados por vírgula.")
+    ap.add_argument("--repeat", type=int, default=5, help="Repetições por medida (mediana).")
+    ap.add_argument("--n_jobs", type=int, default=-1)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=os.path.join("results", "bench", "bench_%s.json" % time.strftime("%Y%m%d_%H%M%S")))
+    args = ap.parse_args()
+
+    batches = sorted(int(b) for b in args.batches.split(","))
+    config = {
+        "rows": args.rows, "test_rows": args.test_rows or max(batches), "models": args.models.split(","),
+        "profiles": args.profiles.split(","), "batches": batches, "repeat": args.repeat,
+        "n_jobs": args.n_jobs, "seed": args.seed,
+    }
+    res = executar(rows=args.rows, test_rows=args.test_rows, models=config["models"],
+                   profiles=config["profiles"], batches=batches, repeat=args.repeat,
+                   n_jobs=args.n_jobs, seed=args.seed)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"ambiente": _ambiente(), "config": config, "resultados": res}, f, indent=2)
+    print("[ok] %d medidas salvas em %s" % (len(res), args.out))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+# Benchmark da limpeza do treino: versão anterior (cópias + laço por coluna)
+# vs. carregar_treino atual (dtypes na leitura + correção em passada única).
+# Cada variante roda em um subprocesso próprio para que o pico de RSS seja isolado.
+#
+# Uso:
+#   python -m benchmarks.limpeza --rows 1000000
+#   python -m benchmarks.limpeza --csv data/bootcamp_train.csv
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.utils import LABELS, rename_label_columns
+
+
+# --- implementação anterior (referência) ---
+def _to_binary_legado(series: pd.Series) -> pd.Series:
+    s = pd.to_numeric(series, errors='coerce').fillna(0)
+    return s.clip(lower=0, upper=1).astype(int)
+
+
+def _corrigir_negativos_legado(df: pd.DataFrame, excluir=None) -> pd.DataFrame:
+    df = df.copy()
+    excluir = set(excluir or [])
+    for c in df.select_dtypes(include=[np.number]).columns:
+        if c in excluir:
+            continue
+        mask = df[c] < 0
+        if mask.any():
+            mediana = df.loc[~mask, c].median() if (~mask).any() else 0
+            df.loc[mask, c] = mediana
+    return df
+
+
+def carregar_treino_legado(train_path: str) -> pd.DataFrame:
+    df = pd.read_csv(train_path)
+    df = rename_label_columns(df)
+    if "id" in df.columns:
+        df = df.drop_duplicates(subset=["id"]).reset_index(drop=True)
+    for c in LABELS:
+        df[c] = _to_binary_legado(df[c])
+    if "falha_maquina" in df.columns:
+        df["falha_maquina"] = (df[LABELS].sum(axis=1) > 0).astype(int)
+    return _corrigir_negativos_legado(df, excluir=LABELS)
+
+
+def _carregador(variante: str):
+    if variante == "legado":
+        return carregar_treino_legado
+    from main import carregar_treino
+    return carregar_treino
+
+
+def _pico_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / 1024 if sys.platform != "darwin" else kb / 1024 ** 2
+
+
+def _executar(variante: str, csv: str) -> dict:
+    """Roda no subprocesso: mede tempo, pico de RSS e pico de alocações (tracemalloc)."""
+    fn = _carregador(variante)
+    rss0 = _pico_rss_mb()
+    t0 = time.perf_counter()
+    df = fn(csv)
+    dt = time.perf_counter() - t0
+    rss = _pico_rss_mb()
+    # segunda passada só para o tracemalloc (ele mesmo distorce o tempo)
+    del df
+    tracemalloc.start()
+    df = fn(csv)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "variante": variante,
+        "linhas": int(len(df)),
+        "tempo_s": round(dt, 4),
+        "pico_rss_mb": round(rss, 1),
+        "rss_base_mb": round(rss0, 1),
+        "pico_alocado_mb": round(pico / 1024 ** 2, 1),
+        "frame_mb": round(df.memory_usage(deep=True).sum() / 1024 ** 2, 1),
+    }
+
+
+def _em_subprocesso(variante: str, csv: str) -> dict:
+    cmd = [sys.executable, "-m", "benchmarks.limpeza", "--_run", variante, "--csv", csv]
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _conferir(csv: str):
+    """As duas versões devem produzir os mesmos valores (a menos de float32)."""
+    a, b = carregar_treino_legado(csv), _carregador("atual")(csv)
+    assert list(a.columns) == list(b.columns), "colunas diferentes"
+    for c in a.columns:
+        if pd.api.types.is_numeric_dtype(a[c]):
+            np.testing.assert_allclose(a[c].to_numpy(float), b[c].to_numpy(float), rtol=1e-6, equal_nan=True)
+        else:
+            assert (a[c].astype(str).to_numpy() == b[c].astype(str).to_numpy()).all(), c
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark da limpeza (legado vs atual).")
+    ap.add_argument("--csv", default=None, help="CSV de treino (default: gera sintético).")
+    ap.add_argument("--rows", type=int, default=1_000_000, help="Linhas do CSV sintético.")
+    ap.add_argument("--out", default=os.path.join("results", "bench_limpeza.json"))
+    ap.add_argument("--_run", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args._run:
+        print(json.dumps(_executar(args._run, args.csv)))
+        return
+
+    tmp = None
+    csv = args.csv
+    if csv is None:
+        tmp = tempfile.mkdtemp(prefix="bench_limpeza_")
+        csv = os.path.join(tmp, "train.csv")
+        print(f"Gerando {args.rows} linhas sintéticas...")
+        # em subprocesso: no Linux o ru_maxrss do pai é herdado pelos filhos
+        subprocess.run([sys.executable, "-m", "benchmarks.sintetico", "--rows", str(args.rows),
+                        "--out", csv, "--long"], check=True, capture_output=True)
+    try:
+        res = [_em_subprocesso(v, csv) for v in ("legado", "atual")]
+        _conferir(csv)  # depois das medições, pelo mesmo motivo
+        print("[ok] Saídas equivalentes (legado vs atual)")
+    finally:
+        if tmp:
+            import shutil
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    leg, atu = res
+    print(f"{'variante':<8} {'tempo (s)':>10} {'pico RSS (MB)':>14} {'+ sobre base':>13} "
+          f"{'alocado (MB)':>13} {'frame (MB)':>11}")
+    for r in res:
+        print(f"{r['variante']:<8} {r['tempo_s']:>10.2f} {r['pico_rss_mb']:>14.1f} "
+              f"{r['pico_rss_mb'] - r['rss_base_mb']:>13.1f} "
+              f"{r['pico_alocado_mb']:>13.1f} {r['frame_mb']:>11.1f}")
+    print(f"Ganho: {leg['tempo_s'] / max(atu['tempo_s'], 1e-9):.2f}x tempo | "
+          f"{leg['pico_alocado_mb'] / max(atu['pico_alocado_mb'], 1e-9):.2f}x memória alocada")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"csv": args.csv or f"sintetico({args.rows})", "resultados": res}, f, indent=2)
+    print(f"[ok] Resultado salvo em {args.out}")
+
+
+if __name__ == "__main__":
+    main()
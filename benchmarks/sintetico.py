@@ -0,0 +1,90 @@
+# Gerador de dados sintéticos no mesmo esquema do bootcamp_train.csv / bootcamp_test.csv.
+# Vetorizado (sem laços por linha) para gerar milhões de linhas; gravação em blocos.
+#
+# Uso:
+#   python -m benchmarks.sintetico --rows 1000000 --out data/sintetico_train.csv
+#   python -m benchmarks.sintetico --rows 200000 --out data/sintetico_test.csv --test
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.utils import LABELS, LONG_MAP
+
+TIPOS = np.array(["L", "M", "H"])
+# rótulos chegam "sujos" no CSV original; to_binary transforma isso em 0
+RUIDO_ROTULO = np.array(["N", "Não", "não", "False", "Sim"])
+
+
+def gerar(n: int, seed: int = 0, start_id: int = 0, n_produtos: int = 10000,
+          com_rotulos: bool = True, frac_nan: float = 0.02, frac_neg: float = 0.005,
+          rotulos_longos: bool = False) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    tipo = TIPOS[rng.choice(3, n, p=[0.6, 0.3, 0.1])]
+    prod = rng.integers(0, n_produtos, n)
+    df = pd.DataFrame({
+        "id": np.arange(start_id, start_id + n),
+        "id_produto": np.char.add(tipo, (10000 + prod).astype(str)),
+        "tipo": tipo,
+        "temperatura_ar": rng.normal(300.0, 2.0, n),
+        "temperatura_processo": rng.normal(310.0, 1.5, n),
+        "umidade_relativa": np.full(n, 90.0),
+        "velocidade_rotacional": rng.normal(1540.0, 180.0, n),
+        "torque": rng.normal(40.0, 10.0, n),
+        "desgaste_da_ferramenta": rng.uniform(0.0, 250.0, n),
+    })
+    for c in ["temperatura_ar", "temperatura_processo", "velocidade_rotacional",
+              "torque", "desgaste_da_ferramenta"]:
+        v = df[c].to_numpy(copy=True)
+        v[rng.random(n) < frac_nan] = np.nan
+        v[rng.random(n) < frac_neg] = -36.0
+        df[c] = v
+    if not com_rotulos:
+        return df
+
+    ar, proc = df["temperatura_ar"].fillna(300.0), df["temperatura_processo"].fillna(310.0)
+    torque, rot = df["torque"].fillna(40.0), df["velocidade_rotacional"].fillna(1540.0)
+    desg = df["desgaste_da_ferramenta"].fillna(0.0)
+    y = {
+        "FDF": (desg > 240) & (rng.random(n) < 0.5),
+        "FDC": ((proc - ar) < 8.6) & (rot < 1380),
+        "FP": (torque * rot * 2 * np.pi / 60 > 9000) | (torque * rot * 2 * np.pi / 60 < 3500),
+        "FTE": (desg * torque > 11000) & (rng.random(n) < 0.8),
+        "FA": rng.random(n) < 0.002,
+    }
+    falha = np.zeros(n, dtype=bool)
+    for lab in LABELS:
+        v = np.asarray(y[lab])
+        falha |= v
+        col = v.astype(int).astype(object)
+        sujo = rng.random(n) < 0.01
+        col[sujo & ~v] = RUIDO_ROTULO[rng.integers(0, len(RUIDO_ROTULO), sujo.sum())][~v[sujo]]
+        df[LONG_MAP[lab] if rotulos_longos else lab] = col
+    df.insert(df.columns.get_loc("desgaste_da_ferramenta") + 1, "falha_maquina",
+              np.where(falha, "sim", "não"))
+    return df
+
+
+def salvar_csv(path: str, n: int, chunk: int = 500_000, seed: int = 0, **kw) -> str:
+    """Grava n linhas em blocos (memória limitada ao tamanho do bloco)."""
+    for i, start in enumerate(range(0, n, chunk)):
+        m = min(chunk, n - start)
+        gerar(m, seed=seed + i, start_id=start, **kw).to_csv(
+            path, mode="w" if i == 0 else "a", header=(i == 0), index=False
+        )
+    return path
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Gera CSV sintético no esquema do bootcamp.")
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--out", default="data/sintetico_train.csv")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--n_produtos", type=int, default=10000)
+    ap.add_argument("--test", action="store_true", help="Sem colunas de rótulo (formato de teste).")
+    ap.add_argument("--long", action="store_true", help="Rótulos com nomes longos.")
+    args = ap.parse_args()
+    salvar_csv(args.out, args.rows, seed=args.seed, n_produtos=args.n_produtos,
+               com_rotulos=not args.test, rotulos_longos=args.long)
+    print(f"[ok] {args.rows} linhas em {args.out}")
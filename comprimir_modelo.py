@@ -0,0 +1,176 @@
+# comprimir_modelo.py
+# Comprime o modelo treinado para caber num orçamento (árvores, nós ou µs/linha no motor
+# compilado) e reporta o F1-macro perdido no limiar ajustado ao lado do ganho em
+# velocidade e tamanho (ver src/compressao.py).
+# - --dados: CSV rotulado FORA do treino (ex.: um lote novo), em três partes: seleção
+#   (escolhe as árvores, treina o aluno e ajusta os limiares), validação (escolhe a
+#   estratégia) e avaliação (só reporta o F1 de cada modelo)
+# - --extra: CSV sem rótulos (ex.: o teste) usado só como entrada da destilação
+# - Grava um bundle separado (padrão results/modelo_bundle_comprimido), utilizável com
+#   serve.py / score_stream.py --model
+#
+# Uso:
+#   python comprimir_modelo.py --dados data/lote_novo.csv --max_us_linha 20
+#   python comprimir_modelo.py --dados data/lote_novo.csv --extra data/bootcamp_test.csv \
+#       --max_arvores 100 --estrategia destilacao
+
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+from joblib import load
+from sklearn.model_selection import train_test_split
+
+from main import carregar_treino, assert_required_columns
+from src.utils import LABELS, X_COLS, FoldEnsemble, predict_proba_multilabel, choose_best_thresholds
+from src.bundle import carregar_bundle, eh_bundle, salvar_bundle
+from src.tree_engine import exportar, verificar
+from src.compressao import selecao, destilacao, medir, cabe, ajustar_ao_orcamento
+
+BUNDLE = os.path.join("results", "modelo_bundle")
+JOBLIB = os.path.join("results", "modelo_multilabel_rf.joblib")
+
+
+def _f1_macro(y, proba, ths) -> float:
+    pred = proba >= np.asarray(ths)
+    tp = (pred & (y == 1)).sum(axis=0)
+    fp = (pred & (y == 0)).sum(axis=0)
+    fn = (~pred & (y == 1)).sum(axis=0)
+    den = 2 * tp + fp + fn
+    return float(np.where(den > 0, 2 * tp / np.maximum(den, 1), 0.0).mean())
+
+
+def _avaliar(pipe, X_sel, Y_sel, *partes):
+    """Limiares ajustados na parte de seleção; F1-macro em cada (X, Y) de `partes`."""
+    ths, _ = choose_best_thresholds(Y_sel, predict_proba_multilabel(pipe, X_sel, len(LABELS)))
+    return (ths, *[_f1_macro(Y, predict_proba_multilabel(pipe, X, len(LABELS)), ths) for X, Y in partes])
+
+
+def main(args):
+    orcamento = {"max_arvores": args.max_arvores, "max_nos": args.max_nos, "max_us_linha": args.max_us_linha}
+    if all(v is None for v in orcamento.values()):
+        print("[erro] Informe ao menos um orçamento: --max_arvores, --max_nos ou --max_us_linha.", file=sys.stderr)
+        sys.exit(1)
+    if not os.path.exists(args.model):
+        print(f"[erro] Modelo não encontrado: {args.model}", file=sys.stderr)
+        sys.exit(1)
+    bundle = carregar_bundle(args.model) if eh_bundle(args.model) else None
+    pipe = bundle.pipeline if bundle is not None else load(args.model)
+    if isinstance(pipe, FoldEnsemble):
+        print("[erro] Ensemble de folds não suportado; treine com --cv_final refit.", file=sys.stderr)
+        sys.exit(1)
+    x_cols = bundle.x_cols if bundle is not None else list(X_COLS)
+
+    print("[1/4] Carregando dados de seleção/avaliação...")
+    df = carregar_treino(args.dados)
+    assert_required_columns(df, x_cols, "dados")
+    X_sel, X_ev, Y_sel, Y_ev = train_test_split(df[x_cols], df[LABELS].to_numpy(),
+                                                test_size=args.frac_avaliacao, random_state=42)
+    # validação à parte: o F1 na seleção é otimista (árvores, aluno e limiares saem dela)
+    X_sel, X_val, Y_sel, Y_val = train_test_split(X_sel, Y_sel, test_size=args.frac_validacao,
+                                                  random_state=42)
+    X_lat = X_ev.head(args.linhas_latencia)
+
+    try:
+        base = medir(pipe, LABELS, X_lat)
+    except NotImplementedError as e:  # orçamento medido no motor compilado
+        print(f"[erro] Modelo não compilável: {e}", file=sys.stderr)
+        sys.exit(1)
+    _, base["f1_macro"] = _avaliar(pipe, X_sel, Y_sel, (X_ev, Y_ev))
+    print("Original: %d árvores | %d nós | %.1f us/linha | F1-macro %.4f"
+          % (base["arvores"], base["nos"], base["us_linha"], base["f1_macro"]))
+    if cabe(base, orcamento):
+        print("[aviso] O modelo original já cabe no orçamento.")
+
+    k_teto = args.max_arvores or 10**9
+    candidatos = {}
+    if args.estrategia in ("auto", "selecao"):
+        print("[2/4] Seleção de árvores...")
+        construir, k_max = selecao(pipe, X_sel, Y_sel, min(k_teto, 10**4))
+        candidatos["selecao"] = ajustar_ao_orcamento(construir, k_max, orcamento, LABELS, X_lat)
+    if args.estrategia in ("auto", "destilacao"):
+        print("[3/4] Destilação em XGB raso (profundidade %d)..." % args.destilar_profundidade)
+        X_ref = X_sel
+        if args.extra:
+            extra = pd.read_csv(args.extra, nrows=args.max_linhas_extra)
+            X_ref = pd.concat([X_sel, extra[x_cols]], ignore_index=True)
+        try:
+            construir, k_max = destilacao(pipe, X_ref, len(LABELS), rodadas=args.destilar_rodadas,
+                                          profundidade=args.destilar_profundidade, n_jobs=args.n_jobs)
+            candidatos["destilacao"] = ajustar_ao_orcamento(construir, k_max, orcamento, LABELS, X_lat)
+        except ImportError:
+            print("[aviso] xgboost não instalado: destilação pulada.")
+
+    relatorio = {"orcamento": orcamento, "original": base, "estrategias": {}}
+    escolhido = None
+    for nome, res in candidatos.items():
+        if res is None:
+            print("[aviso] %s: nenhum modelo cabe no orçamento." % nome)
+            relatorio["estrategias"][nome] = None
+            continue
+        k, modelo, m = res
+        ths, m["f1_validacao"], m["f1_macro"] = _avaliar(modelo, X_sel, Y_sel, (X_val, Y_val), (X_ev, Y_ev))
+        m["k"] = k
+        relatorio["estrategias"][nome] = m
+        # escolhe pelo F1 na validação (a de avaliação só reporta)
+        if escolhido is None or m["f1_validacao"] > escolhido[0]:
+            escolhido = (m["f1_validacao"], nome, modelo, ths, m)
+    if escolhido is None:
+        print("[erro] Nenhuma estratégia atingiu o orçamento.", file=sys.stderr)
+        sys.exit(1)
+
+    print("\n%-12s %8s %9s %9s %11s %10s" % ("modelo", "árvores", "nós", "MB", "us/linha", "F1-macro"))
+    for nome, m in [("original", base)] + [(n, m) for n, m in relatorio["estrategias"].items() if m]:
+        print("%-12s %8d %9d %9.2f %11.2f %10.4f" % (nome, m["arvores"], m["nos"], m["mb_motor"],
+                                                    m["us_linha"], m["f1_macro"]))
+    _, nome, modelo, ths, m = escolhido
+    relatorio["escolhido"] = nome
+    relatorio["troca"] = {
+        "f1_perdido": round(base["f1_macro"] - m["f1_macro"], 4),
+        "aceleracao": round(base["us_linha"] / max(m["us_linha"], 1e-9), 2),
+        "reducao_tamanho": round(base["mb_motor"] / max(m["mb_motor"], 1e-9), 2),
+    }
+    print("Escolhido: %s | F1 perdido %+.4f | %.1fx mais rápido | %.1fx menor" % (
+        nome, relatorio["troca"]["f1_perdido"], relatorio["troca"]["aceleracao"],
+        relatorio["troca"]["reducao_tamanho"]))
+
+    print("\n[4/4] Salvando...")
+    engine = exportar(modelo, LABELS)
+    verificar(modelo, engine, X_lat, atol=1e-5)
+    treino = dict(bundle.manifest.get("treino", {})) if bundle is not None else {}
+    treino["compressao"] = {"estrategia": nome, "k": m["k"], "orcamento": orcamento,
+                            "origem": os.path.abspath(args.model), **relatorio["troca"]}
+    out = salvar_bundle(args.out, modelo, x_cols, ths,
+                        bundle.api_threshold if bundle is not None else 0.5, engine=engine, meta=treino,
+                        drift=bundle.drift_ref if bundle is not None else None)
+    os.makedirs(args.results_dir, exist_ok=True)
+    path_rel = os.path.join(args.results_dir, "compressao_relatorio.json")
+    with open(path_rel, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print("[ok] Bundle comprimido: %s | relatório: %s" % (out, path_rel))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Compressão do modelo para um orçamento de árvores/nós/latência.")
+    ap.add_argument("--model", default=BUNDLE if eh_bundle(BUNDLE) else JOBLIB,
+                    help="Bundle ou .joblib treinado (padrão: results/modelo_bundle, se existir).")
+    ap.add_argument("--dados", required=True, help="CSV rotulado fora do treino (seleção + avaliação).")
+    ap.add_argument("--extra", default=None, help="CSV sem rótulos para a destilação (ex.: o teste).")
+    ap.add_argument("--max_linhas_extra", type=int, default=50_000)
+    ap.add_argument("--frac_avaliacao", type=float, default=0.5)
+    ap.add_argument("--frac_validacao", type=float, default=0.4,
+                    help="Fração do restante (após a avaliação) que escolhe a estratégia.")
+    ap.add_argument("--max_arvores", type=int, default=None, help="Máximo de árvores (todos os rótulos).")
+    ap.add_argument("--max_nos", type=int, default=None, help="Máximo de nós (todos os rótulos).")
+    ap.add_argument("--max_us_linha", type=float, default=None, help="Máximo de µs/linha no motor compilado.")
+    ap.add_argument("--estrategia", default="auto", choices=["auto", "selecao", "destilacao"])
+    ap.add_argument("--destilar_rodadas", type=int, default=200, help="Teto de rodadas do aluno.")
+    ap.add_argument("--destilar_profundidade", type=int, default=4)
+    ap.add_argument("--linhas_latencia", type=int, default=2000, help="Linhas usadas para medir µs/linha.")
+    ap.add_argument("--n_jobs", type=int, default=1)
+    ap.add_argument("--out", default=os.path.join("results", "modelo_bundle_comprimido"))
+    ap.add_argument("--results_dir", default="results")
+    main(ap.parse_args())
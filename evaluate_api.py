@@ -2,16 +2,28 @@
 # Avaliação do CSV de submissão na API do Bootcamp CDIA.
 # - Lê token via --token ou variável de ambiente BOOTCAMP_API_TOKEN
 # - Aceita CSV com nomes longos (recomendado) ou curtos (com --auto-map)
+# - Aceita também o .npy binário do main.py --formato_saida npy (src/predicoes.py):
+#   lido via mmap e renderizado com nomes longos direto no envio, sem parsing de texto
 # - Salva métricas em JSON e (opcional) gera gráfico de F1 por classe
+# - Modo offline (--local-labels): mesmas métricas calculadas localmente (src/metricas.py),
+#   inclusive varredura de vários limiares (--thresholds) sem rede
+# - Varredura na API (vários --csv e/ou --thresholds): requisições concorrentes numa
+#   sessão com pool de conexões, retry com backoff e cache em disco das respostas
+#   (chave = hash do conteúdo enviado + limiar + URL base); ver api_local.py para testes
 
 import os
 import sys
 import json
+import hashlib
 import argparse
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Dependências opcionais só usadas quando necessário
 try:
@@ -24,7 +36,8 @@ try:
 except Exception:
     plt = None
 
-API_BASE = "http://34.193.187.218:5000"
+API_BASE = os.getenv("BOOTCAMP_API_BASE", "http://34.193.187.218:5000")
+CACHE_DIR = os.path.join("results", ".api_cache")
 
 SHORT2LONG = {
     "FDF": "FDF (Falha Desgaste Ferramenta)",
@@ -50,6 +63,13 @@ def _prepare_csv_for_upload(csv_path: str, auto_map: bool) -> Tuple[str, Optiona
     Se auto_map=True e o CSV estiver com colunas curtas, cria um arquivo temporário renomeado.
     Retorna (path_para_upload, path_temp_ou_None).
     """
+    if csv_path.endswith(".npy"):
+        from src.predicoes import carregar_predicoes, exportar_csv
+        fd, tmp_path = tempfile.mkstemp(prefix="subm_long_", suffix=".csv")
+        os.close(fd)
+        exportar_csv(tmp_path, carregar_predicoes(csv_path), longo=True)
+        return tmp_path, tmp_path
+
     if not auto_map:
         return csv_path, None
 
@@ -82,18 +102,126 @@ def _prepare_csv_for_upload(csv_path: str, auto_map: bool) -> Tuple[str, Optiona
     return tmp_path, tmp_path
 
 
-def _post_evaluate(csv_path: str, threshold: float, token: str, timeout: int = 90) -> requests.Response:
-    """Envia o CSV para o endpoint de avaliação."""
-    url = f"{API_BASE}/evaluate/multilabel_metrics"
+def _post_evaluate(csv_path: str, threshold: float, token: str, timeout: int = 90,
+                   session: requests.Session = None, api_base: str = None,
+                   data: bytes = None) -> requests.Response:
+    """Envia o CSV (ou o conteúdo já lido em `data`) para o endpoint de avaliação."""
+    url = f"{api_base or API_BASE}/evaluate/multilabel_metrics"
     headers = {"X-API-Key": token}
     params = {"threshold": float(threshold)}
+    post = session.post if session is not None else requests.post
 
+    if data is not None:
+        files = {"file": (os.path.basename(csv_path), data, "text/csv")}
+        return post(url, headers=headers, params=params, files=files, timeout=timeout)
     with open(csv_path, "rb") as f:
         files = {"file": (os.path.basename(csv_path), f, "text/csv")}
-        resp = requests.post(url, headers=headers, params=params, files=files, timeout=timeout)
+        resp = post(url, headers=headers, params=params, files=files, timeout=timeout)
     return resp
 
 
+def _sessao(concorrencia: int, tentativas: int = 5, backoff: float = 0.5) -> requests.Session:
+    """Sessão com pool de conexões do tamanho da concorrência e retry exponencial."""
+    retry = Retry(total=tentativas, backoff_factor=backoff, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(["POST"]), respect_retry_after_header=True,
+                  raise_on_status=False)  # esgotado o retry, a última resposta cai no tratamento de status
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, concorrencia), max_retries=retry)
+    s = requests.Session()
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
+
+
+def _conteudo_upload(csv_path: str, auto_map: bool) -> bytes:
+    """Bytes a enviar; com auto_map, renomeia curtos -> longos em memória (sem arquivo temporário)."""
+    if csv_path.endswith(".npy"):
+        from src.predicoes import carregar_predicoes, csv_bytes
+        return csv_bytes(carregar_predicoes(csv_path), longo=True)
+    with open(csv_path, "rb") as f:
+        data = f.read()
+    if not auto_map or pd is None:
+        return data
+    import io
+    df = pd.read_csv(io.BytesIO(data))
+    if not any(c in LABELS for c in df.columns):
+        return data
+    return df.rename(columns=SHORT2LONG).to_csv(index=False).encode("utf-8")
+
+
+class RespostaCache:
+    """Respostas 200 em disco: results/.api_cache/<sha256(conteúdo, limiar, base)>.json."""
+
+    def __init__(self, root: str = CACHE_DIR, enabled: bool = True):
+        self.root = root
+        self.enabled = enabled
+        if enabled:
+            os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def chave(digest: str, threshold: float, api_base: str) -> str:
+        return hashlib.sha256(f"{digest}|{float(threshold)!r}|{api_base}".encode("utf-8")).hexdigest()
+
+    def get(self, chave: str):
+        path = os.path.join(self.root, chave + ".json")
+        if not (self.enabled and os.path.exists(path)):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def put(self, chave: str, metrics: dict):
+        if not self.enabled:
+            return
+        path = os.path.join(self.root, chave + ".json")
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(metrics, f)
+        os.replace(tmp, path)  # atômico: threads concorrentes não veem arquivo parcial
+
+
+def _varredura_api(csvs: list, thresholds: list, token: str, api_base: str, auto_map: bool,
+                   concorrencia: int = 4, cache: RespostaCache = None, timeout: int = 90) -> list:
+    """
+    Avalia todos os pares (csv, limiar) na API com no máximo `concorrencia` requisições
+    em voo. Cada CSV é lido (e mapeado) uma única vez. Retorna uma linha por par.
+    """
+    conteudos = {}
+    for c in csvs:
+        data = _conteudo_upload(c, auto_map)
+        conteudos[c] = (data, hashlib.sha256(data).hexdigest())
+    sessao = _sessao(concorrencia)
+    lock = threading.Lock()
+    feitos = [0]
+    total = len(csvs) * len(thresholds)
+
+    def avaliar(csv_path, th):
+        data, digest = conteudos[csv_path]
+        chave = RespostaCache.chave(digest, th, api_base)
+        metrics = cache.get(chave) if cache else None
+        origem = "cache"
+        status = 200
+        if metrics is None:
+            origem = "api"
+            try:
+                resp = _post_evaluate(csv_path, th, token, timeout, session=sessao, api_base=api_base, data=data)
+                status = resp.status_code
+                metrics = resp.json() if status == 200 else None
+            except (requests.RequestException, ValueError) as e:
+                status, metrics = None, {"erro": str(e)}
+            if status == 200 and cache:
+                cache.put(chave, metrics)
+        with lock:
+            feitos[0] += 1
+            print(f"  [{feitos[0]}/{total}] {os.path.basename(csv_path)} @ {th:g}: {status} ({origem})")
+        return {"csv": csv_path, "threshold": th, "status": status, "origem": origem, "metrics": metrics}
+
+    pares = [(c, t) for c in csvs for t in thresholds]
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concorrencia)) as ex:
+            return list(ex.map(lambda p: avaliar(*p), pares))
+    finally:
+        sessao.close()
+
+
 def _save_metrics_json(metrics: dict, out_path: str) -> None:
     _ensure_dirs(out_path)
     with open(out_path, "w", encoding="utf-8") as w:
@@ -124,10 +252,71 @@ def _save_f1_plot(metrics: dict, out_png: str) -> None:
     print(f"[ok] Gráfico salvo em: {out_png}")
 
 
+def _default_threshold(path: str = os.path.join("results", "best_threshold.txt"), default: float = 0.30) -> float:
+    """Limiar único salvo pelo main.py (a submissão já vem alinhada a ele)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return float(f.read().strip())
+    except Exception:
+        return default
+
+
+def _parse_thresholds(spec: str) -> list:
+    """'0.1,0.2,0.5' ou 'inicio:fim:passo' (fim incluso)."""
+    if ":" in spec:
+        a, b, passo = (float(x) for x in spec.split(":"))
+        n = int(round((b - a) / passo)) + 1
+        return [round(a + i * passo, 10) for i in range(n)]
+    return [float(x) for x in spec.split(",") if x.strip()]
+
+
+def _avaliar_local(args, thresholds: list) -> dict:
+    """Calcula o payload da API localmente; com vários limiares, salva a varredura e devolve o melhor."""
+    import time
+    import numpy as np
+    from src.metricas import carregar_rotulos, alinhar_submissao, metricas_varios_limiares
+
+    if args.csv.endswith(".npy"):
+        from src.predicoes import carregar_predicoes, como_dataframe
+        subm = como_dataframe(carregar_predicoes(args.csv))
+    else:
+        subm = pd.read_csv(args.csv)
+    y, proba = alinhar_submissao(subm, carregar_rotulos(args.local_labels))
+    t0 = time.perf_counter()
+    payloads = metricas_varios_limiares(y, proba, thresholds)
+    dt = (time.perf_counter() - t0) * 1000.0
+    if len(payloads) == 1:
+        print(f"[ok] Métricas locais em {dt:.1f} ms ({len(y)} linhas)")
+        return payloads[0]
+
+    f1_macro = np.array([np.mean(m["f1_score"]) for m in payloads])
+    print(f"[ok] {len(thresholds)} limiares avaliados localmente em {dt:.1f} ms ({len(y)} linhas)")
+    print("limiar   F1-macro  macro_acc")
+    for t, f, m in zip(thresholds, f1_macro, payloads):
+        print(f"{t:6.3f}   {f:8.4f}  {m['macro_accuracy']:9.4f}")
+    i = int(np.argmax(f1_macro))
+    print(f"[ok] Melhor limiar: {thresholds[i]} (F1-macro = {f1_macro[i]:.4f})")
+
+    root, ext = os.path.splitext(args.save_json)
+    sweep_path = f"{root}_sweep{ext or '.json'}"
+    _ensure_dirs(sweep_path)
+    with open(sweep_path, "w", encoding="utf-8") as w:
+        json.dump({
+            "thresholds": thresholds, "f1_macro": f1_macro.tolist(),
+            "macro_accuracy": [m["macro_accuracy"] for m in payloads],
+            "f1_score": [m["f1_score"] for m in payloads],
+            "confusion_matrix": [m["confusion_matrix"] for m in payloads],
+        }, w, indent=2)
+    print(f"[ok] Varredura salva em: {sweep_path}")
+    return dict(payloads[i], threshold=thresholds[i])
+
+
 def main():
     ap = argparse.ArgumentParser(description="Avaliar submissão na API do Bootcamp CDIA.")
-    ap.add_argument("--csv", required=True, help="Caminho do CSV de submissão (preferir nomes longos).")
-    ap.add_argument("--threshold", type=float, default=0.30, help="Limiar de decisão (default: 0.30).")
+    ap.add_argument("--csv", required=True, nargs="+",
+                    help="CSV(s) de submissão (preferir nomes longos) ou .npy do main; vários arquivos = varredura.")
+    ap.add_argument("--threshold", type=float, default=_default_threshold(),
+                    help="Limiar de decisão (default: results/best_threshold.txt ou 0.30).")
     ap.add_argument("--token", default=os.getenv("BOOTCAMP_API_TOKEN", ""), help="Token da API (ou defina BOOTCAMP_API_TOKEN).")
     ap.add_argument("--auto-map", action="store_true",
                     help="Se seu CSV tiver colunas curtas (FDF/FDC/...), renomeia para longas em um arquivo temporário.")
@@ -135,17 +324,76 @@ def main():
                     help="Caminho para salvar o JSON de métricas (default: results/api_metrics_cli.json).")
     ap.add_argument("--save-plot", action="store_true",
                     help="Gera gráfico de F1 por classe em results/plots/api_f1_por_classe_cli.png.")
+    ap.add_argument("--local-labels", default=None,
+                    help="CSV local com 'id' + rótulos: calcula as métricas offline (sem API/token).")
+    ap.add_argument("--thresholds", default=None,
+                    help="Vários limiares para varredura: '0.1,0.3,0.5' ou 'inicio:fim:passo'.")
+    ap.add_argument("--api-base", default=API_BASE,
+                    help="URL base da API (default: BOOTCAMP_API_BASE ou o servidor do Bootcamp).")
+    ap.add_argument("--concurrency", type=int, default=4, help="Requisições simultâneas na varredura.")
+    ap.add_argument("--no-cache", action="store_true", help="Ignora o cache de respostas em disco.")
     args = ap.parse_args()
 
+    if args.local_labels:
+        if len(args.csv) > 1:
+            print("[erro] --local-labels aceita um único --csv.", file=sys.stderr)
+            sys.exit(1)
+        args.csv = args.csv[0]
+        if pd is None:
+            print("[erro] pandas é necessário para --local-labels.", file=sys.stderr)
+            sys.exit(1)
+        thresholds = _parse_thresholds(args.thresholds) if args.thresholds else [args.threshold]
+        try:
+            metrics = _avaliar_local(args, thresholds)
+        except ValueError as e:
+            print(f"[erro] {e}", file=sys.stderr)
+            sys.exit(1)
+        if len(thresholds) == 1:
+            print(json.dumps(metrics, indent=2, ensure_ascii=False))
+        _save_metrics_json(metrics, args.save_json)
+        if args.save_plot:
+            _save_f1_plot(metrics, os.path.join("results", "plots", "api_f1_por_classe_cli.png"))
+        sys.exit(0)
+
     if not args.token:
         print("Defina o token via --token ou variável de ambiente BOOTCAMP_API_TOKEN.", file=sys.stderr)
         sys.exit(1)
 
+    if args.thresholds or len(args.csv) > 1:
+        thresholds = _parse_thresholds(args.thresholds) if args.thresholds else [args.threshold]
+        cache = RespostaCache(enabled=not args.no_cache)
+        print(f"Varredura: {len(args.csv)} arquivo(s) x {len(thresholds)} limiar(es), "
+              f"concorrência {args.concurrency} -> {args.api_base}")
+        linhas = _varredura_api(args.csv, thresholds, args.token, args.api_base, args.auto_map,
+                                args.concurrency, cache)
+        ok = [l for l in linhas if l["status"] == 200]
+        print(f"{'arquivo':<36} {'limiar':>7} {'F1-macro':>9} {'origem':>7}")
+        for l in ok:
+            f1 = sum(l["metrics"]["f1_score"]) / len(l["metrics"]["f1_score"])
+            l["f1_macro"] = f1
+            print(f"{os.path.basename(l['csv']):<36} {l['threshold']:7.3f} {f1:9.4f} {l['origem']:>7}")
+        root, ext = os.path.splitext(args.save_json)
+        sweep_path = f"{root}_sweep{ext or '.json'}"
+        _ensure_dirs(sweep_path)
+        with open(sweep_path, "w", encoding="utf-8") as w:
+            json.dump(linhas, w, indent=2, ensure_ascii=False)
+        print(f"[ok] Varredura salva em: {sweep_path}")
+        if not ok:
+            sys.exit(1)
+        melhor = max(ok, key=lambda l: l["f1_macro"])
+        print(f"[ok] Melhor: {melhor['csv']} @ {melhor['threshold']} (F1-macro = {melhor['f1_macro']:.4f})")
+        _save_metrics_json(dict(melhor["metrics"], threshold=melhor["threshold"]), args.save_json)
+        if args.save_plot:
+            _save_f1_plot(melhor["metrics"], os.path.join("results", "plots", "api_f1_por_classe_cli.png"))
+        sys.exit(0 if len(ok) == len(linhas) else 1)
+
+    args.csv = args.csv[0]
     # Prepara CSV (auto-map se necessário)
     path_to_send, tmp_to_cleanup = _prepare_csv_for_upload(args.csv, args.auto_map)
 
     try:
-        resp = _post_evaluate(path_to_send, args.threshold, args.token)
+        with _sessao(1) as sessao:  # retry com backoff também na avaliação única
+            resp = _post_evaluate(path_to_send, args.threshold, args.token, session=sessao, api_base=args.api_base)
     finally:
         # limpa arquivo temporário, se criado
         if tmp_to_cleanup and os.path.exists(tmp_to_cleanup):
@@ -1,22 +1,35 @@
+import io
 import os
+import json
+import time
 import argparse
 import numpy as np
 import pandas as pd
-from joblib import dump
+from joblib import dump, Parallel, delayed
 
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, StratifiedKFold
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.multioutput import MultiOutputClassifier
 from sklearn.impute import SimpleImputer
-from sklearn.metrics import f1_score, classification_report
+from sklearn.metrics import classification_report
 
 from src.utils import (
-    LABELS, rename_label_columns, to_binary, corrigir_negativos,
-    predict_proba_multilabel, to_long_columns
+    LABELS, LONG_MAP, X_COLS, dtypes_leitura, to_binary, corrigir_negativos,
+    predict_proba_multilabel, montar_submissao, to_long_columns,
+    choose_best_thresholds, alinhar_limiares, save_thresholds, FoldEnsemble
 )
+from src.tree_engine import exportar, verificar
+from src.cache import DataCache, carregar_com_cache, fit_pipeline
+from src.busca import successive_halving
+from src.bundle import salvar_bundle
+from src.encoders import ESTRATEGIAS, codificador
+from src.drift import referencia, salvar_referencia, MonitorDrift
+from src.predicoes import salvar_predicoes
+from src.agendador import planejar, descrever, contexto_rotulos, contexto_folds, nucleos, MultiOutputRotulos
+from src import perf
+from src.perf import etapa
 
 # Tentar importar XGBoost
 try:
@@ -39,28 +52,36 @@ def assert_required_columns(df: pd.DataFrame, cols: list, df_name: str):
         )
 
 def carregar_treino(train_path: str) -> pd.DataFrame:
-    df = pd.read_csv(train_path)
-    df = rename_label_columns(df)  # rótulos longos -> curtos
+    # dtypes compactos já na leitura: sensores float32, tipo/id_produto category
+    df = pd.read_csv(train_path, dtype=dtypes_leitura())
+    df.rename(columns={v: k for k, v in LONG_MAP.items()}, inplace=True)  # rótulos longos -> curtos, sem cópia
     assert_required_columns(df, LABELS, "train")
     if "id" in df.columns:
-        df = df.drop_duplicates(subset=["id"]).reset_index(drop=True)
+        dup = df["id"].duplicated()
+        if dup.any():  # só copia quando há duplicados
+            df = df.loc[~dup].reset_index(drop=True)
     for c in LABELS:
-        df[c] = to_binary(df[c])
+        df[c] = to_binary(df[c])  # uint8
     if "falha_maquina" in df.columns:
-        df["falha_maquina"] = (df[LABELS].sum(axis=1) > 0).astype(int)
-    df = corrigir_negativos(df, excluir=LABELS)
-    return df
+        df["falha_maquina"] = df[LABELS].to_numpy().any(axis=1).astype(np.uint8)
+    return corrigir_negativos(df, excluir=LABELS)
 
-def build_pipeline(cat_cols, num_cols, model_name="rf", profile="fast"):
+def build_pipeline(cat_cols, num_cols, model_name="rf", profile="fast", n_jobs=-1, params=None,
+                   id_encoding="onehot", id_buckets=64, n_jobs_rotulos=1):
     num_pipe = Pipeline([("imputer", SimpleImputer(strategy="median"))])
     cat_pipe = Pipeline([
         ("imputer", SimpleImputer(strategy="most_frequent")),
         ("ohe", OneHotEncoder(handle_unknown="ignore"))
     ])
-    preprocess = ColumnTransformer(
-        transformers=[("num", num_pipe, num_cols), ("cat", cat_pipe, cat_cols)],
-        remainder="drop"
-    )
+    transformers = [("num", num_pipe, num_cols)]
+    id_enc = codificador(id_encoding, id_buckets) if "id_produto" in cat_cols else None
+    if id_enc is not None:
+        # id_produto fora do one-hot: largura fixa, independente do nº de produtos
+        cat_cols = [c for c in cat_cols if c != "id_produto"]
+    transformers.append(("cat", cat_pipe, cat_cols))
+    if id_enc is not None:
+        transformers.append(("id", id_enc, ["id_produto"]))
+    preprocess = ColumnTransformer(transformers=transformers, remainder="drop")
 
     if model_name == "xgb":
         if not HAS_XGB:
@@ -71,56 +92,177 @@ def build_pipeline(cat_cols, num_cols, model_name="rf", profile="fast"):
                 n_estimators=500, max_depth=6, learning_rate=0.03,
                 subsample=0.9, colsample_bytree=0.9,
                 objective="binary:logistic", tree_method="hist",
-                reg_lambda=1.0, n_jobs=-1, random_state=42, eval_metric="logloss"
+                reg_lambda=1.0, n_jobs=n_jobs, random_state=42, eval_metric="logloss"
             )
         else:  # fast
             base = XGBClassifier(
                 n_estimators=250, max_depth=4, learning_rate=0.05,
                 subsample=0.8, colsample_bytree=0.8,
                 objective="binary:logistic", tree_method="hist",
-                reg_lambda=1.0, n_jobs=-1, random_state=42, eval_metric="logloss"
+                reg_lambda=1.0, n_jobs=n_jobs, random_state=42, eval_metric="logloss"
             )
     else:
-        # perfis para RF
+        # perfis para RF (mesmos hiperparâmetros para rf e rf_joint)
         if profile == "full":
             base = RandomForestClassifier(
                 n_estimators=400, min_samples_leaf=1,
-                class_weight="balanced", n_jobs=-1, random_state=42
+                class_weight="balanced", n_jobs=n_jobs, random_state=42
             )
         else:  # fast
             base = RandomForestClassifier(
                 n_estimators=150, min_samples_leaf=5,
-                class_weight="balanced", n_jobs=-1, random_state=42
+                class_weight="balanced", n_jobs=n_jobs, random_state=42
             )
 
-    clf = Pipeline([("prep", preprocess), ("clf", MultiOutputClassifier(base))])
+    if params:
+        # hiperparâmetros vindos da busca (--profile search) sobre a base do perfil fast
+        base.set_params(**params)
+
+    if model_name == "rf_joint":
+        # uma única floresta multi-saída nativa cobrindo todos os LABELS
+        return Pipeline([("prep", preprocess), ("clf", base)])
+
+    # n_jobs_rotulos > 1: rótulos ajustados ao mesmo tempo (ver src/agendador.py)
+    clf = Pipeline([("prep", preprocess), ("clf", MultiOutputRotulos(base, n_jobs=n_jobs_rotulos))])
     return clf
 
-def choose_best_threshold(y_true: np.ndarray, y_proba: np.ndarray):
-    thresholds = np.arange(0.30, 0.71, 0.05)
-    best_th, best_f1 = 0.30, -1.0
-    for th in thresholds:
-        y_pred = (y_proba >= th).astype(int)
-        f1_mac = f1_score(y_true, y_pred, average="macro", zero_division=0)
-        if f1_mac > best_f1:
-            best_th, best_f1 = float(th), float(f1_mac)
-    return best_th, best_f1
+def _fit_fold(pipe, X, Y, cache=None, data_key=None, plano=None):
+    with contexto_rotulos(plano):
+        return fit_pipeline(pipe, X, Y, cache, data_key)
+
+def treinar_cv(cat_cols, num_cols, X, Y, model_name="rf", profile="fast", k=5, n_jobs=1,
+               cache=None, data_key=None, params=None, codif=None):
+    """
+    Treina os K folds em paralelo dentro de um orçamento global de núcleos
+    (folds simultâneos x rótulos simultâneos x threads por estimador <= n_jobs)
+    e devolve as probabilidades out-of-fold para ajustar os limiares.
+    """
+    # estratifica por "alguma falha" para espalhar os raros entre os folds
+    skf = StratifiedKFold(n_splits=k, shuffle=True, random_state=42)
+    folds = list(skf.split(X, Y.values.any(axis=1)))
+    plano = planejar(n_jobs, folds=k, rotulos=len(LABELS), joint=model_name == "rf_joint")
+    print("  Agendador: " + descrever(plano))
+    with contexto_folds(plano):
+        modelos = Parallel(n_jobs=plano["folds"])(
+            delayed(_fit_fold)(
+                build_pipeline(cat_cols, num_cols, model_name=model_name, profile=profile,
+                               n_jobs=plano["threads"], n_jobs_rotulos=plano["rotulos"],
+                               params=params, **(codif or {})),
+                X.iloc[tr], Y.iloc[tr], cache, data_key, plano,
+            )
+            for tr, _ in folds
+        )
+    oof = np.zeros(Y.shape, dtype=np.float64)
+    for m, (_, va) in zip(modelos, folds):
+        oof[va] = predict_proba_multilabel(m, X.iloc[va], len(LABELS))
+    return modelos, oof, folds
+
+def registrar_tempo(results_dir, modo, segundos, config):
+    """
+    Guarda o tempo de treino por modo em results/tempos_treino.json, agrupado pela configuração
+    (modelo, perfil, dados, linhas, núcleos...); a comparação só usa execuções da mesma configuração.
+    """
+    path = os.path.join(results_dir, "tempos_treino.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            tempos = json.load(f)
+    except Exception:
+        tempos = {}
+    tempos = {k: v for k, v in tempos.items() if isinstance(v, dict)}  # formato antigo (só modo) é descartado
+    chave = "|".join("%s=%s" % (k, config[k]) for k in sorted(config))
+    grupo = tempos.setdefault(chave, {"config": config, "modos": {}})
+    grupo["modos"][modo] = round(float(segundos), 3)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(tempos, f, indent=2)
+    base = grupo["modos"].get("holdout+refit")
+    for m, t in grupo["modos"].items():
+        rel = " (%.2fx vs holdout+refit)" % (t / base) if base and m != "holdout+refit" else ""
+        print("  %-20s %8.2fs%s" % (m, t, rel))
+
+def comparar_wrapper_vs_joint(cat_cols, num_cols, X_train, Y_train, X_valid, Y_valid, profile="fast",
+                              codif=None):
+    """Treina rf (5 florestas) e rf_joint (1 floresta multi-saída) no mesmo split e compara custos."""
+    linhas = []
+    for nome in ["rf", "rf_joint"]:
+        pipe = build_pipeline(cat_cols, num_cols, model_name=nome, profile=profile, **(codif or {}))
+        t0 = time.perf_counter()
+        pipe.fit(X_train, Y_train)
+        fit_s = time.perf_counter() - t0
+
+        buf = io.BytesIO()
+        dump(pipe, buf)
+
+        t0 = time.perf_counter()
+        proba = predict_proba_multilabel(pipe, X_valid, len(LABELS))
+        lote_ms = (time.perf_counter() - t0) * 1000.0
+        lat = []
+        for i in range(min(50, len(X_valid))):
+            t0 = time.perf_counter()
+            predict_proba_multilabel(pipe, X_valid.iloc[[i]], len(LABELS))
+            lat.append((time.perf_counter() - t0) * 1000.0)
+
+        ths, f1s = choose_best_thresholds(Y_valid.values, proba)
+        linhas.append({
+            "modelo": nome, "fit_s": fit_s, "tamanho_mb": len(buf.getvalue()) / 1e6,
+            "lote_ms": lote_ms, "linha_ms_p50": float(np.median(lat)),
+            "thresholds": ths.tolist(), "f1_macro": float(f1s.mean()),
+        })
+    return linhas
+
+def buscar_hiperparametros(cat_cols, num_cols, X, Y, args, n_jobs, results_dir):
+    """Successive halving no split 80/20 do hold-out; grava a fronteira de Pareto e devolve os params."""
+    print("[busca] Successive halving (%s | %d configs | %.0fs | %d núcleos)..."
+          % (args.model, args.busca_configs, args.busca_tempo, n_jobs))
+    X_tr, X_va, Y_tr, Y_va = train_test_split(X, Y, test_size=0.2, random_state=42)
+
+    def construir(params, inner):
+        return build_pipeline(cat_cols, num_cols, model_name=args.model, n_jobs=inner, params=params,
+                              id_encoding=args.id_encoding, id_buckets=args.id_buckets)
+
+    t0 = time.perf_counter()
+    melhor, historico, front = successive_halving(
+        construir, args.model, X_tr, Y_tr, X_va, Y_va,
+        n_configs=args.busca_configs, eta=args.busca_eta, tempo_max_s=args.busca_tempo, n_jobs=n_jobs,
+        peso_lat=args.busca_peso_lat, peso_tam=args.busca_peso_tam,
+    )
+    print("[busca] %d ensaios em %.1fs | fronteira de Pareto com %d configurações"
+          % (len(historico), time.perf_counter() - t0, len(front)))
+    for r in front:
+        print("  F1=%.4f  %7.1f us/linha  %7.2f MB  (%3.0f%% dos dados)  %s" % (
+            r["f1_macro"], r["us_por_linha"], r["tamanho_mb"], 100 * r["fracao"], r["params"]))
+    print("[busca] Escolhida: %s" % melhor)
+    with open(os.path.join(results_dir, "busca_pareto.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "modelo": args.model,
+            "objetivo": "f1_macro - %g*log10(us/linha) - %g*log10(MB)" % (args.busca_peso_lat, args.busca_peso_tam),
+            "escolhida": melhor, "pareto": front, "historico": historico,
+        }, f, indent=2)
+    return melhor
+
+def formatar_comparacao(linhas) -> str:
+    cab = "%-9s %9s %11s %10s %13s %9s" % ("modelo", "fit (s)", "tamanho MB", "lote (ms)", "1 linha (ms)", "F1-macro")
+    out = [cab, "-" * len(cab)]
+    for r in linhas:
+        out.append("%-9s %9.2f %11.2f %10.1f %13.2f %9.4f" % (
+            r["modelo"], r["fit_s"], r["tamanho_mb"], r["lote_ms"], r["linha_ms_p50"], r["f1_macro"]))
+    return "\n".join(out)
 
 def main(args):
     results_dir, _ = ensure_dirs()
+    if args.instrument:
+        perf.ativar()
     print("[1/7] Carregando treino...")
-    df = carregar_treino(args.train)
+    cache = DataCache(args.cache_dir, max_mb=args.cache_max_mb, enabled=not args.no_cache)
+    with etapa("carregar_treino"):
+        df, data_key = carregar_com_cache(
+            carregar_treino, args.train, cache, dtypes_leitura, to_binary, corrigir_negativos
+        )
 
     # por padrão NÃO usamos id_produto (alta cardinalidade). habilite com --use_id se quiser.
-    X_cols = [
-        "tipo",
-        "temperatura_ar",
-        "temperatura_processo",
-        "umidade_relativa",
-        "velocidade_rotacional",
-        "torque",
-        "desgaste_da_ferramenta",
-    ]
+    X_cols = list(X_COLS)
+    if args.id_encoding != "onehot" and not args.use_id:
+        print("[aviso] --id_encoding %s implica --use_id." % args.id_encoding)
+        args.use_id = True
     if args.use_id:
         X_cols = ["id_produto"] + X_cols
 
@@ -128,61 +270,214 @@ def main(args):
     X = df[X_cols].copy()
     Y = df[LABELS].copy()
 
-    cat_cols = X.select_dtypes(include=["object"]).columns.tolist()
+    cat_cols = X.select_dtypes(include=["object", "category"]).columns.tolist()
     num_cols = [c for c in X.columns if c not in cat_cols]
+    with etapa("drift/referencia"):
+        # esboços das entradas de treino para o monitor de drift (id_produto fica de fora: sem limite de categorias)
+        drift_ref = referencia(X, num_cols, [c for c in cat_cols if c != "id_produto"])
+        salvar_referencia(os.path.join(results_dir, "drift_referencia.json"), drift_ref)
 
-    print("[2/7] Split treino/val...")
-    X_train, X_valid, Y_train, Y_valid = train_test_split(
-        X, Y, test_size=0.2, random_state=42
-    )
+    n_jobs = nucleos(args.n_jobs)
+    codif = {"id_encoding": args.id_encoding, "id_buckets": args.id_buckets}
+    # sem CV: um fit por vez, com os rótulos em paralelo
+    plano = planejar(n_jobs, folds=1, rotulos=len(LABELS), joint=args.model == "rf_joint")
+    params = None
+    if args.profile == "search":
+        with etapa("busca"):
+            params = buscar_hiperparametros(cat_cols, num_cols, X, Y, args, n_jobs, results_dir)
+    t_treino = time.perf_counter()
+    if args.cv > 1:
+        print("[2/7] Validação cruzada (%d folds em paralelo, %d núcleos)..." % (args.cv, n_jobs))
+        print("[3/7] Montando pipeline (%s | %s) e treinando os folds..." % (args.model, args.profile))
+        with etapa("fit_cv", folds=args.cv):
+            modelos, Y_valid_proba, folds = treinar_cv(
+                cat_cols, num_cols, X, Y, model_name=args.model, profile=args.profile,
+                k=args.cv, n_jobs=n_jobs, cache=cache, data_key=data_key, params=params, codif=codif
+            )
+        Y_valid = Y  # limiares ajustados nas probabilidades out-of-fold
+        tr, va = folds[0]
+        X_train, X_valid, Y_train = X.iloc[tr], X.iloc[va], Y.iloc[tr]
+        Y_valid_fold = Y.iloc[va]
+    else:
+        print("[2/7] Split treino/val...")
+        X_train, X_valid, Y_train, Y_valid = train_test_split(
+            X, Y, test_size=0.2, random_state=42
+        )
+        Y_valid_fold = Y_valid
 
-    print("[3/7] Montando pipeline (%s | %s) e treinando..." % (args.model, args.profile))
-    clf = build_pipeline(cat_cols, num_cols, model_name=args.model, profile=args.profile)
-    clf.fit(X_train, Y_train)
+        print("[3/7] Montando pipeline (%s | %s) e treinando..." % (args.model, args.profile))
+        with etapa("build_pipeline"):
+            clf = build_pipeline(cat_cols, num_cols, model_name=args.model, profile=args.profile,
+                                 n_jobs=plano["threads"], n_jobs_rotulos=plano["rotulos"], params=params, **codif)
+        print("  Agendador: " + descrever(plano))
+        with etapa("fit_holdout", linhas=len(X_train)), contexto_rotulos(plano), \
+                perf.por_rotulo(LABELS, cpu=plano["rotulos"] <= 1):
+            fit_pipeline(clf, X_train, Y_train, cache, data_key)
+        with etapa("predict_proba_multilabel/valid", linhas=len(X_valid)):
+            Y_valid_proba = predict_proba_multilabel(clf, X_valid, len(LABELS))
 
-    print("[4/7] Ajustando limiar por F1-macro...")
-    Y_valid_proba = predict_proba_multilabel(clf, X_valid, len(LABELS))
-    best_th, best_f1 = choose_best_threshold(Y_valid.values, Y_valid_proba)
-    Y_pred_best = (Y_valid_proba >= best_th).astype(int)
+    print("[4/7] Ajustando limiar por rótulo (F1)...")
+    with etapa("choose_best_thresholds"):
+        best_ths, best_f1s = choose_best_thresholds(Y_valid.values, Y_valid_proba)
+    best_f1 = float(best_f1s.mean())  # F1-macro = média dos F1 por rótulo
+    Y_pred_best = (Y_valid_proba >= best_ths).astype(int)
     report = classification_report(
         Y_valid.values, Y_pred_best, target_names=LABELS, zero_division=0
     )
-    print("Melhor threshold: %.2f | F1-macro: %.4f" % (best_th, best_f1))
-    print("\n=== Classification Report (val) ===\n" + report)
+    print("Limiares: %s | F1-macro: %.4f" % (
+        ", ".join("%s=%.4f" % (lab, th) for lab, th in zip(LABELS, best_ths)), best_f1))
+    print("\n=== Classification Report (%s) ===\n" % ("out-of-fold" if args.cv > 1 else "val") + report)
+
+    if args.cv > 1 and args.cv_final == "ensemble":
+        print("[5/7] Usando os %d modelos dos folds como ensemble (sem re-treino)..." % args.cv)
+        clf = FoldEnsemble(modelos)
+        modo = "cv%d_ensemble" % args.cv
+    else:
+        print("[5/7] Re-treinando com 100% do treino...")
+        if args.cv > 1:
+            clf = build_pipeline(cat_cols, num_cols, model_name=args.model, profile=args.profile,
+                                 n_jobs=plano["threads"], n_jobs_rotulos=plano["rotulos"], params=params, **codif)
+        with etapa("fit_refit", linhas=len(X)), contexto_rotulos(plano), \
+                perf.por_rotulo(LABELS, cpu=plano["rotulos"] <= 1):
+            fit_pipeline(clf, X, Y, cache, data_key)
+        modo = "cv%d_refit" % args.cv if args.cv > 1 else "holdout+refit"
+    print("Tempo total de treino (%s):" % modo)
+    registrar_tempo(results_dir, modo, time.perf_counter() - t_treino, {
+        "modelo": args.model, "perfil": args.profile, "dados": data_key[:12], "linhas": int(len(X)),
+        "n_jobs": n_jobs, "id": args.id_encoding if args.use_id else "-"})
 
-    print("[5/7] Re-treinando com 100%% do treino...")
-    clf.fit(X, Y)
-    dump(clf, os.path.join(results_dir, "modelo_multilabel_rf.joblib"))  # nome mantido para simplicidade
+    if args.compare_joint:
+        print("Comparando MultiOutputClassifier(rf) vs floresta multi-saída (rf_joint)...")
+        comparacao = comparar_wrapper_vs_joint(
+            cat_cols, num_cols, X_train, Y_train, X_valid, Y_valid_fold, profile=args.profile, codif=codif
+        )
+        tabela = formatar_comparacao(comparacao)
+        print(tabela)
+        report += "\n=== rf vs rf_joint (val, perfil %s) ===\n%s\n" % (args.profile, tabela)
+        with open(os.path.join(results_dir, "comparacao_rf_joint.json"), "w", encoding="utf-8") as f:
+            json.dump(comparacao, f, indent=2)
+
+    with etapa("salvar_modelo"):
+        dump(clf, os.path.join(results_dir, "modelo_multilabel_rf.joblib"))  # nome mantido para simplicidade
+    save_thresholds(os.path.join(results_dir, "best_thresholds.json"), best_ths)
+    # a submissão é alinhada a este limiar único (ver alinhar_limiares)
     with open(os.path.join(results_dir, "best_threshold.txt"), "w") as f:
-        f.write(str(float(best_th)))
+        f.write(str(float(args.api_threshold)))
+    engine = None
+    if args.compile and isinstance(clf, FoldEnsemble):
+        print("[aviso] --compile ignorado: o motor compilado não suporta o ensemble de folds.")
+    elif args.compile:
+        try:
+            with etapa("compilar"):
+                engine = exportar(clf, LABELS)
+                diff = verificar(clf, engine, X_valid)
+                engine.save(os.path.join(results_dir, "modelo_compilado.npz"))
+            print("Motor compilado: %d árvores | max |diff| vs sklearn = %.2e" % (len(engine.roots), diff))
+        except (NotImplementedError, AssertionError) as e:  # ex.: --id_encoding hash/frequencia/target
+            print("[aviso] --compile ignorado: %s" % e)
+            engine = None
+
+    with etapa("bundle"):
+        if engine is None and not isinstance(clf, FoldEnsemble):
+            try:  # arrays do motor no bundle -> carga com mmap compartilhada entre workers
+                engine = exportar(clf, LABELS)
+                verificar(clf, engine, X_valid)
+            except (NotImplementedError, AssertionError) as e:
+                print("[aviso] Bundle sem motor compilado: %s" % e)
+                engine = None
+        bundle_dir = salvar_bundle(
+            os.path.join(results_dir, "modelo_bundle"), clf, X_cols, best_ths, args.api_threshold,
+            engine=engine, drift=drift_ref, meta={
+                "modelo": args.model, "perfil": args.profile, "params": params, "cv": args.cv,
+                "modo": modo, "linhas": int(len(X)), "arquivo": os.path.basename(args.train),
+                "id_encoding": args.id_encoding if args.use_id else None, "id_buckets": args.id_buckets,
+                "f1_macro_val": best_f1, "f1_val": {lab: float(f) for lab, f in zip(LABELS, best_f1s)},
+            },
+        )
+    print("Bundle: %s (motor %s)" % (bundle_dir, "mmap" if engine is not None else "ausente"))
 
     print("[6/7] Gerando submissões (teste)...")
-    df_test = pd.read_csv(args.test)
+    with etapa("carregar_teste"):
+        df_test = pd.read_csv(args.test)
     assert_required_columns(df_test, ["id"] + X_cols, "test")
     X_test = df_test[X_cols].copy()
-    proba_test = predict_proba_multilabel(clf, X_test, len(LABELS))
+    with etapa("predict_proba_multilabel/teste", linhas=len(X_test)):
+        proba_test = predict_proba_multilabel(clf, X_test, len(LABELS))
+    # limiares por rótulo -> limiar único da API (ordem/AUC preservadas)
+    proba_test = alinhar_limiares(proba_test, best_ths, args.api_threshold)
+    with etapa("drift/teste", linhas=len(X_test)):
+        # o teste também é um caminho de pontuação: PSI/KS vs treino ao lado da submissão
+        monitor = MonitorDrift(drift_ref)
+        monitor.atualizar(X_test)
+        with open(os.path.join(results_dir, "drift_relatorio.json"), "w", encoding="utf-8") as f:
+            json.dump(monitor.relatorio(), f, indent=2, ensure_ascii=False)
+    print("Drift do teste vs treino:\n" + monitor.tabela())
 
-    subm = pd.DataFrame(proba_test, columns=LABELS)
-    subm.insert(0, "id", df_test["id"].values)
-    for c in LABELS:
-        subm[c] = subm[c].round(6)
-    subm.to_csv(os.path.join(results_dir, "bootcamp_submission.csv"), index=False)
-
-    subm_long = to_long_columns(subm)
-    subm_long.to_csv(os.path.join(results_dir, "bootcamp_submission_long.csv"), index=False)
+    if args.formato_saida == "npy":
+        # id + float32 gravados uma vez; CSV curto/longo sob demanda (python -m src.predicoes)
+        with etapa("npy/submissao"):
+            path = salvar_predicoes(os.path.join(results_dir, "bootcamp_submission.npy"),
+                                    df_test["id"].values, proba_test)
+        print(f"Submissão binária: {path}")
+    else:
+        with etapa("csv/submissao"):
+            subm = montar_submissao(df_test["id"].values, proba_test)
+            subm.to_csv(os.path.join(results_dir, "bootcamp_submission.csv"), index=False)
+        with etapa("csv/submissao_long"):
+            subm_long = to_long_columns(subm)
+            subm_long.to_csv(os.path.join(results_dir, "bootcamp_submission_long.csv"), index=False)
 
     print("[7/7] Salvando relatório...")
     with open(os.path.join(results_dir, "relatorio_classificacao.txt"), "w", encoding="utf-8") as f:
         f.write(report)
 
+    if perf.ativo() is not None:
+        print("\n=== Perfil por etapa ===\n" + perf.ativo().tabela())
+        print("[ok] Perfil: %s | trace: %s" % perf.ativo().salvar(results_dir))
+
     print("\n Pronto! Artefatos em 'results/'.")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--train", default="data/bootcamp_train.csv")
     parser.add_argument("--test",  default="data/bootcamp_test.csv")
-    parser.add_argument("--model", default="rf", choices=["rf","xgb"], help="Modelo base")
-    parser.add_argument("--profile", default="fast", choices=["fast","full"], help="Perfil de treino")
-    parser.add_argument("--use_id", action="store_true", help="Inclui id_produto como feature (não recomendado)")
+    parser.add_argument("--model", default="rf", choices=["rf","rf_joint","xgb"],
+                        help="Modelo base (rf_joint = uma floresta multi-saída para os 5 rótulos)")
+    parser.add_argument("--profile", default="fast", choices=["fast","full","search"],
+                        help="Perfil de treino (search = busca com orçamento, ver --busca_*)")
+    parser.add_argument("--use_id", action="store_true",
+                        help="Inclui id_produto como feature (com one-hot não é recomendado; ver --id_encoding)")
+    parser.add_argument("--id_encoding", default="onehot", choices=list(ESTRATEGIAS),
+                        help="Codificação do id_produto: onehot (1 coluna/produto), hash, frequencia ou target (OOF)")
+    parser.add_argument("--id_buckets", type=int, default=64, help="Largura do --id_encoding hash")
+    parser.add_argument("--formato_saida", default="csv", choices=["csv", "npy"],
+                        help="csv: submissões curta e longa em texto; npy: id + float32 num .npy (CSV sob demanda)")
+    parser.add_argument("--compile", action="store_true",
+                        help="Exporta também o motor compilado (results/modelo_compilado.npz)")
+    parser.add_argument("--compare_joint", action="store_true",
+                        help="Compara rf (5 florestas) vs rf_joint: tempo de treino, tamanho, latência e F1")
+    parser.add_argument("--api_threshold", type=float, default=0.5,
+                        help="Limiar único da API; a submissão é alinhada a ele (best_threshold.txt)")
+    parser.add_argument("--cv", type=int, default=0,
+                        help="K-fold out-of-fold (K>1) no lugar do split 80/20 + re-treino")
+    parser.add_argument("--cv_final", default="ensemble", choices=["ensemble","refit"],
+                        help="Com --cv: usa os modelos dos folds como ensemble ou faz um único re-treino final")
+    parser.add_argument("--n_jobs", type=int, default=-1,
+                        help="Orçamento global de núcleos (-1 = todos), dividido entre folds, rótulos e threads")
+    parser.add_argument("--no_cache", action="store_true",
+                        help="Ignora o cache de dados limpos/pré-processados")
+    parser.add_argument("--cache_dir", default=os.path.join("results", ".cache"))
+    parser.add_argument("--cache_max_mb", type=float, default=2048,
+                        help="Tamanho máximo do cache; remove os itens menos usados")
+    parser.add_argument("--instrument", action="store_true",
+                        help="Mede tempo/CPU/RSS por etapa (results/perfil_execucao.json + Chrome trace)")
+    parser.add_argument("--busca_tempo", type=float, default=600,
+                        help="Orçamento de tempo de parede da busca (s) [--profile search]")
+    parser.add_argument("--busca_configs", type=int, default=27, help="Configurações na 1ª rodada da busca")
+    parser.add_argument("--busca_eta", type=int, default=3, help="Fator de corte/crescimento por rodada")
+    parser.add_argument("--busca_peso_lat", type=float, default=0.01,
+                        help="Penalidade de F1 por 10x de latência (us/linha)")
+    parser.add_argument("--busca_peso_tam", type=float, default=0.01,
+                        help="Penalidade de F1 por 10x de tamanho do modelo (MB)")
     args = parser.parse_args()
     main(args)
@@ -0,0 +1,206 @@
+# score_stream.py
+# Pontuação em streaming de arquivos de teste maiores que a memória.
+# - Lê o CSV em blocos (pd.read_csv(chunksize=...)) só com as colunas necessárias
+# - Distribui os blocos num pool de processos que compartilha o modelo carregado
+#   (fork: o pipeline é carregado uma vez no processo pai e herdado pelos filhos)
+# - Escreve as saídas curta e longa incrementalmente, na ordem de entrada
+#   (probabilidades alinhadas aos limiares por rótulo, como no main)
+# - Memória limitada: no máximo `--inflight` blocos em trânsito por vez
+# - Com um bundle (results/modelo_bundle), os workers abrem os arrays do motor com
+#   mmap: uma única cópia física dos nós, compartilhada, mesmo com spawn
+# - Monitor de drift (src/drift.py): cada bloco lido atualiza os esboços no processo
+#   pai; ao final, PSI/KS por variável em results/drift_relatorio.json
+# - Modo sombra (--desafiante, src/shadow.py): o campeão segue no pool (e no motor do
+#   bundle); cada bloco pontuado volta com as probabilidades brutas e o processo pai o
+#   repassa aos desafiantes, que rodam numa thread à parte; comparação em
+#   results/sombra_relatorio.json
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from joblib import load
+
+from src.utils import (
+    LABELS, X_COLS, predict_proba_multilabel, montar_submissao, to_long_columns,
+    alinhar_limiares, load_threshold, load_thresholds
+)
+from src.bundle import ModelBundle, carregar_bundle, eh_bundle
+from src.drift import MonitorDrift, carregar_referencia
+from src.shadow import ShadowScorer
+
+_PIPELINE = None
+_X_COLS = None
+_ALINHAMENTO = None  # (limiares por rótulo, limiar da API) ou None
+
+
+def _init_worker(model_path, x_cols, alinhamento):
+    # com fork o pipeline já veio do pai; com spawn (Windows) carrega uma vez por worker
+    global _PIPELINE, _X_COLS, _ALINHAMENTO
+    if _PIPELINE is None:
+        _PIPELINE = _carregar(model_path)
+    _X_COLS = x_cols
+    _ALINHAMENTO = alinhamento
+
+
+def _carregar(model_path):
+    return carregar_bundle(model_path) if eh_bundle(model_path) else load(model_path)
+
+
+def _score_chunk(chunk: pd.DataFrame, bruto: bool = False):
+    """Submissão do bloco; bruto=True devolve também as probabilidades antes do alinhamento (sombra)."""
+    if isinstance(_PIPELINE, ModelBundle):
+        proba = _PIPELINE.predict_proba(chunk[_X_COLS])
+    else:
+        proba = predict_proba_multilabel(_PIPELINE, chunk[_X_COLS], len(LABELS))
+    saida = alinhar_limiares(proba, *_ALINHAMENTO) if _ALINHAMENTO is not None else proba
+    subm = montar_submissao(chunk["id"].values, saida)
+    return (subm, proba) if bruto else subm
+
+
+def _write(subm: pd.DataFrame, f_short, f_long, first: bool):
+    subm.to_csv(f_short, index=False, header=first)
+    to_long_columns(subm).to_csv(f_long, index=False, header=first)
+
+
+def score_file(test_path, model_path, out_short, out_long, x_cols,
+               chunksize=200_000, workers=None, inflight=None, alinhamento=None, monitor=None,
+               sombra: ShadowScorer = None):
+    global _PIPELINE, _X_COLS, _ALINHAMENTO
+    workers = workers or os.cpu_count() or 1
+    inflight = inflight or 2 * workers
+    usecols = ["id"] + list(x_cols)
+
+    _PIPELINE = _carregar(model_path)  # carregado uma vez; herdado pelos workers via fork
+    _X_COLS = list(x_cols)
+    _ALINHAMENTO = alinhamento
+
+    def concluir(res, chunk):
+        # com sombra: probabilidades do campeão + bloco seguem para os desafiantes (sem esperar)
+        if sombra is None:
+            return res
+        subm, proba = res
+        sombra.observar(chunk, proba)
+        return subm
+
+    bruto = sombra is not None
+    reader = pd.read_csv(test_path, usecols=usecols, chunksize=chunksize)
+    n_rows, first = 0, True
+    with open(out_short, "w", newline="", encoding="utf-8") as f_short, \
+         open(out_long, "w", newline="", encoding="utf-8") as f_long:
+        if workers == 1:
+            for chunk in reader:
+                if monitor is not None:
+                    monitor.atualizar(chunk)
+                _write(concluir(_score_chunk(chunk, bruto), chunk), f_short, f_long, first)
+                first = False
+                n_rows += len(chunk)
+            return n_rows
+
+        ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(model_path, _X_COLS, alinhamento)) as ex:
+            pending = deque()
+            for chunk in reader:
+                pending.append((ex.submit(_score_chunk, chunk, bruto), chunk))
+                if monitor is not None:  # enquanto os workers pontuam o bloco
+                    monitor.atualizar(chunk)
+                # janela limitada: escreve o bloco mais antigo antes de ler mais
+                while len(pending) >= inflight:
+                    fut, bloco = pending.popleft()
+                    subm = concluir(fut.result(), bloco)
+                    _write(subm, f_short, f_long, first)
+                    first = False
+                    n_rows += len(subm)
+            while pending:
+                fut, bloco = pending.popleft()
+                subm = concluir(fut.result(), bloco)
+                _write(subm, f_short, f_long, first)
+                first = False
+                n_rows += len(subm)
+    return n_rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Pontuação em streaming (blocos + pool de processos).")
+    ap.add_argument("--test", default="data/bootcamp_test.csv", help="CSV de entrada (com coluna 'id').")
+    ap.add_argument("--model", default=None,
+                    help="Bundle (diretório) ou .joblib (default: results/modelo_bundle, se existir).")
+    ap.add_argument("--out", default=os.path.join("results", "bootcamp_submission.csv"),
+                    help="Saída com nomes curtos; a versão longa recebe o sufixo _long.")
+    ap.add_argument("--chunksize", type=int, default=200_000, help="Linhas por bloco.")
+    ap.add_argument("--workers", type=int, default=None, help="Processos (default: todos os núcleos).")
+    ap.add_argument("--inflight", type=int, default=None,
+                    help="Blocos em trânsito ao mesmo tempo (default: 2 x workers).")
+    ap.add_argument("--use_id", action="store_true", help="Modelo treinado com id_produto.")
+    ap.add_argument("--thresholds", default=os.path.join("results", "best_thresholds.json"),
+                    help="Limiares por rótulo usados para alinhar a submissão (se existir).")
+    ap.add_argument("--drift_ref", default=os.path.join("results", "drift_referencia.json"),
+                    help="Esboços de referência do treino (default: os do bundle, se houver).")
+    ap.add_argument("--sem_drift", action="store_true", help="Não monitora drift das entradas.")
+    ap.add_argument("--desafiante", action="append", default=[],
+                    help="Modelo desafiante (.joblib ou bundle) pontuado em sombra; pode repetir.")
+    args = ap.parse_args()
+
+    if args.model is None:
+        bundle_dir = os.path.join("results", "modelo_bundle")
+        args.model = bundle_dir if eh_bundle(bundle_dir) else os.path.join("results", "modelo_multilabel_rf.joblib")
+    if not os.path.exists(args.model):
+        print(f"Modelo não encontrado: {args.model}. Rode main.py antes.", file=sys.stderr)
+        sys.exit(1)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    root, ext = os.path.splitext(args.out)
+    out_long = f"{root}_long{ext or '.csv'}"
+    x_cols = (["id_produto"] + X_COLS) if args.use_id else X_COLS
+    alinhamento, ref = None, None
+    if eh_bundle(args.model):
+        # esquema e limiares vêm do manifesto do bundle
+        b = carregar_bundle(args.model)
+        x_cols, alinhamento, ref = b.x_cols, (b.thresholds, b.api_threshold), b.drift_ref
+    elif os.path.exists(args.thresholds):
+        alinhamento = (load_thresholds(args.thresholds),
+                       load_threshold(os.path.join("results", "best_threshold.txt"), 0.5))
+
+    if ref is None and os.path.exists(args.drift_ref):
+        ref = carregar_referencia(args.drift_ref)
+    monitor = MonitorDrift(ref) if ref is not None and not args.sem_drift else None
+    sombra = None
+    if args.desafiante:
+        sombra = ShadowScorer(_carregar(args.model), {p: _carregar(p) for p in args.desafiante},
+                              x_cols, limiares=alinhamento[0] if alinhamento else None)
+        print("[ok] Modo sombra: %d desafiante(s) numa thread do processo principal" % len(args.desafiante))
+
+    t0 = time.perf_counter()
+    n = score_file(args.test, args.model, args.out, out_long, x_cols,
+                   chunksize=args.chunksize, workers=args.workers, inflight=args.inflight,
+                   alinhamento=alinhamento, monitor=monitor, sombra=sombra)
+    dt = time.perf_counter() - t0
+    print(f"[ok] {n} linhas em {dt:.1f}s ({n / max(dt, 1e-9):,.0f} linhas/s)")
+    print(f"[ok] Saídas: {args.out} | {out_long}")
+    if monitor is not None:
+        rel = monitor.relatorio()
+        print("\n=== Drift das entradas vs treino (monitor: %.1f%% do tempo) ===" % (100 * rel["segundos_monitor"] / max(dt, 1e-9)))
+        print(monitor.tabela())
+        path = os.path.join(os.path.dirname(os.path.abspath(args.out)), "drift_relatorio.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(rel, f, indent=2, ensure_ascii=False)
+        print(f"[ok] Drift: {path}")
+    if sombra is not None:
+        sombra.fechar()
+        print("\n=== Sombra: desafiantes vs campeão ===")
+        print(sombra.tabela())
+        path = os.path.join(os.path.dirname(os.path.abspath(args.out)), "sombra_relatorio.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(sombra.relatorio(), f, indent=2, ensure_ascii=False)
+        print(f"[ok] Sombra: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,27 @@
-import shutil, os
+# Gera results/submission.csv a partir da última submissão do main.py, sem cópia integral:
+# - bootcamp_submission.npy (main.py --formato_saida npy): CSV renderizado em blocos do mmap
+# - bootcamp_submission.csv: hardlink (mesmo arquivo no disco); cópia só se o link falhar.
+#   O link acompanha o CSV do main: rodar o main de novo atualiza os dois
+import os
+import sys
+import shutil
 
-src = os.path.join("results", "bootcamp_submission.csv")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.predicoes import carregar_predicoes, exportar_csv
+
+src_csv = os.path.join("results", "bootcamp_submission.csv")
+src_npy = os.path.join("results", "bootcamp_submission.npy")
 dst = os.path.join("results", "submission.csv")
 
-shutil.copy(src, dst)
-print(f" Arquivo gerado: {dst}")
+if os.path.exists(src_npy) and (not os.path.exists(src_csv) or os.path.getmtime(src_npy) >= os.path.getmtime(src_csv)):
+    exportar_csv(dst, carregar_predicoes(src_npy))
+    print(f" Arquivo gerado: {dst} (a partir de {src_npy})")
+else:
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src_csv, dst)
+        print(f" Arquivo gerado: {dst} (link para {src_csv})")
+    except OSError:
+        shutil.copy(src_csv, dst)
+        print(f" Arquivo gerado: {dst}")
@@ -0,0 +1,198 @@
+# serve.py
+# Serviço HTTP local de predição em lote.
+# - Carrega o modelo e os limiares por rótulo uma única vez; com um bundle
+#   (results/modelo_bundle) usa o motor compilado, os limiares e as colunas do manifesto
+# - POST /predict aceita JSON (lista de registros ou {"rows": [...]}) ou CSV
+# - Requisições concorrentes são agrupadas em micro-lotes (src/serving.py)
+# - GET /metrics expõe latência p50/p99 e vazão; GET /health para checagem
+# - GET /drift: PSI/KS das entradas recebidas vs treino (src/drift.py);
+#   GET /drift?reiniciar=1 devolve o relatório e zera a janela
+# - --desafiante: modelos em sombra (src/shadow.py); GET /sombra compara com o campeão
+
+import io
+import os
+import sys
+import json
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+from joblib import load
+
+from src.utils import LABELS, X_COLS, load_thresholds
+from src.serving import MicroBatcher
+from src.drift import MonitorDrift, carregar_referencia
+from src.shadow import ShadowScorer
+from src.bundle import carregar_bundle, eh_bundle
+
+RESULTS_DIR = "results"
+MODEL_PATH = os.path.join(RESULTS_DIR, "modelo_multilabel_rf.joblib")
+BUNDLE_PATH = os.path.join(RESULTS_DIR, "modelo_bundle")
+THS_PATH = os.path.join(RESULTS_DIR, "best_thresholds.json")
+DRIFT_PATH = os.path.join(RESULTS_DIR, "drift_referencia.json")
+
+
+def parse_body(body: bytes, content_type: str) -> pd.DataFrame:
+    """Converte o corpo da requisição (JSON ou CSV) em DataFrame."""
+    if "csv" in content_type:
+        return pd.read_csv(io.BytesIO(body))
+    payload = json.loads(body.decode("utf-8") or "null")
+    if isinstance(payload, dict):
+        payload = payload.get("rows", payload)
+    if isinstance(payload, dict):
+        # formato colunar: {"col": [..], ...}
+        return pd.DataFrame(payload)
+    if not isinstance(payload, list):
+        raise ValueError("JSON deve ser lista de registros, {'rows': [...]} ou colunar.")
+    return pd.DataFrame.from_records(payload)
+
+
+def format_response(df: pd.DataFrame, proba: np.ndarray, thresholds: np.ndarray) -> dict:
+    preds = (proba >= thresholds).astype(int)
+    ids = df["id"].tolist() if "id" in df.columns else list(range(len(df)))
+    out = []
+    for i, row_id in enumerate(ids):
+        out.append({
+            "id": row_id,
+            "proba": {lab: float(proba[i, j]) for j, lab in enumerate(LABELS)},
+            "pred": {lab: int(preds[i, j]) for j, lab in enumerate(LABELS)},
+        })
+    return {
+        "labels": LABELS,
+        "thresholds": {lab: float(t) for lab, t in zip(LABELS, thresholds)},
+        "predictions": out,
+    }
+
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # default (5) derruba conexões sob rajadas concorrentes
+
+
+def make_handler(batcher: MicroBatcher, thresholds: np.ndarray, monitor: MonitorDrift = None):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code: int, payload: dict):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == "/health":
+                self._send(200, {"status": "ok"})
+            elif url.path == "/metrics":
+                self._send(200, batcher.stats.snapshot())
+            elif url.path == "/sombra":
+                if batcher.sombra is None:
+                    self._send(404, {"erro": "sem desafiantes (use --desafiante)"})
+                    return
+                self._send(200, batcher.sombra.relatorio())
+            elif url.path == "/drift":
+                if monitor is None:
+                    self._send(404, {"erro": "sem referência de drift (rode main.py)"})
+                    return
+                self._send(200, monitor.relatorio())
+                if parse_qs(url.query).get("reiniciar", ["0"])[0] == "1":
+                    monitor.reiniciar()
+            else:
+                self._send(404, {"erro": "rota não encontrada"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send(404, {"erro": "rota não encontrada"})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length)
+            try:
+                df = parse_body(body, self.headers.get("Content-Type", "application/json"))
+            except Exception as e:
+                self._send(400, {"erro": f"corpo inválido: {e}"})
+                return
+            missing = [c for c in batcher.x_cols if c not in df.columns]
+            if missing:
+                self._send(400, {"erro": "faltam colunas", "colunas": missing})
+                return
+            if df.empty:
+                self._send(200, format_response(df, np.empty((0, len(LABELS))), thresholds))
+                return
+            try:
+                proba = batcher.predict(df)
+            except Exception as e:
+                self._send(500, {"erro": str(e)})
+                return
+            self._send(200, format_response(df, proba, thresholds))
+            if monitor is not None:
+                monitor.atualizar(df)  # depois da resposta: fora da latência do cliente
+
+        def log_message(self, fmt, *args):
+            pass  # sem log por requisição (ruído + custo)
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serviço HTTP de predição multirrótulo (micro-lotes).")
+    ap.add_argument("--model", default=BUNDLE_PATH if eh_bundle(BUNDLE_PATH) else MODEL_PATH,
+                    help="Bundle (diretório) ou .joblib (default: results/modelo_bundle, se existir).")
+    ap.add_argument("--threshold", type=float, default=None,
+                    help="Limiar único para todos os rótulos (default: os do bundle ou results/best_thresholds.json).")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--use_id", action="store_true",
+                    help="Modelo .joblib treinado com id_produto (main.py --use_id); o bundle já informa as colunas.")
+    ap.add_argument("--max-batch-rows", type=int, default=4096, help="Máximo de linhas por micro-lote.")
+    ap.add_argument("--max-wait-ms", type=float, default=5.0,
+                    help="Espera máxima para completar um micro-lote (ms).")
+    ap.add_argument("--drift_ref", default=DRIFT_PATH,
+                    help="Esboços de referência do treino para GET /drift (default: os do bundle; ignorado se não existir).")
+    ap.add_argument("--desafiante", action="append", default=[],
+                    help="Modelo desafiante (.joblib ou bundle) pontuado em sombra; pode repetir.")
+    args = ap.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"Modelo não encontrado: {args.model}. Rode main.py antes.", file=sys.stderr)
+        sys.exit(1)
+
+    ref = None
+    if eh_bundle(args.model):
+        # esquema, limiares e referência de drift vêm do manifesto; motor compilado via mmap
+        modelo = carregar_bundle(args.model)
+        x_cols, thresholds, ref = modelo.x_cols, modelo.thresholds, modelo.drift_ref
+    else:
+        modelo = load(args.model)
+        x_cols = (["id_produto"] + X_COLS) if args.use_id else X_COLS
+        # best_threshold.txt é o limiar da API (submissão alinhada), não um limiar de probabilidade
+        if not os.path.exists(THS_PATH):
+            print(f"[aviso] {THS_PATH} não encontrado: limiar padrão por rótulo.", file=sys.stderr)
+        thresholds = load_thresholds(THS_PATH)
+    if args.threshold is not None:
+        thresholds = np.full(len(LABELS), args.threshold)
+    sombra = None
+    if args.desafiante:
+        sombra = ShadowScorer(modelo, {p: carregar_bundle(p) if eh_bundle(p) else load(p) for p in args.desafiante},
+                              x_cols, limiares=thresholds)
+    batcher = MicroBatcher(modelo, x_cols, args.max_batch_rows, args.max_wait_ms, sombra=sombra)
+
+    if ref is None and os.path.exists(args.drift_ref):
+        ref = carregar_referencia(args.drift_ref)
+    monitor = MonitorDrift(ref) if ref is not None else None
+    server = ScoringServer((args.host, args.port), make_handler(batcher, thresholds, monitor))
+    print(f"[ok] Servindo {args.model} em http://{args.host}:{args.port} (limiares={np.round(thresholds, 4).tolist()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        if sombra is not None:
+            sombra.fechar()
+
+
+if __name__ == "__main__":
+    main()
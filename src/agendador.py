@@ -0,0 +1,115 @@
+# Agendador de núcleos do treino: um único orçamento (--n_jobs) dividido entre
+# folds da CV (processos) x rótulos simultâneos (threads) x threads por estimador
+# (RF: joblib; XGB: OpenMP), com o produto nunca acima do orçamento.
+# - planejar() escolhe a divisão; rótulos têm prioridade sobre threads internas,
+#   pois árvores curtas de um rótulo só deixam núcleos ociosos
+# - limitar_threads() fixa OpenMP/BLAS no processo atual (threadpoolctl) e nas
+#   variáveis de ambiente herdadas pelos workers do joblib
+# - contexto_rotulos() faz o MultiOutputRotulos ajustar os rótulos em threads
+#   (RF e XGB liberam o GIL; sem cópia dos dados para outros processos)
+# - MultiOutputRotulos: MultiOutputClassifier com o laço por rótulo aqui; cada ajuste
+#   conhece o índice do seu rótulo (perf.fit_rotulo nomeia a medição por ele)
+
+import os
+from contextlib import contextmanager, ExitStack
+
+import numpy as np
+from joblib import parallel_config
+from sklearn.base import clone
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.utils.parallel import Parallel, delayed
+from threadpoolctl import threadpool_limits
+
+from src import perf
+
+VARS_THREADS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def nucleos(n_jobs: int) -> int:
+    """Orçamento efetivo: n_jobs <= 0 usa todos os núcleos visíveis."""
+    if n_jobs and n_jobs > 0:
+        return int(n_jobs)
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def planejar(n_jobs: int, folds: int = 1, rotulos: int = 5, joint: bool = False) -> dict:
+    """
+    Divide o orçamento: folds x rotulos x threads <= núcleos.
+    joint=True (rf_joint): uma floresta só, sem paralelismo por rótulo.
+    """
+    total = nucleos(n_jobs)
+    f = max(1, min(folds, total))
+    por_fold = max(1, total // f)
+    r = 1 if joint else max(1, min(rotulos, por_fold))
+    t = max(1, por_fold // r)
+    return {"nucleos": total, "folds": f, "rotulos": r, "threads": t, "por_fold": por_fold}
+
+
+def descrever(plano: dict) -> str:
+    return "%d núcleos = %d fold(s) x %d rótulo(s) x %d thread(s)" % (
+        plano["nucleos"], plano["folds"], plano["rotulos"], plano["threads"])
+
+
+@contextmanager
+def limitar_threads(n: int):
+    """OpenMP/BLAS limitados a n threads aqui e nos subprocessos (restaura ao sair)."""
+    antigos = {v: os.environ.get(v) for v in VARS_THREADS}
+    for v in VARS_THREADS:
+        os.environ[v] = str(n)
+    try:
+        with threadpool_limits(limits=n):
+            yield
+    finally:
+        for v, val in antigos.items():
+            if val is None:
+                os.environ.pop(v, None)
+            else:
+                os.environ[v] = val
+
+
+@contextmanager
+def contexto_rotulos(plano: dict):
+    """Ajuste dos rótulos em threads, com OpenMP/BLAS de cada estimador fixados em plano['threads']."""
+    if plano is None:
+        yield
+        return
+    with ExitStack() as pilha:
+        pilha.enter_context(limitar_threads(plano["threads"]))
+        if plano["rotulos"] > 1:
+            pilha.enter_context(parallel_config(backend="threading"))
+        yield
+
+
+def contexto_folds(plano: dict):
+    """Workers do joblib (um por fold) nascem com OpenMP/BLAS limitados ao núcleo do fold."""
+    return parallel_config(backend="loky", inner_max_num_threads=plano["por_fold"])
+
+
+def _ajustar_rotulo(estimador, X, y, j: int, sample_weight=None):
+    with perf.fit_rotulo(j):
+        if sample_weight is None:
+            return estimador.fit(X, y)
+        return estimador.fit(X, y, sample_weight=sample_weight)
+
+
+class MultiOutputRotulos(MultiOutputClassifier):
+    """Um estimador por rótulo, ajustados em paralelo (n_jobs) pelo laço abaixo."""
+
+    def fit(self, X, Y, sample_weight=None):
+        Y = np.asarray(Y)
+        if Y.ndim != 2:
+            raise ValueError("Y deve ter uma coluna por rótulo (2D); recebido ndim=%d." % Y.ndim)
+        self.estimators_ = Parallel(n_jobs=self.n_jobs)(
+            delayed(_ajustar_rotulo)(clone(self.estimator), X, Y[:, j], j, sample_weight)
+            for j in range(Y.shape[1])
+        )
+        self.classes_ = [e.classes_ for e in self.estimators_]
+        if hasattr(self.estimators_[0], "n_features_in_"):
+            self.n_features_in_ = self.estimators_[0].n_features_in_
+        if hasattr(self.estimators_[0], "feature_names_in_"):
+            self.feature_names_in_ = self.estimators_[0].feature_names_in_
+        return self
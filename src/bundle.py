@@ -0,0 +1,107 @@
+# Bundle versionado do modelo (diretório autodescritivo).
+#   manifest.json  -> versão, rótulos, LONG_MAP, esquema de entrada, limiares, metadados do treino
+#   pipeline.joblib -> pipeline sklearn completo (carregado sob demanda)
+#   motor/*.npy    -> arrays do motor compilado, sem compressão: np.load(mmap_mode="r")
+#   drift_referencia.json -> esboços das entradas de treino (src/drift.py), se houver
+# Vários workers que abrem o mesmo bundle compartilham uma cópia física dos nós
+# (page cache do SO) em vez de cada um desserializar as cinco florestas.
+
+import os
+import json
+import time
+import shutil
+import tempfile
+
+import numpy as np
+from joblib import dump, load
+
+from src.utils import LABELS, LONG_MAP, predict_proba_multilabel
+
+BUNDLE_VERSION = 1
+
+
+def salvar_bundle(path: str, pipeline, x_cols: list, thresholds, api_threshold: float = 0.5,
+                  engine=None, meta: dict = None, drift: dict = None) -> str:
+    """Grava o bundle em um diretório temporário e troca de uma vez (os.replace)."""
+    import sklearn
+
+    pai = os.path.dirname(os.path.abspath(path))
+    os.makedirs(pai, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".tmp_bundle_", dir=pai)
+    os.chmod(tmp, 0o755)  # mkdtemp cria com 0700; workers de outros usuários precisam ler
+    dump(pipeline, os.path.join(tmp, "pipeline.joblib"))
+    if engine is not None:
+        engine.save_dir(os.path.join(tmp, "motor"))
+    if drift is not None:
+        with open(os.path.join(tmp, "drift_referencia.json"), "w", encoding="utf-8") as f:
+            json.dump(drift, f, ensure_ascii=False)
+    manifest = {
+        "bundle_version": BUNDLE_VERSION,
+        "criado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "labels": list(LABELS),
+        "long_map": dict(LONG_MAP),
+        "x_cols": list(x_cols),
+        "thresholds": {lab: float(t) for lab, t in zip(LABELS, thresholds)},
+        "api_threshold": float(api_threshold),
+        "motor": engine is not None,
+        "drift": drift is not None,
+        "versoes": {"numpy": np.__version__, "sklearn": sklearn.__version__},
+        "treino": dict(meta or {}),
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    antigo = None
+    if os.path.exists(path):
+        antigo = tempfile.mkdtemp(prefix=".old_bundle_", dir=pai)
+        os.replace(path, os.path.join(antigo, "b"))
+    os.replace(tmp, path)
+    if antigo:
+        shutil.rmtree(antigo, ignore_errors=True)
+    return path
+
+
+class ModelBundle:
+    def __init__(self, path: str, mmap_mode: str = "r"):
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            m = json.load(f)
+        if m.get("bundle_version", 0) > BUNDLE_VERSION:
+            raise ValueError("Bundle v%s não suportado (máx. v%d): %s"
+                             % (m.get("bundle_version"), BUNDLE_VERSION, path))
+        self.path = path
+        self.manifest = m
+        self.labels = list(m["labels"])
+        self.long_map = dict(m["long_map"])
+        self.x_cols = list(m["x_cols"])
+        self.thresholds = np.array([m["thresholds"][lab] for lab in self.labels])
+        self.api_threshold = float(m["api_threshold"])
+        self.engine = None
+        self._pipeline = None
+        self.drift_ref = None
+        if m.get("drift"):
+            with open(os.path.join(path, "drift_referencia.json"), "r", encoding="utf-8") as f:
+                self.drift_ref = json.load(f)
+        if m.get("motor") and os.path.isdir(os.path.join(path, "motor")):
+            from src.tree_engine import CompiledForest
+            self.engine = CompiledForest.load_dir(os.path.join(path, "motor"), mmap_mode=mmap_mode)
+
+    @property
+    def pipeline(self):
+        # unpickle completo só quando alguém precisa do sklearn (ex.: modelo sem motor)
+        if self._pipeline is None:
+            self._pipeline = load(os.path.join(self.path, "pipeline.joblib"))
+        return self._pipeline
+
+    def predict_proba(self, X) -> np.ndarray:
+        """(n, n_labels); usa o motor mapeado em memória quando existe."""
+        if self.engine is not None:
+            return self.engine.predict_proba(X)
+        return predict_proba_multilabel(self.pipeline, X[self.x_cols], len(self.labels))
+
+
+def carregar_bundle(path: str, mmap_mode: str = "r") -> ModelBundle:
+    return ModelBundle(path, mmap_mode=mmap_mode)
+
+
+def eh_bundle(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, "manifest.json"))
@@ -0,0 +1,176 @@
+# Busca de hiperparâmetros com orçamento (successive halving).
+# - Rodada 0: N configurações aleatórias treinadas numa fração pequena do treino
+# - A cada rodada fica 1/eta das melhores, com eta vezes mais dados, até 100%
+# - Orçamento: tempo de parede (não inicia novas levas após o prazo) e núcleos
+#   (ensaios simultâneos x threads por estimador <= n_jobs, como no treinar_cv)
+# - Objetivo: F1-macro penalizado pela latência de predição e pelo tamanho do modelo;
+#   a fronteira de Pareto (F1 x latência x tamanho) vai para results/
+
+import io
+import time
+
+import numpy as np
+from joblib import dump, Parallel, delayed
+
+from src.utils import LABELS, predict_proba_multilabel, choose_best_thresholds
+
+ESPACOS = {
+    "rf": {
+        "n_estimators": [25, 50, 100, 150, 250, 400],
+        "max_depth": [None, 6, 10, 16, 24],
+        "min_samples_leaf": [1, 2, 5, 10, 20],
+        "max_features": ["sqrt", 0.5, None],
+    },
+    "xgb": {
+        "n_estimators": [50, 100, 250, 500],
+        "max_depth": [2, 3, 4, 6, 8],
+        "learning_rate": [0.03, 0.05, 0.1, 0.2],
+        "subsample": [0.7, 0.8, 1.0],
+        "colsample_bytree": [0.7, 0.8, 1.0],
+    },
+}
+ESPACOS["rf_joint"] = ESPACOS["rf"]
+
+
+def amostrar(model_name: str, n: int, seed: int = 42) -> list:
+    """n configurações distintas sorteadas da grade do modelo."""
+    espaco = ESPACOS[model_name]
+    rng = np.random.default_rng(seed)
+    vistos, out = set(), []
+    for _ in range(n * 20):
+        cfg = {k: v[rng.integers(len(v))] for k, v in espaco.items()}
+        cfg = {k: (v.item() if hasattr(v, "item") else v) for k, v in cfg.items()}
+        chave = tuple(sorted((k, str(v)) for k, v in cfg.items()))
+        if chave not in vistos:
+            vistos.add(chave)
+            out.append(cfg)
+        if len(out) == n:
+            break
+    return out
+
+
+def objetivo(f1: float, us_linha: float, tamanho_mb: float,
+             peso_lat: float = 0.01, peso_tam: float = 0.01) -> float:
+    # custo em escala log: 10x mais lento (ou maior) custa `peso` de F1
+    return f1 - peso_lat * np.log10(max(us_linha, 1e-3)) - peso_tam * np.log10(max(tamanho_mb, 1e-3))
+
+
+def _ensaio(construir, params, X_tr, Y_tr, X_va, Y_va, X_lat, inner):
+    pipe = construir(params, inner)
+    t0 = time.perf_counter()
+    pipe.fit(X_tr, Y_tr)
+    fit_s = time.perf_counter() - t0
+
+    proba = predict_proba_multilabel(pipe, X_va, len(LABELS))
+    _, f1s = choose_best_thresholds(Y_va.values, proba)
+
+    lat = []
+    for _ in range(3):  # melhor de 3 num lote fixo
+        t0 = time.perf_counter()
+        predict_proba_multilabel(pipe, X_lat, len(LABELS))
+        lat.append(time.perf_counter() - t0)
+    buf = io.BytesIO()
+    dump(pipe, buf)
+    return {
+        "f1_macro": float(f1s.mean()),
+        "us_por_linha": min(lat) / len(X_lat) * 1e6,
+        "tamanho_mb": len(buf.getvalue()) / 1e6,
+        "fit_s": fit_s,
+    }
+
+
+def pareto(linhas: list) -> list:
+    """Não dominados: F1 maior, latência e tamanho menores."""
+    front = []
+    for a in linhas:
+        dominado = any(
+            b["f1_macro"] >= a["f1_macro"] and b["us_por_linha"] <= a["us_por_linha"]
+            and b["tamanho_mb"] <= a["tamanho_mb"]
+            and (b["f1_macro"], b["us_por_linha"], b["tamanho_mb"])
+            != (a["f1_macro"], a["us_por_linha"], a["tamanho_mb"])
+            for b in linhas
+        )
+        if not dominado:
+            front.append(a)
+    return sorted(front, key=lambda r: -r["f1_macro"])
+
+
+def successive_halving(construir, model_name, X_train, Y_train, X_valid, Y_valid,
+                       n_configs=27, eta=3, tempo_max_s=600.0, n_jobs=1,
+                       peso_lat=0.01, peso_tam=0.01, linhas_lat=2000, seed=42):
+    """
+    construir(params, n_jobs) -> pipeline não ajustado. Retorna (melhor_cfg, historico, front).
+    O histórico tem uma linha por (configuração, rodada). A fronteira só compara ensaios com os
+    mesmos dados: os da última rodada e os candidatos não dominados de rodadas anteriores,
+    re-treinados com as linhas da última rodada (se houver tempo).
+    """
+    prazo = time.perf_counter() + tempo_max_s
+    rodadas = max(1, int(np.floor(np.log(n_configs) / np.log(eta) + 1e-9)) + 1)
+    rng = np.random.default_rng(seed)
+    ordem = rng.permutation(len(X_train))
+    X_lat = X_valid.iloc[:min(linhas_lat, len(X_valid))]
+
+    def _linha(cid, cfg, r, frac, n, m):
+        linha = dict(id=cid, rodada=r, fracao=round(frac, 4), linhas=n, params=cfg, **m)
+        linha["objetivo"] = float(objetivo(m["f1_macro"], m["us_por_linha"], m["tamanho_mb"], peso_lat, peso_tam))
+        return linha
+
+    vivos = list(enumerate(amostrar(model_name, n_configs, seed)))
+    historico, ultima, dados = [], {}, {}
+    for r in range(rodadas):
+        frac = float(eta) ** (r - rodadas + 1)
+        idx = np.sort(ordem[:max(200, int(frac * len(X_train)))])
+        X_tr, Y_tr = X_train.iloc[idx], Y_train.iloc[idx]
+        dados[r] = (frac, X_tr, Y_tr)
+        outer = max(1, min(len(vivos), n_jobs))
+        inner = max(1, n_jobs // outer)
+
+        resultados = []
+        for i in range(0, len(vivos), outer):  # levas de `outer` ensaios; prazo checado entre levas
+            if time.perf_counter() > prazo and resultados:
+                print("[aviso] Orçamento de tempo esgotado na rodada %d (%d/%d ensaios)."
+                      % (r, len(resultados), len(vivos)))
+                break
+            leva = vivos[i:i + outer]
+            res = Parallel(n_jobs=outer)(
+                delayed(_ensaio)(construir, cfg, X_tr, Y_tr, X_valid, Y_valid, X_lat, inner)
+                for _, cfg in leva
+            )
+            for (cid, cfg), m in zip(leva, res):
+                linha = _linha(cid, cfg, r, frac, len(idx), m)
+                historico.append(linha)
+                ultima[cid] = linha
+                resultados.append(linha)
+        print("  rodada %d: %d ensaios em %.0f%% dos dados | melhor objetivo %.4f"
+              % (r, len(resultados), 100 * frac, max(l["objetivo"] for l in resultados)))
+
+        manter = max(1, len(resultados) // eta)
+        melhores = sorted(resultados, key=lambda l: -l["objetivo"])[:manter]
+        vivos = [(l["id"], l["params"]) for l in melhores]
+        if time.perf_counter() > prazo and r < rodadas - 1:
+            print("[aviso] Orçamento de tempo esgotado após a rodada %d." % r)
+            break
+
+    # só ensaios da última rodada são comparáveis entre si (mesmas linhas de treino)
+    r_max = max(l["rodada"] for l in ultima.values())
+    finais = [l for l in ultima.values() if l["rodada"] == r_max]
+    candidatos = [l for l in pareto(list(ultima.values())) if l["rodada"] < r_max]
+    if candidatos and time.perf_counter() > prazo:
+        print("[aviso] Sem tempo para re-treinar %d candidato(s) da fronteira; ela usa só a última rodada."
+              % len(candidatos))
+        candidatos = []
+    if candidatos:
+        frac, X_tr, Y_tr = dados[r_max]
+        outer = max(1, min(len(candidatos), n_jobs))
+        res = Parallel(n_jobs=outer)(
+            delayed(_ensaio)(construir, l["params"], X_tr, Y_tr, X_valid, Y_valid, X_lat, max(1, n_jobs // outer))
+            for l in candidatos
+        )
+        for l, m in zip(candidatos, res):
+            linha = dict(_linha(l["id"], l["params"], r_max, frac, len(X_tr), m), reavaliada=True)
+            historico.append(linha)
+            finais.append(linha)
+        print("  fronteira: %d candidato(s) de rodadas anteriores re-treinados em %.0f%% dos dados"
+              % (len(candidatos), 100 * frac))
+    melhor = max(finais, key=lambda l: l["objetivo"])
+    return melhor["params"], historico, pareto(finais)
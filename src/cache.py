@@ -0,0 +1,214 @@
+# Cache endereçado por conteúdo para o treino.
+# - Chave = hash do arquivo de entrada + versão do código de limpeza (hash do fonte)
+# - Guarda o DataFrame limpo (uma .npy por coluna) e a saída do `prep` ajustado
+#   (matriz .npy ou partes CSR) + o `prep` em joblib
+# - Leitura com mmap_mode="r": as matrizes entram no fit sem cópia nem re-parse
+# - Limite de tamanho com remoção dos itens menos usados (LRU por mtime)
+
+import os
+import json
+import shutil
+import hashlib
+import inspect
+import tempfile
+
+import numpy as np
+import pandas as pd
+from joblib import dump, load, hash as joblib_hash
+
+
+def hash_arquivo(path: str, bloco: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for b in iter(lambda: f.read(bloco), b""):
+            h.update(b)
+    return h.hexdigest()
+
+
+def versao_codigo(*funcs) -> str:
+    """Hash do código-fonte das funções de limpeza: mudou o código, muda a chave."""
+    h = hashlib.sha256()
+    for fn in funcs:
+        h.update(inspect.getsource(fn).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def _chave(*partes) -> str:
+    h = hashlib.sha256()
+    for p in partes:
+        h.update(str(p).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:32]
+
+
+class DataCache:
+    def __init__(self, root: str = os.path.join("results", ".cache"), max_mb: float = 2048,
+                 enabled: bool = True):
+        self.root = root
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.enabled = enabled
+        if enabled:
+            os.makedirs(root, exist_ok=True)
+
+    # --- infraestrutura ---
+    def _dir(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _hit(self, key: str) -> bool:
+        d = self._dir(key)
+        if not (self.enabled and os.path.exists(os.path.join(d, "meta.json"))):
+            return False
+        os.utime(d)  # marca uso recente (LRU)
+        return True
+
+    def _commit(self, tmp: str, key: str):
+        if self._tamanho(tmp) > self.max_bytes:  # maior que o limite: não cabe nem sozinho
+            shutil.rmtree(tmp, ignore_errors=True)
+            print("[aviso] Item maior que --cache_max_mb: não armazenado no cache.")
+            return
+        dst = self._dir(key)
+        try:
+            os.replace(tmp, dst)  # atômico; outro processo pode ter gravado antes
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self._evict(manter=dst)
+
+    def _tmpdir(self) -> str:
+        return tempfile.mkdtemp(prefix=".tmp_", dir=self.root)
+
+    @staticmethod
+    def _tamanho(d: str) -> int:
+        return sum(os.path.getsize(os.path.join(r, f)) for r, _, fs in os.walk(d) for f in fs)
+
+    def _evict(self, manter: str = None):
+        """Remove os menos usados até caber no limite; `manter` (o item recém-gravado) fica."""
+        entradas = []
+        for name in os.listdir(self.root):
+            d = self._dir(name)
+            if os.path.isdir(d) and not name.startswith(".tmp_") and d != manter:
+                entradas.append((os.path.getmtime(d), self._tamanho(d), d))
+        total = sum(t for _, t, _ in entradas) + (self._tamanho(manter) if manter and os.path.isdir(manter) else 0)
+        for _, tam, d in sorted(entradas):  # mais antigo primeiro
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(d, ignore_errors=True)
+            total -= tam
+
+    # --- DataFrame limpo ---
+    def get_frame(self, key: str):
+        if not self._hit(key):
+            return None
+        d = self._dir(key)
+        with open(os.path.join(d, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        cols = {}
+        for i, (c, kind) in enumerate(meta["columns"]):
+            base = os.path.join(d, f"c{i}")
+            if kind == "num":
+                cols[c] = np.load(base + ".npy", mmap_mode="r")
+            elif kind == "cat":
+                codes = np.load(base + ".npy")
+                cats = np.load(base + "_cats.npy")
+                cols[c] = pd.Categorical.from_codes(codes, categories=cats)
+            else:
+                vals = np.load(base + ".npy").astype(object)
+                vals[np.load(base + "_na.npy")] = np.nan
+                cols[c] = vals
+        return pd.DataFrame(cols)
+
+    def put_frame(self, key: str, df: pd.DataFrame):
+        if not self.enabled:
+            return
+        tmp = self._tmpdir()
+        columns = []
+        for i, c in enumerate(df.columns):
+            s = df[c]
+            base = os.path.join(tmp, f"c{i}")
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                np.save(base + ".npy", s.cat.codes.to_numpy())
+                np.save(base + "_cats.npy", np.asarray(s.cat.categories, dtype=str))
+                columns.append((c, "cat"))
+            elif pd.api.types.is_numeric_dtype(s.dtype) or pd.api.types.is_bool_dtype(s.dtype):
+                np.save(base + ".npy", s.to_numpy())
+                columns.append((c, "num"))
+            else:
+                na = s.isna().to_numpy()
+                np.save(base + ".npy", s.astype(str).to_numpy(dtype=str))
+                np.save(base + "_na.npy", na)
+                columns.append((c, "obj"))
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"columns": columns}, f)
+        self._commit(tmp, key)
+
+    # --- saída do prep ajustado ---
+    def get_matrix(self, key: str):
+        if not self._hit(key):
+            return None
+        d = self._dir(key)
+        prep = load(os.path.join(d, "prep.joblib"))
+        if os.path.exists(os.path.join(d, "indptr.npy")):
+            from scipy import sparse
+            parts = [np.load(os.path.join(d, f"{p}.npy"), mmap_mode="r") for p in ("data", "indices", "indptr")]
+            with open(os.path.join(d, "meta.json"), "r", encoding="utf-8") as f:
+                shape = tuple(json.load(f)["shape"])
+            return prep, sparse.csr_matrix(tuple(parts), shape=shape, copy=False)
+        return prep, np.load(os.path.join(d, "Xt.npy"), mmap_mode="r")
+
+    def put_matrix(self, key: str, prep, Xt):
+        if not self.enabled:
+            return
+        tmp = self._tmpdir()
+        dump(prep, os.path.join(tmp, "prep.joblib"))
+        if hasattr(Xt, "tocsr"):
+            Xt = Xt.tocsr()
+            for p in ("data", "indices", "indptr"):
+                np.save(os.path.join(tmp, f"{p}.npy"), getattr(Xt, p))
+        else:
+            np.save(os.path.join(tmp, "Xt.npy"), np.ascontiguousarray(Xt))
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"shape": list(Xt.shape)}, f)
+        self._commit(tmp, key)
+
+
+def carregar_com_cache(loader, path: str, cache: DataCache, *funcs_limpeza):
+    """
+    Executa `loader(path)` (ex.: carregar_treino) só se o par (arquivo, código) ainda
+    não estiver no cache. Retorna (df, data_key); data_key identifica os dados limpos.
+    Com o cache desligado não há leitura extra do arquivo para o hash: a chave usa só
+    caminho, tamanho e mtime (basta para identificar a execução, ex.: tempos_treino.json).
+    """
+    if not cache.enabled:
+        st = os.stat(path)
+        return loader(path), _chave("arquivo", os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    data_key = _chave("frame", hash_arquivo(path), versao_codigo(loader, *funcs_limpeza))
+    df = cache.get_frame(data_key)
+    if df is None:
+        df = loader(path)
+        cache.put_frame(data_key, df)
+    return df, data_key
+
+
+def fit_pipeline(pipe, X: pd.DataFrame, Y, cache: DataCache = None, data_key: str = None):
+    """
+    Ajusta pipe (prep + clf). Com cache, o prep ajustado e a matriz transformada são
+    reaproveitados quando dados, linhas, colunas e configuração do prep coincidem.
+    """
+    if cache is None or not cache.enabled or data_key is None:
+        return pipe.fit(X, Y)
+    from sklearn.base import clone
+
+    prep = pipe.named_steps["prep"]
+    key = _chave(
+        "prep", data_key, list(X.columns),
+        hashlib.sha256(np.ascontiguousarray(X.index.to_numpy()).tobytes()).hexdigest(),
+        joblib_hash(clone(prep)),  # só a configuração, não o estado ajustado
+    )
+    hit = cache.get_matrix(key)
+    if hit is None:
+        Xt = prep.fit_transform(X, Y)
+        cache.put_matrix(key, prep, Xt)
+    else:
+        prep, Xt = hit
+    pipe.steps[0] = ("prep", prep)
+    pipe.named_steps["clf"].fit(Xt, Y)
+    return pipe
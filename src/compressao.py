@@ -0,0 +1,169 @@
+# Compressão do pipeline treinado para um orçamento de árvores, nós ou µs/linha.
+# Duas estratégias, ambas gerando uma família de modelos indexada por k (crescente):
+# - selecao: RF -> as k melhores árvores por rótulo, em ordem gulosa (a que mais reduz o
+#   Brier da média na amostra de seleção entra primeiro); XGB -> as k primeiras rodadas
+# - destilacao: XGB raso por rótulo ajustado nas probabilidades da floresta (rótulos
+#   suaves como pesos de amostra); cada k treina o aluno com k rodadas, dentro da busca
+# ajustar_ao_orcamento escolhe o maior k que cabe no orçamento, medido no motor compilado
+# (o que o bundle serve): árvores e nós são exatos; a latência é medida.
+
+import copy
+import time
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+
+from src.tree_engine import exportar
+
+
+def _com_clf(pipe, clf):
+    return Pipeline([("prep", pipe.named_steps["prep"]), ("clf", clf)])
+
+
+def _indice_positivo(classes) -> int:
+    classes = list(classes)
+    return classes.index(1) if 1 in classes else -1
+
+
+def _probas_arvores(rf, Xt, saida=None) -> np.ndarray:
+    """(n_arvores, n_linhas) com a proba positiva de cada árvore (saida: rótulo no rf_joint)."""
+    classes = rf.classes_[saida] if saida is not None else rf.classes_
+    pos = _indice_positivo(classes)
+    if pos < 0:
+        return np.zeros((len(rf.estimators_), Xt.shape[0]), dtype=np.float32)
+    out = np.empty((len(rf.estimators_), Xt.shape[0]), dtype=np.float32)
+    for i, arv in enumerate(rf.estimators_):
+        p = arv.predict_proba(Xt)
+        out[i] = (p[saida] if saida is not None else p)[:, pos]
+    return out
+
+
+def ordem_gulosa(P: np.ndarray, y: np.ndarray, k_max: int) -> np.ndarray:
+    """
+    Seleção progressiva: a cada passo entra a árvore que minimiza o erro quadrático
+    da média das escolhidas. P: (n_arvores, n_linhas[, n_saidas]); y no mesmo formato.
+    """
+    n = P.shape[0]
+    k_max = min(k_max, n)
+    soma = np.zeros(P.shape[1:], dtype=np.float64)
+    livres = np.ones(n, dtype=bool)
+    ordem = []
+    for m in range(k_max):
+        cand = np.flatnonzero(livres)
+        media = (soma[None] + P[cand]) / (m + 1)
+        erro = ((media - y[None]) ** 2).reshape(len(cand), -1).sum(axis=1)
+        melhor = cand[int(np.argmin(erro))]
+        ordem.append(melhor)
+        livres[melhor] = False
+        soma += P[melhor]
+    return np.asarray(ordem, dtype=np.int64)
+
+
+def _podar_rf(rf, idx):
+    novo = copy.copy(rf)
+    novo.estimators_ = [rf.estimators_[i] for i in idx]
+    novo.n_estimators = len(idx)
+    return novo
+
+
+def _truncar_xgb(est, k):
+    novo = copy.copy(est)
+    novo._Booster = est.get_booster()[:k]
+    return novo.set_params(n_estimators=k)
+
+
+def selecao(pipe, X_sel, Y_sel, k_max: int, max_linhas: int = 5000, seed: int = 0):
+    """Família k -> pipeline com k árvores (RF) ou k rodadas (XGB) por rótulo. Retorna (construir, k_max)."""
+    clf = pipe.named_steps["clf"]
+    Y = np.asarray(Y_sel, dtype=np.float32)
+    if len(X_sel) > max_linhas:
+        amostra = np.random.default_rng(seed).choice(len(X_sel), max_linhas, replace=False)
+        X_sel, Y = X_sel.iloc[amostra], Y[amostra]
+    Xt = pipe.named_steps["prep"].transform(X_sel)
+
+    if hasattr(clf, "n_outputs_"):
+        # rf_joint: uma ordem só, com o erro somado sobre os rótulos
+        P = np.stack([_probas_arvores(clf, Xt, j) for j in range(clf.n_outputs_)], axis=-1)
+        ordem = ordem_gulosa(P, Y, k_max)
+        return (lambda k: _com_clf(pipe, _podar_rf(clf, ordem[:k]))), len(ordem)
+
+    if type(clf.estimators_[0]).__name__ == "XGBClassifier":
+        k_max = min(k_max, min(e.get_booster().num_boosted_rounds() for e in clf.estimators_))
+
+        def construir(k):
+            moc = copy.copy(clf)
+            moc.estimators_ = [_truncar_xgb(e, k) for e in clf.estimators_]
+            return _com_clf(pipe, moc)
+        return construir, k_max
+
+    ordens = [ordem_gulosa(_probas_arvores(est, Xt), Y[:, j], k_max) for j, est in enumerate(clf.estimators_)]
+
+    def construir(k):
+        moc = copy.copy(clf)
+        moc.estimators_ = [_podar_rf(est, o[:k]) for est, o in zip(clf.estimators_, ordens)]
+        return _com_clf(pipe, moc)
+    return construir, min(len(o) for o in ordens)
+
+
+def destilacao(pipe, X_ref, n_labels: int, rodadas: int = 200, profundidade: int = 4,
+               learning_rate: float = 0.1, n_jobs: int = 1, seed: int = 42):
+    """
+    XGB raso por rótulo imitando as probabilidades do pipeline em X_ref (linhas fora do
+    treino: nelas a floresta não está sobreajustada). Cada linha entra duas vezes, como
+    positiva com peso p e negativa com peso 1-p: o gradiente é o da logloss com rótulo p.
+    Retorna (construir, rodadas): construir(k) treina alunos de k rodadas.
+    """
+    from xgboost import XGBClassifier
+    from sklearn.multioutput import MultiOutputClassifier
+    from src.utils import predict_proba_multilabel
+
+    prof = np.clip(predict_proba_multilabel(pipe, X_ref, n_labels), 1e-6, 1 - 1e-6)
+    Xt = pipe.named_steps["prep"].transform(X_ref)
+    Xt = Xt.toarray() if hasattr(Xt, "toarray") else np.asarray(Xt)
+    X2 = np.vstack([Xt, Xt])
+    y2 = np.r_[np.ones(len(Xt)), np.zeros(len(Xt))].astype(int)
+    pesos = [np.r_[prof[:, j], 1 - prof[:, j]] for j in range(n_labels)]
+
+    def construir(k):
+        # só as k rodadas do orçamento (a busca binária pede poucos k; sem treinar 'rodadas' e truncar)
+        base = XGBClassifier(n_estimators=k, max_depth=profundidade, learning_rate=learning_rate,
+                             objective="binary:logistic", tree_method="hist", n_jobs=n_jobs,
+                             random_state=seed, eval_metric="logloss")
+        moc = MultiOutputClassifier(base)
+        moc.estimators_ = [clone(base).fit(X2, y2, sample_weight=w) for w in pesos]
+        return _com_clf(pipe, moc)
+    return construir, rodadas
+
+
+def medir(pipe, labels, X_lat, repeticoes: int = 3) -> dict:
+    """Tamanho e latência do pipeline no motor compilado (best-of-N, µs por linha)."""
+    engine = exportar(pipe, labels)
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        engine.predict_proba(X_lat)
+        tempos.append(time.perf_counter() - t0)
+    nbytes = sum(getattr(engine, k).nbytes for k in ("left", "right", "feature", "threshold", "value", "is_leaf"))
+    return {"arvores": int(len(engine.roots)), "nos": int(len(engine.left)),
+            "mb_motor": round(nbytes / 2**20, 3), "us_linha": round(min(tempos) / len(X_lat) * 1e6, 3)}
+
+
+def cabe(medidas: dict, orcamento: dict) -> bool:
+    limites = {"arvores": orcamento.get("max_arvores"), "nos": orcamento.get("max_nos"),
+               "us_linha": orcamento.get("max_us_linha")}
+    return all(v is None or medidas[k] <= v for k, v in limites.items())
+
+
+def ajustar_ao_orcamento(construir, k_max: int, orcamento: dict, labels, X_lat):
+    """Busca binária pelo maior k cujo modelo cabe no orçamento. Retorna (k, pipeline, medidas) ou None."""
+    lo, hi, melhor = 1, k_max, None
+    while lo <= hi:
+        k = (lo + hi) // 2
+        modelo = construir(k)
+        m = medir(modelo, labels, X_lat)
+        if cabe(m, orcamento):
+            melhor, lo = (k, modelo, m), k + 1
+        else:
+            hi = k - 1
+    return melhor
@@ -0,0 +1,152 @@
+# Monitor de drift das entradas com memória constante.
+# - Treino: referencia() guarda, por sensor, cortes de quantis + contagens por faixa e
+#   nulos; por categórica (tipo), contagens por categoria. JSON de poucos KB.
+# - Pontuação: MonitorDrift.atualizar(lote) soma contagens nas MESMAS faixas
+#   (searchsorted + bincount), então a memória não cresce com o volume pontuado;
+#   categorias fora da referência vão para um único balde (fora_da_referencia).
+# - relatorio(): PSI por variável (faixas + nulos) e KS sobre as faixas (sensores).
+#   Regra usual do PSI: < 0.1 estável, 0.1-0.25 moderado, > 0.25 drift forte.
+
+import json
+import time
+import threading
+
+import numpy as np
+import pandas as pd
+
+REF_VERSION = 1
+EPS = 1e-4
+
+
+def _texto(col: pd.Series) -> pd.Series:
+    return col.dropna().astype(str)
+
+
+def referencia(df: pd.DataFrame, num_cols, cat_cols, n_faixas: int = 20) -> dict:
+    """Esboço de referência das entradas de treino."""
+    ref = {"versao": REF_VERSION, "linhas": int(len(df)), "num": {}, "cat": {}}
+    for c in num_cols:
+        v = df[c].to_numpy(dtype=np.float64)
+        ok = ~np.isnan(v)
+        cortes = np.unique(np.quantile(v[ok], np.linspace(0, 1, n_faixas + 1)[1:-1])) if ok.any() else np.array([])
+        cont = np.bincount(np.searchsorted(cortes, v[ok], side="right"), minlength=len(cortes) + 1)
+        ref["num"][c] = {"cortes": cortes.tolist(), "contagens": cont.tolist(), "nulos": int((~ok).sum())}
+    for c in cat_cols:
+        vc = _texto(df[c]).value_counts()
+        ref["cat"][c] = {"contagens": {str(k): int(n) for k, n in vc.items()},
+                         "nulos": int(df[c].isna().sum())}
+    return ref
+
+
+def salvar_referencia(path: str, ref: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(ref, f, ensure_ascii=False)
+
+
+def carregar_referencia(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def psi(ref_cont, atual_cont) -> float:
+    p = np.asarray(ref_cont, dtype=np.float64)
+    q = np.asarray(atual_cont, dtype=np.float64)
+    if p.sum() == 0 or q.sum() == 0:
+        return 0.0
+    p = np.maximum(p / p.sum(), EPS)
+    q = np.maximum(q / q.sum(), EPS)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def ks_faixas(ref_cont, atual_cont) -> float:
+    """KS nas bordas das faixas (aproxima o KS de duas amostras sem guardar os valores)."""
+    p = np.asarray(ref_cont, dtype=np.float64)
+    q = np.asarray(atual_cont, dtype=np.float64)
+    if p.sum() == 0 or q.sum() == 0:
+        return 0.0
+    return float(np.max(np.abs(np.cumsum(p) / p.sum() - np.cumsum(q) / q.sum())))
+
+
+def nivel(valor: float) -> str:
+    return "estável" if valor < 0.1 else ("moderado" if valor < 0.25 else "forte")
+
+
+class MonitorDrift:
+    """Contagens acumuladas das entradas pontuadas nas faixas da referência (thread-safe)."""
+
+    def __init__(self, ref: dict):
+        self.ref = ref
+        self._cortes = {c: np.asarray(r["cortes"], dtype=np.float64) for c, r in ref["num"].items()}
+        self._cats = {c: pd.Index(list(r["contagens"])) for c, r in ref["cat"].items()}
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.linhas = 0
+            self.segundos = 0.0
+            self._num = {c: np.zeros(len(k) + 1, dtype=np.int64) for c, k in self._cortes.items()}
+            self._num_nulos = {c: 0 for c in self._cortes}
+            self._cat = {c: np.zeros(len(k) + 1, dtype=np.int64) for c, k in self._cats.items()}  # +1: fora da referência
+            self._cat_nulos = {c: 0 for c in self._cats}
+
+    def atualizar(self, df: pd.DataFrame):
+        t0 = time.perf_counter()
+        parciais = {}
+        for c, cortes in self._cortes.items():
+            if c not in df.columns:
+                continue
+            v = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64)
+            ok = ~np.isnan(v)
+            parciais[c] = (np.bincount(np.searchsorted(cortes, v[ok], side="right"), minlength=len(cortes) + 1),
+                           int((~ok).sum()))
+        for c, cats in self._cats.items():
+            if c not in df.columns:
+                continue
+            col = df[c]
+            pos = cats.get_indexer(_texto(col))
+            pos[pos < 0] = len(cats)
+            parciais[c] = (np.bincount(pos, minlength=len(cats) + 1), int(col.isna().sum()))
+        with self._lock:
+            for c, (cont, nulos) in parciais.items():
+                if c in self._num:
+                    self._num[c] += cont
+                    self._num_nulos[c] += nulos
+                else:
+                    self._cat[c] += cont
+                    self._cat_nulos[c] += nulos
+            self.linhas += len(df)
+            self.segundos += time.perf_counter() - t0
+
+    def relatorio(self) -> dict:
+        with self._lock:
+            out = {"linhas": self.linhas, "linhas_referencia": self.ref["linhas"],
+                   "segundos_monitor": round(self.segundos, 4), "variaveis": {}}
+            for c, r in self.ref["num"].items():
+                ref_cont, atual = np.asarray(r["contagens"]), self._num[c]
+                out["variaveis"][c] = {
+                    "psi": round(psi(np.r_[ref_cont, r["nulos"]], np.r_[atual, self._num_nulos[c]]), 4),
+                    "ks": round(ks_faixas(ref_cont, atual), 4),
+                    "nulos_ref": round(r["nulos"] / max(self.ref["linhas"], 1), 4),
+                    "nulos_atual": round(self._num_nulos[c] / max(self.linhas, 1), 4),
+                }
+            for c, r in self.ref["cat"].items():
+                ref_cont = np.r_[[r["contagens"][k] for k in self._cats[c]], 0, r["nulos"]]
+                atual = np.r_[self._cat[c], self._cat_nulos[c]]
+                out["variaveis"][c] = {
+                    "psi": round(psi(ref_cont, atual), 4), "ks": None,
+                    "nulos_ref": round(r["nulos"] / max(self.ref["linhas"], 1), 4),
+                    "nulos_atual": round(self._cat_nulos[c] / max(self.linhas, 1), 4),
+                    "fora_da_referencia": int(self._cat[c][-1]),
+                }
+        for v in out["variaveis"].values():
+            v["nivel"] = nivel(v["psi"])
+        return out
+
+    def tabela(self) -> str:
+        rel = self.relatorio()
+        linhas = ["%-24s %8s %8s %10s" % ("variável", "PSI", "KS", "nível")]
+        for c, v in rel["variaveis"].items():
+            linhas.append("%-24s %8.4f %8s %10s" % (c, v["psi"], "-" if v["ks"] is None else "%.4f" % v["ks"],
+                                                    v["nivel"]))
+        return "\n".join(linhas)
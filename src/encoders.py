@@ -0,0 +1,183 @@
+# Codificadores para categóricas de alta cardinalidade (id_produto com --use_id).
+# O one-hot cria uma coluna por produto: largura, busca de splits e tamanho do modelo
+# crescem com o número de produtos. Aqui a largura não depende da cardinalidade:
+# - hash:      one-hot esparso em n_buckets fixos (hash estável do pandas, sem vocabulário)
+# - frequencia: 1 coluna com a fração de linhas da categoria no treino
+# - target:    1 coluna por rótulo com a taxa de positivos suavizada (m-estimate);
+#              no fit_transform os valores são out-of-fold (K folds) para não vazar o alvo
+# Tudo vetorizado: pd.factorize + np.bincount, sem loops por categoria.
+# frequencia/target guardam as contagens do fit: atualizar() soma um lote novo (categorias
+# novas entram no fim) sem reler o histórico (src/incremental.py).
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.model_selection import KFold
+
+ESTRATEGIAS = ("onehot", "hash", "frequencia", "target")
+
+
+def _coluna(X) -> pd.Series:
+    """Única coluna de X como texto (category/object/números -> str; NaN -> None)."""
+    col = X.iloc[:, 0] if hasattr(X, "iloc") else pd.Series(np.asarray(X, dtype=object).reshape(len(X), -1)[:, 0])
+    ok = col.notna().to_numpy()
+    return col.astype(str).where(ok, None).reset_index(drop=True)
+
+
+def _estender(categorias: pd.Index, col: pd.Series):
+    """Índice de cada linha em `categorias`, acrescentando as categorias novas no fim (-1: NaN)."""
+    pos = categorias.get_indexer(col)
+    novas = col[(pos < 0) & col.notna().to_numpy()].unique()
+    if len(novas):
+        categorias = categorias.append(pd.Index(novas))
+        pos = categorias.get_indexer(col)
+    return categorias, pos
+
+
+def _acumular(antigo: np.ndarray, novo: np.ndarray) -> np.ndarray:
+    """novo (já com as categorias acrescentadas) + antigo nas primeiras posições."""
+    novo[:len(antigo)] += antigo
+    return novo
+
+
+class HashingEncoder(BaseEstimator, TransformerMixin):
+    """One-hot em n_buckets fixos; sem estado além da largura (categorias novas também caem num bucket)."""
+
+    def __init__(self, n_buckets: int = 64):
+        self.n_buckets = n_buckets
+
+    def fit(self, X, y=None):
+        self.n_features_in_ = 1
+        return self
+
+    def transform(self, X):
+        col = _coluna(X)
+        ok = col.notna().to_numpy()
+        linhas = np.flatnonzero(ok)
+        h = pd.util.hash_array(col[ok].to_numpy(dtype=object), categorize=True)
+        b = (h % np.uint64(self.n_buckets)).astype(np.int64)
+        return sparse.csr_matrix((np.ones(len(linhas)), (linhas, b)), shape=(len(col), self.n_buckets))
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array([f"hash_{i}" for i in range(self.n_buckets)], dtype=object)
+
+
+class FrequencyEncoder(BaseEstimator, TransformerMixin):
+    """Fração de linhas do treino com a mesma categoria (0 para desconhecidas/NaN)."""
+
+    def fit(self, X, y=None):
+        codes, cats = pd.factorize(_coluna(X))
+        ok = codes >= 0
+        self.categories_ = pd.Index(cats)
+        self.contagem_ = np.bincount(codes[ok], minlength=len(cats)).astype(np.float64)
+        self.n_ = len(codes)
+        self.freq_ = self.contagem_ / max(self.n_, 1)
+        self.n_features_in_ = 1
+        return self
+
+    def atualizar(self, X, y=None):
+        """Soma as contagens de um lote novo às do treino."""
+        self.categories_, pos = _estender(self.categories_, _coluna(X))
+        ok = pos >= 0
+        self.contagem_ = _acumular(self.contagem_, np.bincount(pos[ok], minlength=len(self.categories_))
+                                   .astype(np.float64))
+        self.n_ += len(pos)
+        self.freq_ = self.contagem_ / max(self.n_, 1)
+        return self
+
+    def transform(self, X):
+        pos = self.categories_.get_indexer(_coluna(X))
+        out = np.where(pos >= 0, self.freq_[np.maximum(pos, 0)], 0.0)
+        return out.reshape(-1, 1)
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array(["freq"], dtype=object)
+
+
+class TargetEncoderOOF(BaseEstimator, TransformerMixin):
+    """
+    Taxa de positivos por categoria e rótulo, suavizada para a média global:
+        (soma + m * prior) / (contagem + m)
+    fit_transform devolve a versão out-of-fold; transform usa as estatísticas do treino todo.
+    """
+
+    def __init__(self, m: float = 10.0, cv: int = 5, random_state: int = 42):
+        self.m = m
+        self.cv = cv
+        self.random_state = random_state
+
+    @staticmethod
+    def _y2d(y) -> np.ndarray:
+        y = np.asarray(y, dtype=np.float64)
+        return y.reshape(-1, 1) if y.ndim == 1 else y
+
+    @staticmethod
+    def _somas(codes, y, n_cats):
+        ok = codes >= 0
+        cont = np.bincount(codes[ok], minlength=n_cats).astype(np.float64)
+        soma = np.stack([np.bincount(codes[ok], weights=y[ok, j], minlength=n_cats)
+                         for j in range(y.shape[1])], axis=1)
+        return cont, soma
+
+    def _estatisticas(self, codes, y, n_cats):
+        cont, soma = self._somas(codes, y, n_cats)
+        prior = y.mean(axis=0)
+        return (soma + self.m * prior) / (cont[:, None] + self.m), prior
+
+    @staticmethod
+    def _aplicar(codes, enc, prior):
+        return np.where((codes >= 0)[:, None], enc[np.maximum(codes, 0)], prior)
+
+    def fit(self, X, y):
+        codes, cats = pd.factorize(_coluna(X))
+        y = self._y2d(y)
+        self.categories_ = pd.Index(cats)
+        self.contagem_, self.soma_ = self._somas(codes, y, len(cats))
+        self.n_, self.soma_y_ = len(y), y.sum(axis=0)
+        self.encoding_, self.prior_ = self._estatisticas(codes, y, len(cats))
+        self.n_features_in_ = 1
+        return self
+
+    def atualizar(self, X, y):
+        """Soma contagens e positivos de um lote novo aos do treino e recalcula a codificação."""
+        self.categories_, pos = _estender(self.categories_, _coluna(X))
+        y = self._y2d(y)
+        cont, soma = self._somas(pos, y, len(self.categories_))
+        self.contagem_ = _acumular(self.contagem_, cont)
+        self.soma_ = _acumular(self.soma_, soma)
+        self.n_ += len(y)
+        self.soma_y_ = self.soma_y_ + y.sum(axis=0)
+        self.prior_ = self.soma_y_ / self.n_
+        self.encoding_ = (self.soma_ + self.m * self.prior_) / (self.contagem_[:, None] + self.m)
+        return self
+
+    def fit_transform(self, X, y=None, **fit_params):
+        self.fit(X, y)
+        codes = self.categories_.get_indexer(_coluna(X))
+        y = self._y2d(y)
+        out = np.empty((len(codes), y.shape[1]), dtype=np.float64)
+        kf = KFold(n_splits=self.cv, shuffle=True, random_state=self.random_state)
+        for tr, va in kf.split(codes):
+            enc, prior = self._estatisticas(codes[tr], y[tr], len(self.categories_))
+            out[va] = self._aplicar(codes[va], enc, prior)
+        return out
+
+    def transform(self, X):
+        return self._aplicar(self.categories_.get_indexer(_coluna(X)), self.encoding_, self.prior_)
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array([f"target_{j}" for j in range(len(self.prior_))], dtype=object)
+
+
+def codificador(estrategia: str, n_buckets: int = 64):
+    """Transformador para uma coluna de alta cardinalidade (None = one-hot padrão do pipeline)."""
+    if estrategia == "hash":
+        return HashingEncoder(n_buckets=n_buckets)
+    if estrategia == "frequencia":
+        return FrequencyEncoder()
+    if estrategia == "target":
+        return TargetEncoderOOF()
+    if estrategia == "onehot":
+        return None
+    raise ValueError(f"Codificação desconhecida: {estrategia} (opções: {', '.join(ESTRATEGIAS)})")
@@ -0,0 +1,150 @@
+# Atualização incremental do pipeline treinado com um lote novo de telemetria rotulada.
+# - RF (MultiOutputClassifier ou rf_joint): ajusta árvores novas só no lote e aposenta
+#   as mais antigas (o tamanho da floresta se mantém)
+# - XGB: continua o boosting a partir do booster atual (xgb_model=...); em boosting as
+#   árvores dependem das anteriores, então nada é aposentado
+# - Rótulos cujo lote não tem as duas classes são pulados (árvores de uma classe só
+#   quebrariam a média de probabilidades)
+# - Imputadores: mediana/moda atualizadas de forma aproximada com o estado acumulado
+#   (n visto + contagens de categorias) guardado no próprio pipeline
+# - Codificador do id_produto (--id_encoding frequencia/target): contagens do lote somadas
+#   às do treino (exato); o lote é transformado ANTES, com as estatísticas antigas, para
+#   as árvores novas não verem a taxa de positivos calculada com o próprio alvo
+# O custo é proporcional ao lote: nada do histórico é relido ou transformado.
+
+import time
+
+import numpy as np
+from sklearn.base import clone
+
+
+def _passos_prep(prep):
+    num = prep.named_transformers_["num"].named_steps["imputer"]
+    cat = prep.named_transformers_["cat"]
+    return num, cat.named_steps["imputer"], cat.named_steps["ohe"]
+
+
+def _colunas(prep, nome):
+    for n, _, cols in prep.transformers_:
+        if n == nome:
+            return list(cols)
+    return []
+
+
+def atualizar_imputadores(prep, X_novo, estado: dict) -> dict:
+    """
+    Atualiza statistics_ dos SimpleImputer (aproximado):
+    - mediana: média ponderada (por linhas vistas) da mediana antiga e da do lote
+    - mais frequente: contagens acumuladas por categoria
+    As categorias do OneHotEncoder ficam fixas (as árvores dependem das colunas);
+    categorias novas caem em handle_unknown="ignore" e são apenas contadas.
+    """
+    imp_num, imp_cat, ohe = _passos_prep(prep)
+    num_cols, cat_cols = _colunas(prep, "num"), _colunas(prep, "cat")
+    n_old, n_new = float(estado["n"]), float(len(X_novo))
+    peso = n_new / (n_old + n_new)
+
+    if num_cols:
+        med = np.nanmedian(X_novo[num_cols].to_numpy(dtype=np.float64), axis=0)
+        ok = ~np.isnan(med)
+        stats = imp_num.statistics_.astype(np.float64)
+        stats[ok] = (1 - peso) * stats[ok] + peso * med[ok]
+        imp_num.statistics_ = stats
+
+    novas = {}
+    for i, c in enumerate(cat_cols):
+        cont = estado["cat_counts"].setdefault(c, {str(imp_cat.statistics_[i]): n_old})
+        for cat, k in X_novo[c].astype(object).dropna().astype(str).value_counts().items():
+            cont[cat] = cont.get(cat, 0.0) + float(k)
+        imp_cat.statistics_[i] = max(cont, key=cont.get)
+        conhecidas = set(map(str, ohe.categories_[i]))
+        novas[c] = sorted(set(X_novo[c].dropna().astype(str)) - conhecidas)
+    estado["n"] = n_old + n_new
+    return novas
+
+
+def codificador_id(prep):
+    """Codificador do id_produto com estado (frequencia/target) ou None; falha antes de alterar o pipeline."""
+    if "id" not in prep.named_transformers_:
+        return None
+    enc = prep.named_transformers_["id"]
+    if not hasattr(enc, "atualizar"):  # hash: sem estado
+        return None
+    if not hasattr(enc, "contagem_"):
+        raise ValueError("%s ajustado sem contagens (modelo antigo): atualização incremental "
+                         "indisponível; treine de novo com main.py." % type(enc).__name__)
+    return enc
+
+
+def _tem_duas_classes(y) -> bool:
+    return np.unique(y).size == 2
+
+
+def atualizar_floresta(rf, Xt, y, frac: float, n_jobs: int, seed: int) -> int:
+    """Troca as frac*n árvores mais antigas por árvores ajustadas no lote. Retorna quantas."""
+    n = len(rf.estimators_)
+    k = max(1, int(round(frac * n)))
+    nova = clone(rf).set_params(n_estimators=k, n_jobs=n_jobs, random_state=seed, warm_start=False)
+    nova.fit(Xt, y)
+    rf.estimators_ = list(rf.estimators_[k:]) + list(nova.estimators_)
+    rf.n_estimators = len(rf.estimators_)
+    return k
+
+
+def atualizar_xgb(est, Xt, y, rodadas: int):
+    """Novo XGBClassifier que continua o boosting de `est` com `rodadas` árvores no lote."""
+    total = est.get_booster().num_boosted_rounds()
+    novo = clone(est).set_params(n_estimators=rodadas)
+    novo.fit(Xt, y, xgb_model=est.get_booster())
+    return novo.set_params(n_estimators=total + rodadas)
+
+
+def atualizar_pipeline(pipe, X_novo, Y_novo, labels, frac_arvores=0.2, rodadas_xgb=50,
+                       n_jobs=1, n_historico=None, seed=0) -> dict:
+    """Atualiza pipe (prep + clf) no lugar usando só o lote novo. Retorna um resumo."""
+    t0 = time.perf_counter()
+    prep, clf = pipe.named_steps["prep"], pipe.named_steps["clf"]
+    enc = codificador_id(prep)
+    estado = getattr(pipe, "estado_incremental_", None)
+    if estado is None:
+        estado = {"n": float(n_historico or len(X_novo)), "cat_counts": {}, "atualizacoes": 0}
+    estado["atualizacoes"] += 1
+    seed = seed + 1000 * estado["atualizacoes"]
+
+    novas_categorias = atualizar_imputadores(prep, X_novo, estado)
+    Xt = prep.transform(X_novo)
+    Y = np.asarray(Y_novo)
+    if enc is not None:  # depois do transform (ver topo)
+        enc.atualizar(X_novo[_colunas(prep, "id")], Y)
+
+    por_rotulo = {}
+    if hasattr(clf, "n_outputs_"):
+        # rf_joint: uma floresta para todos os rótulos -> exige as duas classes em todos
+        faltam = [lab for j, lab in enumerate(labels) if not _tem_duas_classes(Y[:, j])]
+        if faltam:
+            por_rotulo = {lab: "pulado (lote sem as duas classes em %s)" % ", ".join(faltam) for lab in labels}
+        else:
+            k = atualizar_floresta(clf, Xt, Y, frac_arvores, n_jobs, seed)
+            por_rotulo = {lab: "%d árvores trocadas" % k for lab in labels}
+    else:
+        for j, (lab, est) in enumerate(zip(labels, clf.estimators_)):
+            if not _tem_duas_classes(Y[:, j]):
+                por_rotulo[lab] = "pulado (lote sem as duas classes)"
+                continue
+            if type(est).__name__ == "XGBClassifier":
+                clf.estimators_[j] = atualizar_xgb(est, Xt, Y[:, j], rodadas_xgb)
+                por_rotulo[lab] = "+%d rodadas de boosting" % rodadas_xgb
+            else:
+                k = atualizar_floresta(est, Xt, Y[:, j], frac_arvores, n_jobs, seed + j)
+                por_rotulo[lab] = "%d árvores trocadas" % k
+
+    pipe.estado_incremental_ = estado
+    return {
+        "linhas_lote": int(len(X_novo)),
+        "linhas_vistas": int(estado["n"]),
+        "atualizacoes": int(estado["atualizacoes"]),
+        "por_rotulo": por_rotulo,
+        "categorias_novas": {c: v for c, v in novas_categorias.items() if v},
+        "codificador_id": type(enc).__name__ if enc is not None else None,
+        "segundos": round(time.perf_counter() - t0, 3),
+    }
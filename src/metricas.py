@@ -0,0 +1,130 @@
+# Métricas multirrótulo offline, no mesmo formato da API de avaliação
+# (/evaluate/multilabel_metrics -> results/api_metrics_last.json):
+#   macro_accuracy, macro_roc_auc, accuracy, precision, recall, f1_score, roc_auc,
+#   roc ([fpr, tpr] por rótulo, como roc_curve(drop_intermediate=True)) e
+#   confusion_matrix ([[TN, FP], [FN, TP]] por rótulo)
+# Vários limiares são avaliados de uma vez: cada rótulo é ordenado uma única vez e as
+# contagens saem de somas acumuladas + searchsorted (sem re-leitura nem rede).
+# Regra de decisão: positivo se proba >= limiar.
+
+import numpy as np
+import pandas as pd
+
+from src.utils import LABELS, LONG_MAP, to_binary
+
+
+def carregar_rotulos(path: str) -> pd.DataFrame:
+    """CSV local com 'id' + rótulos (nomes curtos ou longos); devolve 0/1 indexado por id."""
+    df = pd.read_csv(path)
+    df = df.rename(columns={v: k for k, v in LONG_MAP.items()})
+    faltam = [c for c in ["id"] + LABELS if c not in df.columns]
+    if faltam:
+        raise ValueError(f"Arquivo de rótulos sem as colunas: {faltam}")
+    out = pd.DataFrame({c: to_binary(df[c]) for c in LABELS})
+    out.index = df["id"].to_numpy()
+    return out
+
+
+def alinhar_submissao(subm: pd.DataFrame, rotulos: pd.DataFrame):
+    """Casa submissão (curta ou longa) e rótulos pelo id. Retorna (y_true, proba)."""
+    subm = subm.rename(columns={v: k for k, v in LONG_MAP.items()})
+    faltam = [c for c in ["id"] + LABELS if c not in subm.columns]
+    if faltam:
+        raise ValueError(f"Submissão sem as colunas: {faltam}")
+    ids = subm["id"].to_numpy()
+    pos = rotulos.index.get_indexer(ids)
+    if (pos < 0).any():
+        raise ValueError(f"{int((pos < 0).sum())} ids da submissão não estão no arquivo de rótulos")
+    y = rotulos[LABELS].to_numpy()[pos]
+    proba = subm[LABELS].to_numpy(dtype=np.float64)
+    return y, proba
+
+
+def _roc(y: np.ndarray, p: np.ndarray):
+    """fpr, tpr e AUC (trapézios), equivalentes ao roc_curve/roc_auc_score do sklearn."""
+    ordem = np.argsort(-p, kind="mergesort")
+    p, y = p[ordem], y[ordem]
+    corte = np.r_[np.flatnonzero(np.diff(p)), len(p) - 1]  # último índice de cada valor distinto
+    tps = np.cumsum(y)[corte].astype(np.float64)
+    fps = (corte + 1) - tps
+    # remove pontos colineares (drop_intermediate=True)
+    if len(fps) > 2:
+        manter = np.r_[True, np.logical_or(np.diff(fps, 2), np.diff(tps, 2)), True]
+        fps, tps = fps[manter], tps[manter]
+    fps, tps = np.r_[0.0, fps], np.r_[0.0, tps]
+    if fps[-1] <= 0 or tps[-1] <= 0:  # só uma classe presente: AUC indefinida
+        return fps, tps, None
+    fpr, tpr = fps / fps[-1], tps / tps[-1]
+    return fpr, tpr, float(np.trapezoid(tpr, fpr) if hasattr(np, "trapezoid") else np.trapz(tpr, fpr))
+
+
+def contagens(y_true: np.ndarray, proba: np.ndarray, thresholds) -> np.ndarray:
+    """(n_limiares, n_rotulos, 4) com TN, FP, FN, TP para cada limiar, numa passada por rótulo."""
+    y_true = np.asarray(y_true)
+    proba = np.asarray(proba, dtype=np.float64)
+    t = np.atleast_1d(np.asarray(thresholds, dtype=np.float64))
+    n, k = proba.shape
+    out = np.empty((len(t), k, 4), dtype=np.int64)
+    for j in range(k):
+        ordem = np.argsort(proba[:, j], kind="mergesort")
+        p, y = proba[ordem, j], y_true[ordem, j].astype(np.int64)
+        pos_acum = np.r_[0, np.cumsum(y)]           # positivos entre os i menores
+        i = np.searchsorted(p, t, side="left")       # linhas com proba < limiar
+        fn = pos_acum[i]
+        tn = i - fn
+        tp = pos_acum[-1] - fn
+        fp = (n - i) - tp
+        out[:, j] = np.stack([tn, fp, fn, tp], axis=1)
+    return out
+
+
+def _div(a, b):
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    return np.divide(a, b, out=np.zeros(np.broadcast(a, b).shape), where=b > 0)
+
+
+def metricas_varios_limiares(y_true: np.ndarray, proba: np.ndarray, thresholds) -> list:
+    """Um payload (formato da API) por limiar; ROC/AUC são calculados uma vez só."""
+    c = contagens(y_true, proba, thresholds)
+    tn, fp, fn, tp = (c[..., i] for i in range(4))
+    n = tn + fp + fn + tp
+    acc = _div(tn + tp, n)
+    prec = _div(tp, tp + fp)
+    rec = _div(tp, tp + fn)
+    f1 = _div(2 * tp, 2 * tp + fp + fn)
+
+    rocs = [_roc(np.asarray(y_true)[:, j], np.asarray(proba, dtype=np.float64)[:, j])
+            for j in range(c.shape[1])]
+    aucs = [r[2] for r in rocs]
+    aucs_ok = [a for a in aucs if a is not None]
+    base = {
+        "macro_roc_auc": float(np.mean(aucs_ok)) if aucs_ok else None,
+        "roc_auc": aucs,
+        "roc": [[r[0].tolist(), r[1].tolist()] for r in rocs],
+    }
+    out = []
+    for i in range(c.shape[0]):
+        out.append({
+            "macro_accuracy": float(acc[i].mean()),
+            "macro_roc_auc": base["macro_roc_auc"],
+            "accuracy": acc[i].tolist(),
+            "precision": prec[i].tolist(),
+            "recall": rec[i].tolist(),
+            "f1_score": f1[i].tolist(),
+            "roc_auc": base["roc_auc"],
+            "roc": base["roc"],
+            "confusion_matrix": [[[int(tn[i, j]), int(fp[i, j])], [int(fn[i, j]), int(tp[i, j])]]
+                                 for j in range(c.shape[1])],
+        })
+    return out
+
+
+def metricas_multilabel(y_true: np.ndarray, proba: np.ndarray, threshold: float) -> dict:
+    return metricas_varios_limiares(y_true, proba, [threshold])[0]
+
+
+def f1_macro_por_limiar(y_true: np.ndarray, proba: np.ndarray, thresholds) -> np.ndarray:
+    """Só o F1-macro de cada limiar (sem montar os payloads): para varreduras grandes."""
+    c = contagens(y_true, proba, thresholds)
+    tn, fp, fn, tp = (c[..., i] for i in range(4))
+    return _div(2 * tp, 2 * tp + fp + fn).mean(axis=1)
@@ -0,0 +1,146 @@
+# Instrumentação opcional por etapa (main.py --instrument).
+# - etapa("nome"): tempo de parede, tempo de CPU do processo e pico de RSS
+# - por_rotulo(): tempo do fit de cada rótulo, medido no laço por rótulo do agendador
+#   (src/agendador.py); CPU só sem rótulos em paralelo
+# - salvar(): perfil em JSON + arquivo Chrome trace (chrome://tracing / Perfetto)
+# Desligada (padrão), etapa() devolve um contexto nulo pré-alocado: sem medições.
+#
+# Observações: o tempo de CPU é o do processo (todas as threads); trabalho feito em
+# processos filhos (ex.: folds do --cv via loky) aparece só como tempo de parede.
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource  # indisponível no Windows
+except ImportError:
+    resource = None
+
+_NULO = nullcontext()
+_ATIVO = None
+_ROTULOS = None  # (labels, cpu) dentro de por_rotulo()
+
+
+def _pico_rss_mb() -> float:
+    if resource is None:
+        return float("nan")
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / 1024 ** 2 if sys.platform == "darwin" else kb / 1024  # macOS informa em bytes
+
+
+class Perfil:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.eventos = []
+        self._pilha = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def etapa(self, nome: str, cpu: bool = True, **info):
+        pilha = getattr(self._pilha, "v", None)
+        if pilha is None:
+            pilha = self._pilha.v = []
+        pilha.append(nome)
+        w0, c0, r0 = time.perf_counter(), time.process_time(), _pico_rss_mb()
+        try:
+            yield
+        finally:
+            w1, c1, r1 = time.perf_counter(), time.process_time(), _pico_rss_mb()
+            pilha.pop()
+            ev = {
+                "etapa": nome, "pai": pilha[-1] if pilha else None, "nivel": len(pilha),
+                "inicio_s": round(w0 - self.t0, 6), "parede_s": round(w1 - w0, 6),
+                "cpu_s": round(c1 - c0, 6) if cpu else None, "pico_rss_mb": round(r1, 1),
+                "pico_rss_delta_mb": round(r1 - r0, 1), "thread": threading.get_ident(),
+            }
+            if info:
+                ev["info"] = info
+            with self._lock:
+                self.eventos.append(ev)
+
+    def resumo(self) -> dict:
+        total = time.perf_counter() - self.t0
+        return {
+            "total_parede_s": round(total, 3),
+            "pico_rss_mb": round(_pico_rss_mb(), 1),
+            "etapas": sorted(self.eventos, key=lambda e: e["inicio_s"]),
+        }
+
+    def chrome_trace(self) -> dict:
+        pid = os.getpid()
+        tids = {}
+        evs = []
+        for e in self.eventos:
+            tid = tids.setdefault(e["thread"], len(tids))
+            evs.append({
+                "name": e["etapa"], "ph": "X", "pid": pid, "tid": tid,
+                "ts": e["inicio_s"] * 1e6, "dur": e["parede_s"] * 1e6,
+                "args": {"cpu_s": e["cpu_s"], "pico_rss_mb": e["pico_rss_mb"], **e.get("info", {})},
+            })
+        return {"traceEvents": evs, "displayTimeUnit": "ms"}
+
+    def salvar(self, results_dir: str, prefixo: str = "perfil_execucao"):
+        perfil = os.path.join(results_dir, prefixo + ".json")
+        trace = os.path.join(results_dir, prefixo + "_trace.json")
+        with open(perfil, "w", encoding="utf-8") as f:
+            json.dump(self.resumo(), f, indent=2)
+        with open(trace, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+        return perfil, trace
+
+    def tabela(self) -> str:
+        linhas = ["%-34s %10s %10s %12s" % ("etapa", "parede (s)", "CPU (s)", "pico RSS MB")]
+        for e in sorted(self.eventos, key=lambda e: e["inicio_s"]):
+            nome = "  " * e["nivel"] + e["etapa"]
+            cpu = "-" if e["cpu_s"] is None else "%.3f" % e["cpu_s"]
+            linhas.append("%-34s %10.3f %10s %12.1f" % (nome, e["parede_s"], cpu, e["pico_rss_mb"]))
+        return "\n".join(linhas)
+
+
+def ativar() -> Perfil:
+    global _ATIVO
+    _ATIVO = Perfil()
+    return _ATIVO
+
+
+def ativo():
+    return _ATIVO
+
+
+def etapa(nome: str, **info):
+    """Contexto de medição; contexto nulo (compartilhado) quando desligado."""
+    if _ATIVO is None:
+        return _NULO
+    return _ATIVO.etapa(nome, **info)
+
+
+@contextmanager
+def por_rotulo(labels, cpu: bool = True):
+    """
+    Liga a medição do fit de cada rótulo: o laço por rótulo de src/agendador.py
+    (MultiOutputRotulos) chama fit_rotulo(j) com o índice do estimador. Só vale no
+    processo atual. cpu=False (rótulos em paralelo): process_time soma as threads dos
+    outros rótulos, então o CPU por rótulo não é registrado.
+    """
+    global _ROTULOS
+    if _ATIVO is None:
+        yield
+        return
+    anterior, _ROTULOS = _ROTULOS, (list(labels), cpu)
+    try:
+        yield
+    finally:
+        _ROTULOS = anterior
+
+
+def fit_rotulo(j: int):
+    """Contexto de medição do ajuste do rótulo j (nulo fora de por_rotulo)."""
+    if _ATIVO is None or _ROTULOS is None:
+        return _NULO
+    labels, cpu = _ROTULOS
+    nome = labels[j] if j < len(labels) else str(j)
+    return _ATIVO.etapa("fit_rotulo/" + nome, cpu=cpu, rotulo=nome)
@@ -0,0 +1,92 @@
+# Saída binária das predições: id + probabilidades float32 num único .npy estruturado.
+# - Gravado uma vez (np.save); lido com np.load(mmap_mode="r"): sem parsing de texto e
+#   sem carregar o arquivo inteiro para consultar colunas ou fatias
+# - CSV (nomes curtos ou longos, 6 casas como o main) é renderizado sob demanda, em
+#   blocos: memória limitada ao bloco mesmo para arquivos grandes
+#
+# Uso (CLI):
+#   python -m src.predicoes results/bootcamp_submission.npy --csv results/submission.csv --longo
+
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.utils import LABELS, LONG_MAP
+
+EXT = ".npy"
+BLOCO_LINHAS = 200_000
+
+
+def eh_binario(path: str) -> bool:
+    return str(path).endswith(EXT)
+
+
+def _dtype(ids: np.ndarray, labels) -> np.dtype:
+    tipo_id = np.int64 if ids.dtype.kind in "iu" else "U%d" % max(1, ids.astype(str).dtype.itemsize // 4)
+    return np.dtype([("id", tipo_id)] + [(lab, np.float32) for lab in labels])
+
+
+def salvar_predicoes(path: str, ids, proba: np.ndarray, labels=LABELS) -> str:
+    """Grava o .npy estruturado (arquivo temporário + os.replace: leitores nunca veem meio arquivo)."""
+    ids = np.asarray(ids)
+    arr = np.empty(len(ids), dtype=_dtype(ids, labels))
+    arr["id"] = ids
+    for j, lab in enumerate(labels):
+        arr[lab] = proba[:, j]
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+    return path
+
+
+def carregar_predicoes(path: str, mmap: bool = True) -> np.ndarray:
+    """Array estruturado (id + rótulos); com mmap só as páginas tocadas são lidas."""
+    return np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+
+
+def rotulos(arr: np.ndarray) -> list:
+    return [c for c in arr.dtype.names if c != "id"]
+
+
+def como_dataframe(arr: np.ndarray, longo: bool = False, decimals: int = None) -> pd.DataFrame:
+    """Visão tabular (curta ou longa) de um trecho do array; decimals reproduz o CSV do main."""
+    df = pd.DataFrame({c: arr[c] for c in arr.dtype.names})
+    if decimals is not None:
+        labs = rotulos(arr)
+        df[labs] = np.round(df[labs].to_numpy(dtype=np.float64), decimals)
+    return df.rename(columns=LONG_MAP) if longo else df
+
+
+def exportar_csv(destino, arr: np.ndarray, longo: bool = False, decimals: int = 6,
+                 bloco: int = BLOCO_LINHAS):
+    """CSV em blocos para um caminho ou arquivo de texto aberto."""
+    if isinstance(destino, (str, os.PathLike)):
+        with open(destino, "w", newline="", encoding="utf-8") as f:
+            return exportar_csv(f, arr, longo, decimals, bloco)
+    for s in range(0, max(len(arr), 1), bloco):
+        destino.write(como_dataframe(arr[s:s + bloco], longo, decimals).to_csv(index=False, header=s == 0))
+
+
+def csv_bytes(arr: np.ndarray, longo: bool = False, decimals: int = 6) -> bytes:
+    """CSV completo em memória (upload na API / download no app)."""
+    buf = io.StringIO()
+    exportar_csv(buf, arr, longo, decimals)
+    return buf.getvalue().encode("utf-8")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Renderiza um .npy de predições como CSV (curto ou longo).")
+    ap.add_argument("entrada", help="Arquivo .npy gravado pelo main.py --formato_saida npy.")
+    ap.add_argument("--csv", required=True, help="CSV de saída.")
+    ap.add_argument("--longo", action="store_true", help="Nomes longos dos rótulos (formato da API).")
+    ap.add_argument("--decimals", type=int, default=6)
+    args = ap.parse_args()
+
+    arr = carregar_predicoes(args.entrada)
+    exportar_csv(args.csv, arr, longo=args.longo, decimals=args.decimals)
+    print(f"[ok] {len(arr)} linhas -> {args.csv}")
@@ -0,0 +1,143 @@
+# Micro-batching para o serviço de predição (serve.py).
+# Requisições concorrentes são agrupadas em um único lote, de modo que um
+# prep.transform + uma passada pelas florestas atende várias chamadas.
+
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+from src.utils import LABELS, predict_proba_multilabel
+
+
+class LatencyStats:
+    """Janela deslizante de latências (ms) + contadores de vazão."""
+
+    def __init__(self, window: int = 10000):
+        self._lat = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.t0 = time.perf_counter()
+        self.n_requests = 0
+        self.n_rows = 0
+        self.n_batches = 0
+        self.batch_rows = deque(maxlen=window)
+
+    def add_request(self, latency_ms: float, n_rows: int):
+        with self._lock:
+            self._lat.append(latency_ms)
+            self.n_requests += 1
+            self.n_rows += n_rows
+
+    def add_batch(self, n_rows: int):
+        with self._lock:
+            self.n_batches += 1
+            self.batch_rows.append(n_rows)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lat = np.fromiter(self._lat, dtype=float)
+            rows = np.fromiter(self.batch_rows, dtype=float)
+            elapsed = time.perf_counter() - self.t0
+            return {
+                "requests": self.n_requests,
+                "rows": self.n_rows,
+                "batches": self.n_batches,
+                "uptime_s": round(elapsed, 3),
+                "latency_ms_p50": float(np.percentile(lat, 50)) if lat.size else None,
+                "latency_ms_p99": float(np.percentile(lat, 99)) if lat.size else None,
+                "throughput_rows_s": self.n_rows / elapsed if elapsed > 0 else 0.0,
+                "throughput_req_s": self.n_requests / elapsed if elapsed > 0 else 0.0,
+                "mean_batch_rows": float(rows.mean()) if rows.size else None,
+            }
+
+
+class MicroBatcher:
+    """
+    Fila única consumida por uma thread: junta requisições até `max_batch_rows`
+    linhas ou até `max_wait_ms` após a primeira chegar, e pontua tudo de uma vez.
+    """
+
+    def __init__(self, pipeline, x_cols, max_batch_rows: int = 4096, max_wait_ms: float = 5.0, sombra=None):
+        self.pipeline = pipeline
+        self.sombra = sombra  # ShadowScorer (src/shadow.py): campeão responde, desafiantes em segundo plano
+        self.x_cols = list(x_cols)
+        self.max_batch_rows = int(max_batch_rows)
+        self.max_wait = max_wait_ms / 1000.0
+        self.stats = LatencyStats()
+        self._q = queue.Queue()
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, X: pd.DataFrame) -> Future:
+        fut = Future()
+        self._q.put((X, fut))
+        return fut
+
+    def predict(self, X: pd.DataFrame, timeout: float = 60.0) -> np.ndarray:
+        t0 = time.perf_counter()
+        proba = self.submit(X).result(timeout=timeout)
+        self.stats.add_request((time.perf_counter() - t0) * 1000.0, len(X))
+        return proba
+
+    def close(self):
+        self._stop.set()
+        self._q.put(None)
+        self._worker.join(timeout=5)
+
+    def _collect(self, first):
+        items = [first]
+        n_rows = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while n_rows < self.max_batch_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._stop.set()
+                break
+            items.append(item)
+            n_rows += len(item[0])
+        return items, n_rows
+
+    def _loop(self):
+        while not self._stop.is_set():
+            first = self._q.get()
+            if first is None:
+                break
+            items, n_rows = self._collect(first)
+            try:
+                proba = self._pontuar(pd.concat([x for x, _ in items], ignore_index=True))
+            except Exception as e:
+                if len(items) == 1:
+                    items[0][1].set_exception(e)
+                    continue
+                # lote falhou: pontua cada requisição sozinha para só a inválida receber o erro
+                for x, fut in items:
+                    try:
+                        fut.set_result(self._pontuar(x))
+                    except Exception as e_req:
+                        fut.set_exception(e_req)
+                self.stats.add_batch(n_rows)
+                continue
+            self.stats.add_batch(n_rows)
+            start = 0
+            for x, fut in items:
+                fut.set_result(proba[start:start + len(x)])
+                start += len(x)
+
+    def _pontuar(self, X: pd.DataFrame) -> np.ndarray:
+        X = X[self.x_cols]
+        if self.sombra is not None:
+            return self.sombra.predict_proba(X)
+        if hasattr(self.pipeline, "engine"):  # ModelBundle: motor compilado, se houver
+            return self.pipeline.predict_proba(X)
+        return predict_proba_multilabel(self.pipeline, X, len(LABELS))
@@ -0,0 +1,200 @@
+# Pontuação sombra (campeão/desafiantes) para decidir promoções com dados.
+# - O campeão responde pelo caminho de sempre (motor compilado do bundle, pool de
+#   processos do score_stream); observar() entrega o lote e as probabilidades dele aos
+#   desafiantes, que pontuam numa thread à parte, fora do caminho crítico. Fila limitada:
+#   se os desafiantes atrasam, o lote é descartado para eles (contado em "descartados")
+#   em vez de segurar o campeão
+# - impressao_prep(): joblib.hash do ColumnTransformer ajustado; desafiantes com a mesma
+#   impressão compartilham a matriz pré-processada (um prep.transform por lote, na sombra)
+# - Por desafiante, em memória constante: concordância das decisões por rótulo (limiares
+#   de cada modelo), delta de probabilidade (médio, |médio|, máximo) e latência por lote
+
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from joblib import hash as joblib_hash
+
+from src.utils import LABELS, predict_proba_multilabel, predict_proba_transformada
+from src.serving import LatencyStats
+
+
+def _pipeline(modelo):
+    """ModelBundle -> pipeline sklearn (o prep compartilhado precisa do ColumnTransformer)."""
+    return modelo.pipeline if hasattr(modelo, "engine") else modelo
+
+
+def _ms(v) -> str:
+    return "-" if v is None else "%.1f" % v
+
+
+def impressao_prep(modelo):
+    """Hash do pré-processamento ajustado (None: sem prep único, ex.: FoldEnsemble)."""
+    m = _pipeline(modelo)
+    if not hasattr(m, "named_steps"):
+        return None
+    return joblib_hash(m.named_steps["prep"])
+
+
+class _Modelo:
+    def __init__(self, modelo, limiares, n_labels, impressao: bool = True):
+        self.modelo = modelo
+        # campeão sem impressão: um bundle com motor nem chega a carregar o pipeline
+        self.impressao = impressao_prep(modelo) if impressao else None
+        ths = getattr(modelo, "thresholds", None)  # bundle: limiares do próprio manifesto
+        self.limiares = np.asarray(ths if ths is not None else limiares, dtype=np.float64)
+        self.lat = LatencyStats()
+        self.n_labels = n_labels
+
+    def transformar(self, X):
+        return _pipeline(self.modelo).named_steps["prep"].transform(X)
+
+    def proba(self, X, Xt=None):
+        if Xt is not None:
+            return predict_proba_transformada(_pipeline(self.modelo).named_steps["clf"], Xt)
+        if hasattr(self.modelo, "engine"):  # bundle: motor compilado, se houver
+            return self.modelo.predict_proba(X)
+        return predict_proba_multilabel(self.modelo, X, self.n_labels)
+
+
+class _Comparacao:
+    """Somas acumuladas desafiante x campeão (memória não cresce com o volume)."""
+
+    def __init__(self, n_labels):
+        self.linhas = 0
+        self.erros = 0
+        self.concordam = np.zeros(n_labels, dtype=np.int64)
+        self.concordam_todas = 0
+        self.soma_delta = np.zeros(n_labels)
+        self.soma_abs = np.zeros(n_labels)
+        self.max_abs = np.zeros(n_labels)
+
+    def atualizar(self, p_camp, d_camp, p_des, d_des):
+        delta = p_des - p_camp
+        igual = d_camp == d_des
+        self.linhas += len(p_camp)
+        self.concordam += igual.sum(axis=0)
+        self.concordam_todas += int(igual.all(axis=1).sum())
+        self.soma_delta += delta.sum(axis=0)
+        self.soma_abs += np.abs(delta).sum(axis=0)
+        if len(delta):
+            self.max_abs = np.maximum(self.max_abs, np.abs(delta).max(axis=0))
+
+
+class ShadowScorer:
+    """
+    predict_proba(X) devolve as probabilidades do campeão; os desafiantes rodam em segundo
+    plano. Quem já pontuou o campeão por outro caminho chama só observar(X, proba).
+    """
+
+    def __init__(self, campeao, desafiantes: dict, x_cols, limiares=None, labels=LABELS,
+                 max_pendentes: int = 8):
+        self.labels = list(labels)
+        self.x_cols = list(x_cols)
+        padrao = np.full(len(self.labels), 0.5) if limiares is None else limiares
+        self.campeao = _Modelo(campeao, padrao, len(self.labels), impressao=False)
+        self.desafiantes = {nome: _Modelo(m, padrao, len(self.labels)) for nome, m in desafiantes.items()}
+        contagem = Counter(m.impressao for m in self.desafiantes.values() if m.impressao is not None)
+        self.compartilham = {nome for nome, m in self.desafiantes.items() if contagem[m.impressao] > 1}
+        self.comparacoes = {nome: _Comparacao(len(self.labels)) for nome in self.desafiantes}
+        self.prep = LatencyStats()
+        self.max_pendentes = int(max_pendentes)
+        self.lotes = 0
+        self.descartados = 0
+        self._pendentes = 0
+        self._cond = threading.Condition()
+        # uma thread: desafiantes em sequência, sem disputar mais núcleos com o campeão
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sombra")
+
+    def predict_proba(self, X):
+        X = X[self.x_cols]
+        t0 = time.perf_counter()
+        proba = self.campeao.proba(X)
+        self.campeao.lat.add_request((time.perf_counter() - t0) * 1000.0, len(X))
+        self.observar(X, proba)
+        return proba
+
+    def observar(self, X, p_camp):
+        """Enfileira o lote (já pontuado pelo campeão) para os desafiantes; nunca bloqueia."""
+        with self._cond:
+            self.lotes += 1
+            if self._pendentes >= self.max_pendentes:
+                self.descartados += 1
+                return
+            self._pendentes += 1
+        self._pool.submit(self._sombra, X[self.x_cols], p_camp)
+
+    def _sombra(self, X, p_camp):
+        try:
+            d_camp = p_camp >= self.campeao.limiares
+            matrizes = {}  # impressão -> prep.transform do lote (um por grupo)
+            for nome, m in self.desafiantes.items():
+                comp = self.comparacoes[nome]
+                t0 = time.perf_counter()
+                try:
+                    Xt = None
+                    if nome in self.compartilham:
+                        if m.impressao not in matrizes:
+                            matrizes[m.impressao] = m.transformar(X)
+                            self.prep.add_request((time.perf_counter() - t0) * 1000.0, len(X))
+                        Xt = matrizes[m.impressao]
+                    p = m.proba(X, Xt)
+                except Exception:
+                    comp.erros += 1
+                    continue
+                m.lat.add_request((time.perf_counter() - t0) * 1000.0, len(X))
+                comp.atualizar(p_camp, d_camp, p, p >= m.limiares)
+        finally:
+            with self._cond:
+                self._pendentes -= 1
+                self._cond.notify_all()
+
+    def aguardar(self, timeout: float = None):
+        """Espera os desafiantes terminarem os lotes já enviados."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pendentes == 0, timeout=timeout)
+
+    def fechar(self):
+        self.aguardar()
+        self._pool.shutdown(wait=True)
+
+    def relatorio(self) -> dict:
+        def lat(stats):
+            s = stats.snapshot()
+            return {"latencia_ms_p50": s["latency_ms_p50"], "latencia_ms_p99": s["latency_ms_p99"]}
+
+        with self._cond:
+            out = {"lotes": self.lotes, "descartados": self.descartados, "campeao": lat(self.campeao.lat),
+                   "prep_compartilhado_ms_p50": self.prep.snapshot()["latency_ms_p50"], "desafiantes": {}}
+        for nome, m in self.desafiantes.items():
+            c = self.comparacoes[nome]
+            n = max(c.linhas, 1)
+            out["desafiantes"][nome] = {
+                "impressao_prep": m.impressao, "prep_compartilhado": nome in self.compartilham,
+                "linhas": c.linhas, "erros": c.erros, **lat(m.lat),
+                "concordancia_todas": round(c.concordam_todas / n, 6),
+                "rotulos": {lab: {"concordancia": round(float(c.concordam[j]) / n, 6),
+                                  "delta_medio": round(float(c.soma_delta[j]) / n, 6),
+                                  "delta_abs_medio": round(float(c.soma_abs[j]) / n, 6),
+                                  "delta_abs_max": round(float(c.max_abs[j]), 6)}
+                            for j, lab in enumerate(self.labels)},
+            }
+        return out
+
+    def tabela(self) -> str:
+        rel = self.relatorio()
+        camp = rel["campeao"]
+        linhas = ["campeão: p50 %s ms/lote | prep compartilhado %s ms | %d lotes, %d descartados na sombra" % (
+            _ms(camp["latencia_ms_p50"]), _ms(rel["prep_compartilhado_ms_p50"]), rel["lotes"], rel["descartados"])]
+        for nome, d in rel["desafiantes"].items():
+            linhas.append("\n%s: p50 %.1f ms/lote%s | %d linhas | concordância total %.4f | erros %d" % (
+                nome, d["latencia_ms_p50"] or 0.0, " (prep compartilhado)" if d["prep_compartilhado"] else "",
+                d["linhas"], d["concordancia_todas"], d["erros"]))
+            linhas.append("  %-6s %12s %12s %12s %12s" % ("rótulo", "concordância", "delta médio", "|delta| méd.",
+                                                            "|delta| máx."))
+            for lab, r in d["rotulos"].items():
+                linhas.append("  %-6s %12.4f %+12.4f %12.4f %12.4f" % (
+                    lab, r["concordancia"], r["delta_medio"], r["delta_abs_medio"], r["delta_abs_max"]))
+        return "\n".join(linhas)
@@ -0,0 +1,398 @@
+# Motor de árvores "compilado" em arrays NumPy.
+# - exportar(pipeline) achata todas as florestas (RF e XGBoost) do pipeline em
+#   arrays contíguos de nós e incorpora a imputação/one-hot do ColumnTransformer
+# - CompiledForest.predict_proba avalia os 5 rótulos numa única passada vetorizada
+# - CompiledForest.contribuicoes: atribuições por caminho (Saabas) por variável e
+#   rótulo para um lote inteiro, na mesma descida vetorizada
+# - O artefato (.npz) é carregado só com NumPy: sem importar sklearn/xgboost
+#
+# Uso (CLI):
+#   python -m src.tree_engine --model results/modelo_multilabel_rf.joblib \
+#       --out results/modelo_compilado.npz --check data/bootcamp_test.csv
+
+import os
+import json
+
+import numpy as np
+
+ENGINE_VERSION = 1
+KIND_MEAN = 0   # RF: média das probabilidades das folhas
+KIND_LOGIT = 1  # XGB: soma das margens + base_score -> sigmoide
+
+_ARRAY_KEYS = ("left", "right", "feature", "threshold", "value", "roots",
+               "label_kind", "label_scale", "label_base", "num_fill")
+
+
+class CompiledForest:
+    """Avaliador vetorizado das árvores achatadas (somente NumPy)."""
+
+    def __init__(self, arrays: dict, meta: dict):
+        for k in _ARRAY_KEYS:
+            setattr(self, k, arrays[k])
+        self.cat_fill = list(meta["cat_fill"])
+        self.cat_categories = [arrays[f"cat_{i}"] for i in range(len(meta["cat_cols"]))]
+        self.meta = meta
+        self.num_cols = list(meta["num_cols"])
+        self.cat_cols = list(meta["cat_cols"])
+        self.labels = list(meta["labels"])
+        self.max_depth = int(meta["max_depth"])
+        self.n_features = int(meta["n_features"])
+        self.is_leaf = arrays["is_leaf"] if "is_leaf" in arrays else self.left == np.arange(len(self.left))
+
+    # --- pré-processamento (equivalente ao ColumnTransformer) ---
+    def transform(self, X) -> np.ndarray:
+        n = len(X[self.num_cols[0] if self.num_cols else self.cat_cols[0]])
+        Xt = np.zeros((n, self.n_features), dtype=np.float32)
+        for j, c in enumerate(self.num_cols):
+            col = np.asarray(X[c], dtype=np.float64)
+            Xt[:, j] = np.where(np.isnan(col), self.num_fill[j], col)
+        j = len(self.num_cols)
+        for i, c in enumerate(self.cat_cols):
+            col = np.asarray(X[c], dtype=object)
+            col = np.where(col != col, self.cat_fill[i], col)  # NaN -> mais frequente
+            for cat in self.cat_categories[i]:
+                Xt[:, j] = col == cat  # categorias desconhecidas ficam zeradas
+                j += 1
+        return Xt
+
+    # --- avaliação das árvores ---
+    def _leaves(self, Xt: np.ndarray) -> np.ndarray:
+        n, n_feat = Xt.shape
+        x_flat = Xt.ravel()
+        node = np.repeat(self.roots.astype(np.int64), n)    # (arvore, linha) achatado
+        base = np.tile(np.arange(n, dtype=np.int64) * n_feat, len(self.roots))
+        active = np.flatnonzero(~self.is_leaf[node])
+        # só os caminhos que ainda não chegaram numa folha seguem descendo
+        while active.size:
+            nd = node[active]
+            x = x_flat[base[active] + self.feature[nd]]
+            nxt = np.where(x <= self.threshold[nd], self.left[nd], self.right[nd])
+            node[active] = nxt
+            active = active[~self.is_leaf[nxt]]
+        return node.reshape(len(self.roots), n)
+
+    def predict_margin(self, Xt: np.ndarray, block_rows: int = 0) -> np.ndarray:
+        n = Xt.shape[0]
+        n_trees, n_labels = len(self.roots), self.value.shape[1]
+        if not block_rows:
+            # limita (n_arvores x bloco) a ~4M caminhos simultâneos
+            block_rows = max(1, 4_000_000 // max(1, n_trees))
+        acc = np.empty((n, n_labels), dtype=np.float64)
+        for s in range(0, n, block_rows):
+            leaves = self._leaves(Xt[s:s + block_rows])
+            acc[s:s + block_rows] = self.value[leaves].sum(axis=0)
+        return acc * self.label_scale + self.label_base
+
+    # --- atribuições por caminho (Saabas) ---
+    def _grupos(self) -> np.ndarray:
+        """Coluna de entrada de cada feature do motor (as do one-hot somam na categórica)."""
+        cat = np.repeat(np.arange(len(self.cat_cols)) + len(self.num_cols),
+                        [len(c) for c in self.cat_categories])
+        return np.concatenate([np.arange(len(self.num_cols)), cat]).astype(np.int64)
+
+    def _rotulo_arvore(self):
+        """Rótulo de cada árvore quando cada uma serve um só (MultiOutputClassifier); None se multi-saída."""
+        usados = np.add.reduceat(self.value != 0, self.roots.astype(np.int64), axis=0)
+        if ((usados > 0).sum(axis=1) > 1).any():
+            return None
+        return np.argmax(usados > 0, axis=1)
+
+    def _contrib_bloco(self, Xt: np.ndarray, grupo: np.ndarray, n_grupos: int, rotulo) -> np.ndarray:
+        n, n_feat = Xt.shape
+        n_labels = self.value.shape[1]
+        x_flat = Xt.ravel()
+        node = np.repeat(self.roots.astype(np.int64), n)
+        linha = np.tile(np.arange(n, dtype=np.int64), len(self.roots))
+        lab = None if rotulo is None else np.repeat(rotulo, n)
+        acc = np.zeros((n_labels, n * n_grupos))
+        active = np.flatnonzero(~self.is_leaf[node])
+        while active.size:
+            nd = node[active]
+            f = self.feature[nd]
+            nxt = np.where(x_flat[linha[active] * n_feat + f] <= self.threshold[nd], self.left[nd], self.right[nd])
+            # cada split credita à sua variável a variação do valor do nó (pai -> filho)
+            idx = linha[active] * n_grupos + grupo[f]
+            if lab is None:
+                delta = self.value[nxt] - self.value[nd]
+                for k in range(n_labels):
+                    acc[k] += np.bincount(idx, weights=delta[:, k], minlength=n * n_grupos)
+            else:  # árvore de um rótulo só: uma única soma em (rótulo, linha, variável)
+                k = lab[active]
+                acc += np.bincount(k * (n * n_grupos) + idx, weights=self.value[nxt, k] - self.value[nd, k],
+                                   minlength=acc.size).reshape(acc.shape)
+            node[active] = nxt
+            active = active[~self.is_leaf[nxt]]
+        return acc.reshape(n_labels, n, n_grupos).transpose(1, 2, 0)
+
+    def contribuicoes_transformed(self, Xt: np.ndarray, block_rows: int = 0):
+        """(base (n_labels,), contrib (n, n_variaveis, n_labels)); base + contrib.sum(axis=1) = margem."""
+        Xt = np.ascontiguousarray(Xt, dtype=np.float32)
+        grupo = self._grupos()
+        n_grupos = len(self.num_cols) + len(self.cat_cols)
+        n = Xt.shape[0]
+        if not block_rows:
+            block_rows = max(1, 4_000_000 // max(1, len(self.roots)))
+        rotulo = self._rotulo_arvore()
+        contrib = np.empty((n, n_grupos, self.value.shape[1]))
+        for s in range(0, n, block_rows):
+            contrib[s:s + block_rows] = self._contrib_bloco(Xt[s:s + block_rows], grupo, n_grupos, rotulo)
+        contrib *= self.label_scale
+        base = self.value[self.roots].sum(axis=0) * self.label_scale + self.label_base
+        return base, contrib
+
+    def contribuicoes(self, X):
+        """Atribuições por variável de entrada (margem: probabilidade no RF, logit no XGBoost)."""
+        return self.contribuicoes_transformed(self.transform(X))
+
+    def predict_proba_transformed(self, Xt: np.ndarray) -> np.ndarray:
+        out = self.predict_margin(np.ascontiguousarray(Xt, dtype=np.float32))
+        logit = self.label_kind == KIND_LOGIT
+        if logit.any():
+            out[:, logit] = 1.0 / (1.0 + np.exp(-out[:, logit]))
+        return out
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.predict_proba_transformed(self.transform(X))
+
+    # --- persistência ---
+    def save(self, path: str):
+        arrays = {k: getattr(self, k) for k in _ARRAY_KEYS}
+        for i, cats in enumerate(self.cat_categories):
+            arrays[f"cat_{i}"] = cats
+        arrays["meta"] = np.array(json.dumps(self.meta))
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledForest":
+        with np.load(path, allow_pickle=False) as z:
+            arrays = {k: z[k] for k in z.files}
+        return cls(arrays, json.loads(str(arrays.pop("meta"))))
+
+    def save_dir(self, path: str):
+        """Um .npy sem compressão por array (+ meta.json): carregável com mmap_mode."""
+        os.makedirs(path, exist_ok=True)
+        arrays = {k: getattr(self, k) for k in _ARRAY_KEYS + ("is_leaf",)}
+        for i, cats in enumerate(self.cat_categories):
+            arrays[f"cat_{i}"] = np.asarray(cats, dtype=str)
+        for k, v in arrays.items():
+            np.save(os.path.join(path, k + ".npy"), np.ascontiguousarray(v))
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=2)
+
+    @classmethod
+    def load_dir(cls, path: str, mmap_mode: str = "r") -> "CompiledForest":
+        """Com mmap_mode="r", processos que carregam o mesmo diretório compartilham as páginas."""
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {}
+        for name in os.listdir(path):
+            if name.endswith(".npy"):
+                k = name[:-4]
+                arrays[k] = np.load(os.path.join(path, name), mmap_mode=None if k.startswith("cat_") else mmap_mode)
+        return cls(arrays, meta)
+
+
+# ---------------------------------------------------------------------------
+# Exportação (usa objetos sklearn/xgboost já carregados, sem importá-los aqui)
+# ---------------------------------------------------------------------------
+
+class _Builder:
+    def __init__(self, n_labels: int):
+        self.n_labels = n_labels
+        self.left, self.right, self.feature = [], [], []
+        self.threshold, self.value, self.roots = [], [], []
+        self.offset = 0
+        self.max_depth = 0
+
+    def add_tree(self, left, right, feature, threshold, value, depth):
+        n = len(left)
+        idx = np.arange(n) + self.offset
+        leaf = left < 0
+        self.left.append(np.where(leaf, idx, left + self.offset).astype(np.int32))
+        self.right.append(np.where(leaf, idx, right + self.offset).astype(np.int32))
+        self.feature.append(np.where(leaf, 0, feature).astype(np.int32))
+        self.threshold.append(np.where(leaf, np.inf, threshold).astype(np.float64))
+        self.value.append(value.astype(np.float64))
+        self.roots.append(self.offset)
+        self.offset += n
+        self.max_depth = max(self.max_depth, int(depth))
+
+    def arrays(self) -> dict:
+        return {
+            "left": np.concatenate(self.left),
+            "right": np.concatenate(self.right),
+            "feature": np.concatenate(self.feature),
+            "threshold": np.concatenate(self.threshold),
+            "value": np.concatenate(self.value),
+            "roots": np.asarray(self.roots, dtype=np.int32),
+        }
+
+
+def _export_prep(prep):
+    num_cols, num_fill, cat_cols, cat_fill, cat_categories = [], [], [], [], []
+    for name, trans, cols in prep.transformers_:
+        if name == "remainder" or trans == "drop":
+            continue
+        steps = dict(trans.steps) if hasattr(trans, "steps") else {name: trans}
+        unsupported = [type(s).__name__ for s in steps.values()
+                       if type(s).__name__ not in ("SimpleImputer", "OneHotEncoder")]
+        if unsupported:
+            raise NotImplementedError(f"Transformação não suportada no motor compilado: {unsupported}")
+        imputer = steps.get("imputer")
+        ohe = steps.get("ohe")
+        if ohe is None:
+            if cat_cols:
+                raise NotImplementedError("Bloco numérico após o categórico no ColumnTransformer.")
+            num_cols += list(cols)
+            num_fill += list(imputer.statistics_) if imputer is not None else [np.nan] * len(cols)
+            continue
+        if ohe.drop is not None or getattr(ohe, "_infrequent_enabled", False):
+            raise NotImplementedError("OneHotEncoder com drop/infrequent não suportado.")
+        for k, c in enumerate(cols):
+            cats = ohe.categories_[k]
+            if not all(isinstance(v, str) for v in cats):
+                raise NotImplementedError(f"Categorias não textuais em '{c}'.")
+            cat_cols.append(c)
+            cat_fill.append(str(imputer.statistics_[k]) if imputer is not None else "")
+            cat_categories.append(np.asarray(cats, dtype=str))
+    return num_cols, np.asarray(num_fill, dtype=np.float64), cat_cols, cat_fill, cat_categories
+
+
+def _add_sklearn_forest(builder, forest, label_idx=None):
+    """label_idx=None: floresta multi-saída nativa (saída k -> rótulo k)."""
+    joint = label_idx is None
+    classes = [list(c) for c in forest.classes_] if joint else [list(forest.classes_)]
+    outputs = range(len(classes)) if joint else [label_idx]
+    for tree in forest.estimators_:
+        t = tree.tree_
+        value = np.zeros((t.node_count, builder.n_labels))
+        for k, (lab, cls) in enumerate(zip(outputs, classes)):
+            if 1 not in cls:
+                continue
+            v = t.value[:, k, :len(cls)]
+            norm = v.sum(axis=1)
+            norm[norm == 0] = 1.0
+            value[:, lab] = v[:, cls.index(1)] / norm
+        builder.add_tree(t.children_left, t.children_right, t.feature, t.threshold, value, t.max_depth)
+    return len(forest.estimators_)
+
+
+def _tree_depth(left, right):
+    depth = np.zeros(len(left), dtype=np.int64)
+    for i in range(len(left)):  # nós do XGBoost vêm em ordem pai -> filho
+        if left[i] >= 0:
+            depth[left[i]] = depth[right[i]] = depth[i] + 1
+    return int(depth.max())
+
+
+def _add_xgb_booster(builder, est, label_idx):
+    model = json.loads(bytes(est.get_booster().save_raw(raw_format="json")))
+    learner = model["learner"]
+    # xgboost >= 3 grava base_score como vetor ("[3.8E-2]")
+    base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]").split(",")[0])
+    base_margin = float(np.log(base_score / (1.0 - base_score)))
+    for tree in learner["gradient_booster"]["model"]["trees"]:
+        left = np.asarray(tree["left_children"], dtype=np.int64)
+        right = np.asarray(tree["right_children"], dtype=np.int64)
+        cond = np.asarray(tree["split_conditions"], dtype=np.float32)
+        hess = np.asarray(tree["sum_hessian"], dtype=np.float64)
+        leaf = left < 0
+        # XGBoost usa x < cond (float32); x <= nextafter(cond, -inf) é equivalente
+        thr = np.nextafter(cond, np.float32(-np.inf)).astype(np.float64)
+        node_val = np.where(leaf, cond, 0.0).astype(np.float64)
+        for i in range(len(left) - 1, -1, -1):  # nós internos: média ponderada pela hessiana
+            if not leaf[i]:
+                hl, hr = hess[left[i]], hess[right[i]]
+                node_val[i] = (hl * node_val[left[i]] + hr * node_val[right[i]]) / max(hl + hr, 1e-12)
+        value = np.zeros((len(left), builder.n_labels))
+        value[:, label_idx] = node_val
+        builder.add_tree(left, right, np.asarray(tree["split_indices"]), thr, value,
+                         _tree_depth(left, right))
+    return base_margin
+
+
+def exportar(pipeline, labels) -> CompiledForest:
+    """Achata o pipeline treinado (prep + MultiOutputClassifier ou RF multi-saída) em um CompiledForest."""
+    if not hasattr(pipeline, "named_steps"):
+        raise NotImplementedError(f"Só pipelines únicos podem ser compilados ({type(pipeline).__name__}).")
+    prep = pipeline.named_steps["prep"]
+    clf = pipeline.named_steps["clf"]
+    num_cols, num_fill, cat_cols, cat_fill, cat_categories = _export_prep(prep)
+    n_labels = len(labels)
+    builder = _Builder(n_labels)
+    label_kind = np.zeros(n_labels, dtype=np.int8)
+    label_scale = np.ones(n_labels)
+    label_base = np.zeros(n_labels)
+
+    joint = getattr(clf, "n_outputs_", 1) == n_labels
+    if joint:
+        # floresta multi-saída nativa (--model rf_joint): cada árvore serve todos os rótulos
+        label_scale[:] = 1.0 / _add_sklearn_forest(builder, clf)
+    elif not hasattr(clf, "estimators_") or len(clf.estimators_) != n_labels:
+        raise NotImplementedError(f"Classificador não suportado: {type(clf).__name__}")
+    for j, est in enumerate([] if joint else clf.estimators_):
+        kind = type(est).__name__
+        if kind in ("RandomForestClassifier", "ExtraTreesClassifier"):
+            label_scale[j] = 1.0 / _add_sklearn_forest(builder, est, j)
+        elif kind == "XGBClassifier":
+            if getattr(prep, "sparse_output_", False):
+                # no CSR o XGBoost trata zeros implícitos como ausentes (ramo default); o motor é denso
+                raise NotImplementedError("XGBoost com saída esparsa do prep (ex.: one-hot de id_produto).")
+            label_kind[j] = KIND_LOGIT
+            label_base[j] = _add_xgb_booster(builder, est, j)
+        else:
+            raise NotImplementedError(f"Estimador não suportado: {kind}")
+
+    arrays = builder.arrays()
+    arrays.update(label_kind=label_kind, label_scale=label_scale,
+                  label_base=label_base, num_fill=num_fill)
+    for i, cats in enumerate(cat_categories):
+        arrays[f"cat_{i}"] = cats
+    meta = {
+        "engine_version": ENGINE_VERSION,
+        "labels": list(labels),
+        "num_cols": num_cols,
+        "cat_cols": cat_cols,
+        "cat_fill": cat_fill,
+        "n_features": len(num_cols) + sum(len(c) for c in cat_categories),
+        "max_depth": builder.max_depth,
+    }
+    return CompiledForest(arrays, meta)
+
+
+def verificar(pipeline, engine: CompiledForest, X, atol: float = 1e-6) -> float:
+    """Compara o motor compilado com o caminho sklearn; levanta erro se divergir."""
+    from src.utils import predict_proba_multilabel
+    ref = predict_proba_multilabel(pipeline, X, len(engine.labels))
+    diff = float(np.abs(ref - engine.predict_proba(X)).max()) if len(X) else 0.0
+    if diff > atol:
+        raise AssertionError(f"Motor compilado diverge do sklearn: max |diff| = {diff:.3g} > {atol}")
+    return diff
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    import pandas as pd
+    from joblib import load
+
+    from src.utils import LABELS
+
+    ap = argparse.ArgumentParser(description="Exporta o pipeline treinado para o motor compilado (NumPy).")
+    ap.add_argument("--model", default="results/modelo_multilabel_rf.joblib")
+    ap.add_argument("--out", default="results/modelo_compilado.npz")
+    ap.add_argument("--check", default=None, help="CSV para conferir as saídas contra o sklearn.")
+    ap.add_argument("--atol", type=float, default=1e-6)
+    args = ap.parse_args()
+
+    pipe = load(args.model)
+    engine = exportar(pipe, LABELS)
+    engine.save(args.out)
+    print(f"[ok] Motor compilado salvo em: {args.out} ({len(engine.roots)} árvores, "
+          f"{len(engine.left)} nós, profundidade {engine.max_depth})")
+    if args.check:
+        X = pd.read_csv(args.check)
+        t0 = time.perf_counter()
+        diff = verificar(pipe, CompiledForest.load(args.out), X, atol=args.atol)
+        print(f"[ok] Conferência em {len(X)} linhas: max |diff| = {diff:.3g} ({time.perf_counter() - t0:.2f}s)")
@@ -1,7 +1,21 @@
+import json
+
 import numpy as np
 import pandas as pd
 
 LABELS = ['FDF','FDC','FP','FTE','FA']
+# colunas de entrada padrão (id_produto fica de fora; ver --use_id no main)
+X_COLS = [
+    'tipo',
+    'temperatura_ar',
+    'temperatura_processo',
+    'umidade_relativa',
+    'velocidade_rotacional',
+    'torque',
+    'desgaste_da_ferramenta',
+]
+SENSOR_COLS = X_COLS[1:]
+CAT_COLS = ['tipo', 'id_produto']
 LONG_MAP = {
     'FDF': 'FDF (Falha Desgaste Ferramenta)',
     'FDC': 'FDC (Falha Dissipacao Calor)',
@@ -14,29 +28,159 @@ def rename_label_columns(df: pd.DataFrame) -> pd.DataFrame:
     rename_dict = {v: k for k, v in LONG_MAP.items()}
     return df.rename(columns=rename_dict)
 
+def dtypes_leitura() -> dict:
+    """dtypes compactos para o read_csv: sensores float32 e categóricas como category."""
+    dt = {c: 'float32' for c in SENSOR_COLS}
+    dt.update({c: 'category' for c in CAT_COLS})
+    return dt
+
 def to_binary(series: pd.Series) -> pd.Series:
-    s = pd.to_numeric(series, errors='coerce').fillna(0)
-    return s.clip(lower=0, upper=1).astype(int)
+    # não numérico/NaN -> 0; corta em [0, 1] e trunca (como astype(int)); saída uint8.
+    # texto/category: converte só os valores distintos e indexa pelos códigos
+    if pd.api.types.is_numeric_dtype(series.dtype) and not isinstance(series.dtype, pd.CategoricalDtype):
+        v = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, na_value=0.0)
+        np.clip(v, 0, 1, out=v)
+        out = v.astype(np.uint8)
+    else:
+        codes, uniques = pd.factorize(series)  # NaN -> código -1
+        u = pd.to_numeric(pd.Series(np.asarray(uniques, dtype=object)), errors='coerce')
+        u = np.clip(u.to_numpy(dtype=np.float64, na_value=0.0), 0, 1).astype(np.uint8)
+        out = np.append(u, np.uint8(0))[codes]  # -1 -> último (0)
+    return pd.Series(out, index=series.index, name=series.name)
 
 def corrigir_negativos(df: pd.DataFrame, excluir=None) -> pd.DataFrame:
-    df = df.copy()
+    """
+    Substitui valores negativos pela mediana dos não negativos da coluna. Trabalha
+    coluna a coluna no dtype de cada uma (sem bloco float64 do frame): só as colunas
+    com negativos são copiadas e reescritas. Altera `df` no lugar e o devolve.
+    """
     excluir = set(excluir or [])
     for c in df.select_dtypes(include=[np.number]).columns:
         if c in excluir:
             continue
-        mask = df[c] < 0
-        if mask.any():
-            mediana = df.loc[~mask, c].median() if (~mask).any() else 0
-            df.loc[mask, c] = mediana
+        col = df[c].to_numpy()
+        neg = col < 0  # NaN -> False
+        if not neg.any():
+            continue
+        ok = ~neg & ~np.isnan(col) if col.dtype.kind == 'f' else ~neg
+        med = np.median(col[ok]) if ok.any() else 0
+        if col.dtype.kind == 'f':
+            novo = col.copy()
+            novo[neg] = med
+        else:  # inteiro: a mediana pode ser fracionária (como no df.loc[mask, c] = mediana)
+            novo = np.where(neg, med, col)
+        df[c] = novo
     return df
 
+def _proba_positiva(p: np.ndarray, classes) -> np.ndarray:
+    classes = list(classes)
+    if 1 not in classes:  # rótulo sem positivos no treino
+        return np.zeros(p.shape[0])
+    return p[:, classes.index(1)]
+
+class FoldEnsemble:
+    """Média das probabilidades dos modelos de cada fold (main.py --cv K --cv_final ensemble)."""
+
+    def __init__(self, models):
+        self.models = list(models)
+
 def predict_proba_multilabel(pipeline, X, n_labels: int) -> np.ndarray:
-    moc = pipeline.named_steps['clf']
-    X_trans = pipeline.named_steps['prep'].transform(X)
-    probas = []
-    for est in moc.estimators_:
-        probas.append(est.predict_proba(X_trans)[:, 1])
+    if isinstance(pipeline, FoldEnsemble):
+        return np.mean([predict_proba_multilabel(m, X, n_labels) for m in pipeline.models], axis=0)
+    return predict_proba_transformada(pipeline.named_steps['clf'], pipeline.named_steps['prep'].transform(X))
+
+def predict_proba_transformada(moc, X_trans) -> np.ndarray:
+    """Probabilidades positivas por rótulo a partir da matriz já pré-processada."""
+    if hasattr(moc, 'n_outputs_'):
+        # floresta multi-saída nativa (--model rf_joint): uma passada para todos os rótulos
+        probas = [_proba_positiva(p, c) for p, c in zip(moc.predict_proba(X_trans), moc.classes_)]
+    else:
+        probas = [_proba_positiva(est.predict_proba(X_trans), est.classes_) for est in moc.estimators_]
     return np.vstack(probas).T  # (n_amostras, n_labels)
 
+def contribuicoes_multilabel(modelo, X, labels=LABELS):
+    """
+    Atribuições por caminho de árvore (Saabas) dos rótulos para um lote inteiro, no motor compilado.
+    Retorna (base (n_labels,), contrib (n, n_variaveis, n_labels), nomes das variáveis), com
+    base + contrib.sum(axis=1) = margem (probabilidade no RF, logit no XGBoost).
+    Aceita pipeline treinado, FoldEnsemble (média dos folds), ModelBundle ou CompiledForest.
+    """
+    from src.tree_engine import exportar
+
+    if isinstance(modelo, FoldEnsemble):
+        partes = [contribuicoes_multilabel(m, X, labels) for m in modelo.models]
+        return (np.mean([p[0] for p in partes], axis=0), np.mean([p[1] for p in partes], axis=0), partes[0][2])
+    if hasattr(modelo, "engine"):  # ModelBundle: motor mapeado, ou achata o pipeline salvo
+        modelo = modelo.engine if modelo.engine is not None else modelo.pipeline
+    motor = modelo if hasattr(modelo, "contribuicoes") else exportar(modelo, labels)
+    base, contrib = motor.contribuicoes(X)
+    return base, contrib, motor.num_cols + motor.cat_cols
+
+def montar_submissao(ids, proba: np.ndarray, decimals: int = 6) -> pd.DataFrame:
+    subm = pd.DataFrame(np.round(proba, decimals), columns=LABELS)
+    subm.insert(0, 'id', np.asarray(ids))
+    return subm
+
 def to_long_columns(df_subm: pd.DataFrame) -> pd.DataFrame:
     return df_subm.rename(columns=LONG_MAP)
+
+def load_threshold(path: str, default: float = 0.30) -> float:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return float(f.read().strip())
+    except Exception:
+        return default
+
+def choose_best_thresholds(y_true: np.ndarray, y_proba: np.ndarray, default: float = 0.5):
+    """
+    Limiar ótimo de F1 por rótulo (exato): ordena as probabilidades de cada rótulo
+    uma vez e avalia todos os pontos de corte distintos com somas acumuladas.
+    Regra de decisão: positivo se proba >= limiar. Retorna (limiares, f1s).
+    """
+    y_true = np.asarray(y_true)
+    y_proba = np.asarray(y_proba, dtype=np.float64)
+    n_labels = y_proba.shape[1]
+    ths = np.full(n_labels, float(default))
+    f1s = np.zeros(n_labels)
+    for j in range(n_labels):
+        order = np.argsort(-y_proba[:, j], kind='mergesort')
+        p = y_proba[order, j]
+        tp = np.cumsum(y_true[order, j] > 0)
+        n_pos = tp[-1] if tp.size else 0
+        if n_pos == 0:
+            continue  # sem positivos: F1 = 0 em qualquer corte, mantém o default
+        last = np.r_[p[1:] != p[:-1], True]  # último índice de cada valor distinto
+        tp_cut = tp[last]
+        pred_pos = np.flatnonzero(last) + 1
+        f1 = 2.0 * tp_cut / (pred_pos + n_pos)
+        best = int(np.argmax(f1))  # empate -> maior limiar (menos positivos)
+        ths[j], f1s[j] = p[last][best], f1[best]
+    return ths, f1s
+
+def alinhar_limiares(proba: np.ndarray, thresholds, alvo: float = 0.5, decimals: int = 6) -> np.ndarray:
+    """
+    Reescala cada rótulo de forma monotônica (linear por partes) para que o seu limiar
+    caia em `alvo`: proba >= limiar  <=>  proba_alinhada >= alvo. A ordem (ROC AUC)
+    não muda; serve para avaliar limiares por rótulo com um único threshold na API.
+    Abaixo do limiar o teto é alvo - 10**-decimals: arredondada no CSV (montar_submissao)
+    ou gravada em float32, a probabilidade não sobe até o alvo.
+    """
+    th = np.clip(np.asarray(thresholds, dtype=np.float64), 1e-12, 1 - 1e-12)
+    p = np.asarray(proba, dtype=np.float64)
+    baixo = p * (alvo / th)
+    alto = alvo + (p - th) * ((1.0 - alvo) / (1.0 - th))
+    return np.where(p >= th, np.maximum(alto, alvo), np.minimum(baixo, alvo - 10.0 ** -decimals))
+
+def save_thresholds(path: str, thresholds) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({lab: float(t) for lab, t in zip(LABELS, thresholds)}, f, indent=2)
+
+def load_thresholds(path: str, fallback_path: str = None, default: float = 0.30) -> np.ndarray:
+    """Limiares por rótulo (JSON); sem o arquivo, repete o limiar único do fallback."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            d = json.load(f)
+        return np.array([float(d[lab]) for lab in LABELS])
+    except Exception:
+        th = load_threshold(fallback_path, default) if fallback_path else default
+        return np.full(len(LABELS), th)
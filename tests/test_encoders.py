@@ -0,0 +1,27 @@
+# Atualização incremental dos codificadores do id_produto (src/encoders.py).
+# Rodar da raiz do projeto: python -m pytest -q tests
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.encoders import FrequencyEncoder, TargetEncoderOOF
+
+
+def _lotes():
+    rng = np.random.default_rng(0)
+    ids = rng.choice(["A", "B", "C", "D"], size=300)
+    X = pd.DataFrame({"id_produto": ids})
+    Y = rng.integers(0, 2, size=(300, 5))
+    X.loc[250:, "id_produto"] = "E"  # categoria só no lote
+    return (X.iloc[:200], Y[:200]), (X.iloc[200:], Y[200:]), (X, Y)
+
+
+@pytest.mark.parametrize("cls", [FrequencyEncoder, TargetEncoderOOF])
+def test_atualizar_confere_com_refit(cls):
+    (X1, Y1), (X2, Y2), (X, Y) = _lotes()
+    enc = cls().fit(X1, Y1)
+    enc.atualizar(X2, Y2)
+    ref = cls().fit(X, Y)
+    teste = pd.DataFrame({"id_produto": ["A", "C", "E", "Z"]})
+    np.testing.assert_allclose(enc.transform(teste), ref.transform(teste), rtol=0, atol=1e-12)
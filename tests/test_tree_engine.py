@@ -0,0 +1,82 @@
+# Regressões do motor compilado (src/tree_engine.py).
+# Rodar da raiz do projeto: python -m pytest -q tests
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from main import build_pipeline
+from src.utils import LABELS
+from src.tree_engine import exportar, verificar
+
+NUM = ["temperatura_ar", "torque"]
+
+
+def _dados(n_produtos: int, linhas: int = 600, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        "id_produto": ["P%d" % i for i in rng.integers(0, n_produtos, linhas)],
+        "tipo": rng.choice(["L", "M", "H"], linhas),
+        "temperatura_ar": rng.normal(300, 2, linhas),
+        "torque": rng.normal(40, 10, linhas),
+    })
+    Y = pd.DataFrame({lab: (rng.random(linhas) < 0.3).astype(int) for lab in LABELS})
+    return X, Y
+
+
+def _com_lacunas(X, frac: float = 0.05, seed: int = 1):
+    # NaN nos sensores e no tipo (imputers) + categoria nunca vista no treino (one-hot ignora)
+    rng = np.random.default_rng(seed)
+    X = X.copy()
+    for c in NUM + ["tipo"]:
+        X.loc[rng.random(len(X)) < frac, c] = np.nan
+    X.loc[X.index[:5], "tipo"] = "Z"
+    return X
+
+
+def _rf(X, Y, model_name):
+    pipe = build_pipeline(["tipo"], NUM, model_name=model_name, profile="fast", n_jobs=1)
+    chave = "clf__n_estimators" if model_name == "rf_joint" else "clf__estimator__n_estimators"
+    pipe.set_params(**{chave: 20})
+    return pipe.fit(X, Y)
+
+
+@pytest.mark.parametrize("model_name", ["rf", "rf_joint"])
+def test_rf_confere_com_sklearn(model_name):
+    X, Y = _dados(n_produtos=3)
+    X = _com_lacunas(X[["tipo"] + NUM])
+    pipe = _rf(X.iloc[5:], Y.iloc[5:], model_name)
+    verificar(pipe, exportar(pipe, LABELS), X, atol=1e-6)
+
+
+def test_rf_divergencia_e_detectada():
+    # a tolerância testada precisa falhar quando o motor não é o do pipeline
+    X, Y = _dados(n_produtos=3)
+    X = X[["tipo"] + NUM]
+    pipe = _rf(X, Y, "rf")
+    outro = _rf(X, Y.iloc[::-1].reset_index(drop=True), "rf")
+    with pytest.raises(AssertionError):
+        verificar(pipe, exportar(outro, LABELS), X, atol=1e-6)
+
+
+def _xgb(X, Y, cat_cols):
+    pytest.importorskip("xgboost")
+    pipe = build_pipeline(cat_cols, NUM, model_name="xgb", profile="fast", n_jobs=1)
+    pipe.set_params(clf__estimator__n_estimators=20)
+    return pipe.fit(X, Y)
+
+
+def test_xgb_prep_esparso_nao_compila():
+    # one-hot de muitos produtos -> ColumnTransformer devolve CSR; zeros implícitos = ausentes no XGBoost
+    X, Y = _dados(n_produtos=300)
+    pipe = _xgb(X, Y, ["id_produto", "tipo"])
+    assert pipe.named_steps["prep"].sparse_output_
+    with pytest.raises(NotImplementedError):
+        exportar(pipe, LABELS)
+
+
+def test_xgb_prep_denso_confere():
+    X, Y = _dados(n_produtos=3)
+    pipe = _xgb(X[["tipo"] + NUM], Y, ["tipo"])
+    assert not pipe.named_steps["prep"].sparse_output_
+    verificar(pipe, exportar(pipe, LABELS), X[["tipo"] + NUM], atol=1e-5)
@@ -0,0 +1,22 @@
+# Regressões de src/utils.py.
+# Rodar da raiz do projeto: python -m pytest -q tests
+
+import numpy as np
+
+from src.utils import LABELS, alinhar_limiares, montar_submissao
+
+
+def test_alinhamento_abaixo_do_limiar_continua_negativo_no_csv():
+    # p logo abaixo do limiar virava 0.5 após o arredondamento de 6 casas do CSV
+    th = np.array([0.2, 0.3, 0.4, 0.6, 0.9])
+    p = np.vstack([th - 1e-7, th, th + 1e-7])
+    subm = montar_submissao(np.arange(3), alinhar_limiares(p, th))
+    dec = subm[LABELS].to_numpy() >= 0.5
+    assert not dec[0].any()
+    assert dec[1:].all()
+
+
+def test_alinhamento_abaixo_do_limiar_em_float32():
+    th = np.array([0.2, 0.3, 0.4, 0.6, 0.9])
+    p = (th - 1e-9)[None, :]
+    assert (alinhar_limiares(p, th).astype(np.float32) < 0.5).all()